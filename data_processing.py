@@ -1,13 +1,14 @@
 import pandas as pd
 from detector.utils.config import MAX_NODES, MAX_RELATIONSHIPS
+from detector.utils.paysim_loader import load_paysim
 import os
 
 def network_preserving_sampling(input_path, output_path, target_nodes=200000, target_edges=400000, target_fraud_rate=0.0129):
     """Phương pháp lấy mẫu bảo toàn cấu trúc mạng lưới và tỷ lệ gian lận với kiểm soát chặt chẽ số lượng node"""
     print("⚙️ Đang lọc dataset với phương pháp bảo toàn cấu trúc mạng...")
     
-    # Đọc dữ liệu
-    df = pd.read_csv(input_path)
+    # Đọc dữ liệu (mọi cột, để file mẫu giữ đúng định dạng PaySim)
+    df = load_paysim(input_path, columns=None)
     
     # Bước 1: Tạo danh sách các tài khoản và giao dịch
     all_accounts = set(df['nameOrig']).union(set(df['nameDest']))
@@ -1,6 +1,7 @@
 # Export các module chính
 from .fraud_detector import FraudDetector
 from .database_manager import DatabaseManager
+from .async_database_manager import AsyncDatabaseManager
 from .feature_extraction import FeatureExtractor
 from .graph_algorithms import GraphAlgorithms
 from .anomaly_detection import AnomalyDetector
@@ -12,6 +13,7 @@ from .utils.config import FEATURE_WEIGHTS, DEFAULT_PERCENTILE
 __all__ = [
     'FraudDetector',
     'DatabaseManager',
+    'AsyncDatabaseManager',
     'FeatureExtractor',
     'GraphAlgorithms',
     'AnomalyDetector',
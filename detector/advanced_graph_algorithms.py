@@ -49,12 +49,12 @@ class AdvancedGraphAlgorithms:
         
         # Kiểm tra xem graph chính đã tồn tại hay chưa
         check_query = """
-        CALL gds.graph.exists($graphName)
+        CALL gds.graph.exists($graph_name)
         YIELD exists
         RETURN exists
         """
         
-        result = self.db_manager.run_query(check_query, {"graphName": self.main_graph_name})
+        result = self.db_manager.run_query(check_query, {"graph_name": self.main_graph_name})
         
         if not result or not result.get("exists", False):
             print(f"  - Graph '{self.main_graph_name}' không tồn tại, đang tạo mới...")
@@ -62,7 +62,7 @@ class AdvancedGraphAlgorithms:
             # Tạo graph projection chính cho phân tích
             create_main_query = """
             CALL gds.graph.project(
-                $graphName,
+                $graph_name,
                 'Account',
                 {
                     SENT: {
@@ -81,14 +81,14 @@ class AdvancedGraphAlgorithms:
             """
             
             try:
-                self.db_manager.run_query(create_main_query, {"graphName": self.main_graph_name})
+                self.db_manager.run_query(create_main_query, {"graph_name": self.main_graph_name})
                 print(f"  ✅ Đã tạo graph projection '{self.main_graph_name}'")
             except Exception as e:
                 print(f"  ❌ Lỗi khi tạo graph projection: {str(e)}")
                 # Nếu không tạo được graph chính, đặt tên graph mới
                 self.main_graph_name = f"transactions-graph-{int(time.time())}"
                 print(f"  🔄 Thử tạo với tên mới: {self.main_graph_name}")
-                self.db_manager.run_query(create_main_query, {"graphName": self.main_graph_name})
+                self.db_manager.run_query(create_main_query, {"graph_name": self.main_graph_name})
                 
         else:
             print(f"  ✅ Graph projection '{self.main_graph_name}' đã tồn tại")
@@ -99,19 +99,19 @@ class AdvancedGraphAlgorithms:
     def _create_graph_for_embedding(self):
         """Tạo graph projection cụ thể cho FastRP embedding."""
         check_query = """
-        CALL gds.graph.exists($graphName) 
+        CALL gds.graph.exists($graph_name) 
         YIELD exists
         RETURN exists
         """
         
-        result = self.db_manager.run_query(check_query, {"graphName": self.embedding_graph_name})
+        result = self.db_manager.run_query(check_query, {"graph_name": self.embedding_graph_name})
         
         if not result or not result.get("exists", False):
             print(f"  - Đang tạo graph projection '{self.embedding_graph_name}' cho embedding...")
             
             create_query = """
             CALL gds.graph.project(
-                $graphName,
+                $graph_name,
                 'Account',
                 {
                     SENT: {
@@ -135,7 +135,7 @@ class AdvancedGraphAlgorithms:
             """
             
             try:
-                self.db_manager.run_query(create_query, {"graphName": self.embedding_graph_name})
+                self.db_manager.run_query(create_query, {"graph_name": self.embedding_graph_name})
                 print(f"  ✅ Đã tạo graph '{self.embedding_graph_name}' cho embedding")
             except Exception as e:
                 print(f"  ⚠️ Lỗi khi tạo graph cho embedding: {str(e)}")
@@ -156,8 +156,8 @@ class AdvancedGraphAlgorithms:
         for graph_name in graph_names:
             if graph_name and graph_name != self.main_graph_name:  # Không xóa graph chính
                 try:
-                    drop_query = "CALL gds.graph.drop($graphName, false)"
-                    self.db_manager.run_query(drop_query, {"graphName": graph_name})
+                    drop_query = "CALL gds.graph.drop($graph_name, false)"
+                    self.db_manager.run_query(drop_query, {"graph_name": graph_name})
                     print(f"  ✅ Đã xóa graph '{graph_name}'")
                 except Exception as e:
                     print(f"  ⚠️ Không thể xóa graph '{graph_name}': {str(e)}")
@@ -170,19 +170,19 @@ class AdvancedGraphAlgorithms:
         print("  - Đang chạy Node Embedding với FastRP...")
         
         # Tạo embedding cho các node
-        query = f"""
+        query = """
         CALL gds.fastRP.write(
-            '{self.embedding_graph_name}',
-            {{
+            $graph_name,
+            {
                 writeProperty: 'embedding',
                 embeddingDimension: 128,
                 iterationWeights: [0.8, 1.0, 1.0, 1.0],
                 relationshipWeightProperty: 'weight',
                 featureProperties: ['degScore', 'hubScore', 'btwScore', 'maxAmountRatio']
-            }}
+            }
         )
         """
-        self.db_manager.run_query(query)
+        self.db_manager.run_query(query, {"graph_name": self.embedding_graph_name})
           # Sử dụng embedding để tính toán fraud score
         embedding_score_query = """
         MATCH (a:Account)
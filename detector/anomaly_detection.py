@@ -1,25 +1,69 @@
-from .utils.config import DEFAULT_PERCENTILE, FEATURE_WEIGHTS
+from .utils.config import DEFAULT_PERCENTILE, ANOMALY_SCORE_WEIGHTS, SCALER_STATE_PATH
 from .database_manager import DatabaseManager
+from .feature_scaling import NORMALIZED_FEATURES, ScalerState, get_scaler, raw_property, to_query_params
 from .queries.anomaly_detection_queries import (
-    COMPUTE_ANOMALY_SCORE, 
+    get_anomaly_score_query,
     TRANSFER_SCORE_TO_RELATIONSHIP,
-    get_flag_anomalies_query,
+    FIX_NULL_ACCOUNT_SCORES,
+    FIX_NULL_RELATIONSHIP_SCORES,
     DEFAULT_FLAG,
+    RESET_FLAGS,
+    FLAG_THRESHOLD_QUERY,
+    FLAG_ABOVE_THRESHOLD,
     EXPORT_ANOMALY_SCORES
 )
 
 class AnomalyDetector:
-    def __init__(self, db_manager: DatabaseManager, weights=None, percentile_cutoff=None):
+    def __init__(self, db_manager: DatabaseManager, weights=None, percentile_cutoff=None,
+                 scaler_state_path=SCALER_STATE_PATH):
+        """
+        Args:
+            weights: {đặc trưng: trọng số} dùng khi tính anomaly score (mặc định ANOMALY_SCORE_WEIGHTS)
+            scaler_state_path: File JSON chứa tham số scaler đã fit bởi FeatureExtractor
+        """
         self.db_manager = db_manager
-        self.weights = weights or FEATURE_WEIGHTS
+        self.weights = weights or ANOMALY_SCORE_WEIGHTS
         self.percentile_cutoff = percentile_cutoff or DEFAULT_PERCENTILE
+        self.scaler_state_path = scaler_state_path
     
-    def compute_anomaly_scores(self):
-        """Tính điểm bất thường (anomaly score) dựa trên weighted sum."""
+    def compute_anomaly_scores(self, weights=None):
+        """
+        Tính điểm bất thường (anomaly score) dựa trên weighted sum.
+        
+        Các đặc trưng được normalize ngay khi tính điểm từ giá trị thô `<feature>_raw` và tham số
+        scaler đã lưu, nên có thể thử bộ trọng số khác mà không cần trích xuất lại đặc trưng.
+        
+        Args:
+            weights: {đặc trưng: trọng số} thay cho self.weights; đặc trưng không có trong dict có trọng số 0
+        """
         print("🔄 Đang tính toán anomaly score...")
         
-        # Tạo weighted sum của tất cả các đặc trưng đã normalize
-        self.db_manager.run_query(COMPUTE_ANOMALY_SCORE)
+        weights = weights or self.weights
+        unknown = set(weights) - set(NORMALIZED_FEATURES) - {'normCommunitySize'}
+        if unknown:
+            print(f"⚠️ Bỏ qua trọng số của các đặc trưng không dùng để tính điểm: {', '.join(sorted(unknown))}")
+        
+        # Tham số scaler được đọc lại mỗi lần tính để dùng đúng lần fit gần nhất của FeatureExtractor
+        # (chỉ khi state thuộc dữ liệu hiện tại)
+        scaler_state = ScalerState(self.scaler_state_path, self.db_manager.get_dataset_id()).load()
+        terms = []
+        params = {"weights": {feature: float(weights.get(feature, 0.0))
+                              for feature in (*NORMALIZED_FEATURES, 'normCommunitySize')}}
+        for feature in NORMALIZED_FEATURES:
+            fitted = scaler_state.fitted(feature)
+            if fitted is None:
+                terms.append((feature, None))
+                continue
+            scaler_name, scaler_params = fitted
+            terms.append((feature, get_scaler(scaler_name).expression(feature, value=f"n.{raw_property(feature)}")))
+            params.update(to_query_params(feature, scaler_params))
+        
+        missing = [feature for feature, expression in terms if expression is None]
+        if missing:
+            print(f"  - Chưa có scaler đã lưu, dùng giá trị đã normalize trên đồ thị: {', '.join(missing)}")
+        
+        # Tạo weighted sum của tất cả các đặc trưng đã normalize (commit theo lô)
+        self.db_manager.run_periodic(*get_anomaly_score_query(tuple(terms)), params=params)
         
         # Kiểm tra xem anomaly_score đã được tính cho Account chưa
         account_check = self.db_manager.run_query("""
@@ -34,16 +78,11 @@ class AnomalyDetector:
             print("⚠️ Không tìm thấy tài khoản nào có anomaly_score!")
             return
         
-        # Chuyển anomaly score từ Account sang Transaction
-        relationship_result = self.db_manager.run_query("""
-            MATCH (a:Account)-[r:SENT]->()
-            WHERE a.anomaly_score IS NOT NULL
-            SET r.anomaly_score = a.anomaly_score
-            RETURN COUNT(r) AS updated_count
-        """)
+        # Chuyển anomaly score từ Account sang Transaction (commit theo lô)
+        relationship_result = self.db_manager.run_periodic(*TRANSFER_SCORE_TO_RELATIONSHIP)
         
-        if relationship_result and relationship_result.get("updated_count", 0) > 0:
-            print(f"✅ Đã chuyển anomaly_score từ Account sang {relationship_result['updated_count']} giao dịch")
+        if relationship_result.get("properties_set", 0) > 0:
+            print(f"✅ Đã chuyển anomaly_score từ Account sang {relationship_result['properties_set']} giao dịch")
         else:
             print("⚠️ Không thể chuyển anomaly_score sang các giao dịch!")
    
@@ -55,22 +94,11 @@ class AnomalyDetector:
         print(f"🔄 Đang đánh dấu các giao dịch bất thường (ngưỡng phân vị: {self.percentile_cutoff*100}%)...")
         
         # CRITICAL FIX: First ensure anomaly scores exist and aren't null
-        fix_null_scores = """
-        MATCH (a:Account)
-        WHERE a.anomaly_score IS NULL
-        SET a.anomaly_score = 0.0
-        """
-        self.db_manager.run_query(fix_null_scores)
+        self.db_manager.run_periodic(*FIX_NULL_ACCOUNT_SCORES)
         
         # Fix any null anomaly scores on relationships
-        fix_rel_scores = """
-        MATCH (sender:Account)-[r:SENT]->()
-        WHERE r.anomaly_score IS NULL
-        SET r.anomaly_score = COALESCE(sender.anomaly_score, 0.0)
-        RETURN COUNT(r) as fixed_count
-        """
-        fix_result = self.db_manager.run_query(fix_rel_scores)
-        print(f"✅ Fixed {fix_result.get('fixed_count', 0)} relationships with null anomaly scores")
+        fix_result = self.db_manager.run_periodic(*FIX_NULL_RELATIONSHIP_SCORES)
+        print(f"✅ Fixed {fix_result.get('properties_set', 0)} relationships with null anomaly scores")
         
         # Get statistics about anomaly scores
         stats_query = """
@@ -87,44 +115,20 @@ class AnomalyDetector:
             f"Min={stats.get('min', 0)}, Max={stats.get('max', 0)}, Avg={stats.get('avg', 0)}")
         
         # Cải tiến: Sử dụng phương pháp kết hợp percentile và biến đổi ngưỡng tương đối
-        # Chỉ đánh dấu giao dịch có điểm bất thường cao hơn NHIỀU so với điểm trung bình
-        improved_flag_query = """
-        MATCH ()-[r:SENT]->()
-        WITH AVG(r.anomaly_score) AS avg_score, STDEV(r.anomaly_score) AS std_score, MAX(r.anomaly_score) AS max_score,
-             collect(r) AS all_txs, percentileCont(r.anomaly_score, $percentile) AS perc_threshold
-             
-        // Tính toán ngưỡng thông minh - lấy giá trị cao nhất của các ngưỡng:
-        // 1. Ngưỡng phân vị
-        // 2. Ngưỡng thống kê (trung bình + 3*độ lệch chuẩn)
-        // 3. Ngưỡng tương đối (80% giá trị lớn nhất)
-        WITH all_txs, 
-             perc_threshold AS percentile_threshold,
-             avg_score + 3 * std_score AS statistical_threshold,
-             max_score * 0.8 AS relative_threshold,
-             CASE 
-                WHEN perc_threshold > (avg_score + 3 * std_score) THEN perc_threshold
-                WHEN (avg_score + 3 * std_score) > (max_score * 0.8) THEN avg_score + 3 * std_score
-                ELSE max_score * 0.8
-             END AS smart_threshold
-        
-        // Reset tất cả flagged về false
-        UNWIND all_txs AS r
-        SET r.flagged = false
-        
-        // Đặt flagged=true cho các giao dịch vượt ngưỡng
-        WITH collect(r) AS reset_txs, smart_threshold
-        MATCH ()-[r:SENT]->()
-        WHERE r.anomaly_score >= smart_threshold
-        SET r.flagged = true
-        
-        RETURN COUNT(r) AS flagged_count, smart_threshold AS threshold
-        """
-        
-        flag_result = self.db_manager.run_query(improved_flag_query, {"percentile": self.percentile_cutoff})
-        
-        if flag_result:
-            flagged = flag_result.get("flagged_count", 0)
-            threshold = flag_result.get("threshold", 0)
+        # Chỉ đánh dấu giao dịch có điểm bất thường cao hơn NHIỀU so với điểm trung bình.
+        # Ngưỡng được tính bằng một truy vấn đọc, sau đó việc reset và đánh dấu được
+        # commit theo lô thay vì collect toàn bộ giao dịch trong một transaction.
+        threshold_result = self.db_manager.run_query(FLAG_THRESHOLD_QUERY, {"percentile": self.percentile_cutoff})
+        threshold = threshold_result.get("threshold") if threshold_result else None
+        
+        if threshold is not None:
+            # Reset tất cả flagged về false
+            self.db_manager.run_periodic(*RESET_FLAGS)
+            self.db_manager.run_periodic(*DEFAULT_FLAG)
+            
+            # Đặt flagged=true cho các giao dịch vượt ngưỡng
+            flag_result = self.db_manager.run_periodic(*FLAG_ABOVE_THRESHOLD, params={"threshold": threshold})
+            flagged = flag_result.get("properties_set", 0)
             print(f"✅ Đã đánh dấu {flagged} giao dịch bất thường (ngưỡng điểm: {threshold:.6f})")
         else:
             print("⚠️ Không thể đánh dấu giao dịch bất thường")
@@ -141,4 +145,18 @@ class AnomalyDetector:
         
         print(f"✅ Tổng số giao dịch được đánh dấu trong DB: {final_count}")
         
-        return flagged
\ No newline at end of file
+        return flagged
+    
+    def export_anomaly_scores(self, output_file):
+        """Xuất anomaly score của các giao dịch ra file CSV, đọc kết quả dạng stream theo từng đợt."""
+        print(f"🔄 Đang xuất anomaly score ra file {output_file}...")
+        
+        count = 0
+        with open(output_file, 'w') as f:
+            f.write("transaction_id,anomaly_score,is_fraud\n")
+            for record in self.db_manager.stream_query(EXPORT_ANOMALY_SCORES):
+                f.write(f"{record['transaction_id']},{record['anomaly_score']},{record['is_fraud']}\n")
+                count += 1
+        
+        print(f"✅ Đã xuất anomaly score của {count} giao dịch")
+        return count
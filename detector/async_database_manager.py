@@ -0,0 +1,367 @@
+"""
+Phiên bản bất đồng bộ của DatabaseManager trên AsyncGraphDatabase.
+
+Các truy vấn đọc độc lập (các count của dashboard) được gửi đồng thời bằng asyncio.gather
+thay vì tuần tự; check_data dùng chung snapshot thống kê với DatabaseManager. Code đồng bộ như Flask view dùng
+get_shared_async_manager() và run_sync(): mọi coroutine chạy trên một event loop nền
+dùng chung, vì driver async chỉ được dùng trong event loop đã tạo ra nó.
+
+Driver async không dùng chung pool được với driver đồng bộ (get_shared_driver), nên tiến trình
+có thêm một pool tới cùng server, tạo khi có truy vấn async đầu tiên và cấu hình bằng cùng
+DRIVER_OPTIONS (NEO4J_MAX_POOL_SIZE...). Manager dùng chung và event loop nền được đóng khi
+tiến trình kết thúc (close_shared_async_manager, đăng ký với atexit).
+"""
+import asyncio
+import atexit
+import functools
+import os
+import threading
+import time
+
+import numpy as np
+from neo4j import AsyncGraphDatabase
+
+from .batch_writer import AdaptiveBatchSizer, partition_values
+from .database_manager import (
+    DatabaseManager, ImportChunkPlanner, DRIVER_OPTIONS, is_write_query, is_auto_commit_query, ROUTE_LEADER, ROUTE_READ_REPLICAS, stats_snapshot
+)
+from .utils.config import (
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, NEO4J_READ_URI, DASHBOARD_ROUTING,
+    BATCH_SIZE, IMPORT_CHUNK_SIZE, IMPORT_WORKERS, ADAPTIVE_BATCHING
+)
+from .utils.paysim_loader import load_paysim
+from .utils.import_stats import ImportStats, PARSE_PHASE, ACCOUNTS_PHASE, RELATIONSHIPS_PHASE
+from .queries.database_manager_queries import (
+    CREATE_ACCOUNT_ID_CONSTRAINT,
+    CREATE_ACCOUNT_IMPORT_INDEX,
+    FIND_PLAIN_ACCOUNT_ID_INDEXES,
+    SENT_INDEXED_PROPERTIES,
+    get_sent_property_index_query,
+    get_drop_index_query,
+    CREATE_ACCOUNTS_QUERY,
+    CREATE_NEW_ACCOUNTS_QUERY,
+    CREATE_TRANSACTIONS_QUERY,
+    UPDATE_IMPORT_WATERMARK,
+    STATS_SNAPSHOT_QUERY,
+    COUNT_ACCOUNTS,
+    COUNT_FLAGGED_TRANSACTIONS,
+    COUNT_RISK_COMMUNITIES
+)
+
+# Event loop nền và manager dùng chung (xem get_shared_async_manager)
+_loop = None
+_loop_lock = threading.Lock()
+_shared_manager = None
+
+
+def _get_loop():
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="neo4j-async-loop", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def _iter_slices(rows, batch_size):
+    """Chia list `rows` thành các batch; `batch_size` là hàm trả về kích thước batch kế tiếp."""
+    start = 0
+    while start < len(rows):
+        batch = rows[start:start + batch_size()]
+        start += len(batch)
+        yield batch
+
+
+def run_sync(coro):
+    """Chạy coroutine trên event loop nền dùng chung và chờ kết quả (dùng từ code đồng bộ)."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+
+def get_shared_async_manager():
+    """
+    AsyncDatabaseManager dùng chung cho toàn tiến trình, gắn với event loop nền của run_sync.
+    
+    Manager này phục vụ dashboard nên truy vấn đọc được định tuyến theo DASHBOARD_ROUTING.
+    """
+    global _shared_manager
+    if _shared_manager is None:
+        with _loop_lock:
+            if _shared_manager is None:
+                _shared_manager = AsyncDatabaseManager(routing=DASHBOARD_ROUTING)
+    return _shared_manager
+
+
+@atexit.register
+def close_shared_async_manager(timeout=5.0):
+    """
+    Đóng manager dùng chung trên event loop nền rồi dừng loop (tự động gọi khi tiến trình kết thúc).
+
+    Các coroutine chưa xong sau `timeout` giây bị bỏ qua; thread của loop là daemon nên không
+    giữ tiến trình lại.
+    """
+    global _loop, _shared_manager
+    with _loop_lock:
+        loop, manager = _loop, _shared_manager
+        _loop, _shared_manager = None, None
+    if loop is None:
+        return
+    if manager is not None:
+        try:
+            asyncio.run_coroutine_threadsafe(manager.close(), loop).result(timeout)
+        except Exception as e:
+            print(f"⚠️ Không đóng được kết nối async: {e}")
+    loop.call_soon_threadsafe(loop.stop)
+
+
+class AsyncDatabaseManager:
+    def __init__(self, uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD, routing=ROUTE_LEADER,
+                 read_uri=NEO4J_READ_URI):
+        """
+        Khởi tạo cấu hình kết nối; driver được tạo ở lần truy vấn đầu tiên, trong event loop đang chạy.
+        
+        routing=ROUTE_READ_REPLICAS: truy vấn đọc chạy qua driver routing `read_uri` (xem
+        DatabaseManager.read_driver), truy vấn ghi vẫn dùng driver chính.
+        """
+        self.uri = uri
+        self.read_uri = read_uri
+        self.auth = (user, password)
+        self.routing = routing
+        self._driver = None
+        self._read_driver = None
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            self._driver = self._create_driver(self.uri)
+        return self._driver
+
+    async def close(self):
+        """Đóng kết nối Neo4j."""
+        if self._read_driver is not None and self._read_driver is not self._driver:
+            await self._read_driver.close()
+        self._read_driver = None
+        if self._driver:
+            await self._driver.close()
+            self._driver = None
+
+    async def run_query(self, query, params=None, write=None):
+        """
+        Chạy truy vấn Cypher và trả về kết quả theo cùng quy ước với DatabaseManager.run_query:
+        None nếu không có record, dict nếu có một record, ngược lại list các dict.
+        """
+        try:
+            data = await self._execute(query, params, lambda result: result.data(), write)
+        except Exception as e:
+            print(f"Query error: {str(e)}")
+            raise e
+
+        if not data:
+            return None
+        if len(data) == 1:
+            return data[0]
+        return data
+
+    async def check_data(self):
+        """Kiểm tra xem đã có dữ liệu trong database chưa (dùng snapshot thống kê dùng chung với DatabaseManager)"""
+        snapshot = await self.get_stats()
+        stats = {key: snapshot[key] for key in ("accounts", "transactions", "has_analysis")}
+        # Node metadata ImportMeta không tính là dữ liệu (xem DatabaseManager.check_data)
+        return snapshot["accounts"] > 0 or snapshot["transactions"] > 0, stats
+
+    async def get_stats(self):
+        """Snapshot thống kê {nodes, accounts, transactions, has_analysis} (xem DatabaseManager.get_stats)."""
+        snapshot = stats_snapshot.peek()
+        if snapshot is None:
+            version = stats_snapshot.version
+            record = await self._execute(STATS_SNAPSHOT_QUERY, None, lambda result: result.single(), write=False)
+            snapshot = record.data()
+            stats_snapshot.store(snapshot, version)
+        return snapshot
+
+    async def get_metrics(self):
+        """Các số liệu của dashboard (/api/metrics), truy vấn đồng thời."""
+        snapshot, detected_fraud_count, risk_communities = await asyncio.gather(
+            self.get_stats(),
+            self._count(COUNT_FLAGGED_TRANSACTIONS),
+            self._count(COUNT_RISK_COMMUNITIES)
+        )
+        return {
+            "total_accounts": snapshot["accounts"],
+            "total_transactions": snapshot["transactions"],
+            "detected_fraud_count": detected_fraud_count,
+            "risk_communities": risk_communities
+        }
+
+    async def import_data(self, csv_path, streaming=False, chunksize=IMPORT_CHUNK_SIZE, workers=IMPORT_WORKERS,
+                          adaptive=ADAPTIVE_BATCHING):
+        """
+        Import dữ liệu tương tự DatabaseManager.import_data; mỗi partition được ghi bởi một
+        task với session riêng thay vì một thread.
+
+        Việc chia chunk (giới hạn, dedup tài khoản, watermark) dùng chung ImportChunkPlanner với
+        DatabaseManager; đọc CSV (pandas) chạy trong thread pool để không chặn event loop.
+        Checkpoint và chế độ append chỉ có ở DatabaseManager.
+
+        Returns:
+            ImportStats: Thống kê thời gian từng phase, latency batch và throughput; False nếu lỗi
+        """
+        try:
+            workers = workers or 1
+            stats = ImportStats(source_bytes=os.path.getsize(csv_path), workers=workers)
+            planner = ImportChunkPlanner()
+            sizers = {}
+
+            await self.ensure_schema()
+            accounts_query = await self._accounts_write_query()
+
+            if streaming:
+                chunks = await asyncio.to_thread(load_paysim, csv_path, chunksize=chunksize)
+            else:
+                chunks = iter([await asyncio.to_thread(load_paysim, csv_path)])
+
+            while True:
+                # Đọc chunk tiếp theo trong thread pool (I/O và parse CSV)
+                start = time.time()
+                chunk = await asyncio.to_thread(next, chunks, None)
+                stats.add_phase_time(PARSE_PHASE, time.time() - start)
+                if chunk is None or planner.remaining <= 0:
+                    break
+
+                with stats.phase(PARSE_PHASE):
+                    chunk, new_accounts, tx_df = planner.plan(chunk, verbose=planner.total_rows == 0)
+                    stats.add_rows(PARSE_PHASE, len(chunk))
+
+                with stats.phase(ACCOUNTS_PHASE):
+                    accounts = np.asarray(new_accounts, dtype=object)
+                    partitions = partition_values(new_accounts, workers)
+                    await self._write_partitioned(accounts_query, "accounts", [
+                        functools.partial(_iter_slices, accounts[partitions == partition].tolist())
+                        for partition in range(workers)
+                    ], ACCOUNTS_PHASE, stats, sizers, adaptive)
+                with stats.phase(RELATIONSHIPS_PHASE):
+                    partitions = partition_values(tx_df['from_ac'], workers)
+                    await self._write_partitioned(CREATE_TRANSACTIONS_QUERY, "batch", [
+                        functools.partial(DatabaseManager._iter_record_batches, tx_df[partitions == partition])
+                        for partition in range(workers)
+                    ], RELATIONSHIPS_PHASE, stats, sizers, adaptive)
+                print(f"  Đã ghi {len(new_accounts)} tài khoản, {len(tx_df)} giao dịch "
+                      f"(tổng: {len(planner.seen_accounts)} tài khoản, {planner.total_tx} giao dịch)")
+
+            for phase, sizer in sizers.items():
+                stats.batch_sizes[phase] = sizer.size
+            if planner.max_step is not None:
+                stats.import_id = DatabaseManager._new_import_id()
+                await self.run_query(UPDATE_IMPORT_WATERMARK, DatabaseManager._watermark_params(
+                    'streaming' if streaming else 'full', planner.max_step, planner.total_rows,
+                    planner.total_tx, stats.import_id
+                ))
+                stats_snapshot.invalidate()
+
+            stats.finish().report()
+            print(f"Hoàn thành import trong {stats.total_seconds:.2f}s")
+            return stats
+
+        except Exception as e:
+            print(f"Lỗi khi import dữ liệu: {e}")
+            return False
+
+    async def ensure_schema(self):
+        """Tạo constraint duy nhất trên Account.id và các index trên thuộc tính SENT."""
+        plain_indexes = await self._execute(FIND_PLAIN_ACCOUNT_ID_INDEXES, None, lambda result: result.data())
+        for index in plain_indexes:
+            await self.run_query(get_drop_index_query(index["name"]))
+
+        await self.run_query(CREATE_ACCOUNT_ID_CONSTRAINT)
+        await self.run_query(CREATE_ACCOUNT_IMPORT_INDEX)
+        for prop in SENT_INDEXED_PROPERTIES:
+            await self.run_query(get_sent_property_index_query(prop))
+
+    async def _accounts_write_query(self):
+        """Dùng CREATE khi database chưa có tài khoản nào (mọi tài khoản đều mới), ngược lại MERGE."""
+        if await self._count(COUNT_ACCOUNTS) > 0:
+            return CREATE_ACCOUNTS_QUERY
+        return CREATE_NEW_ACCOUNTS_QUERY
+
+    async def _write_partitioned(self, query, key, partitions, phase, stats, sizers, adaptive):
+        """
+        Ghi các partition đồng thời: mỗi partition là một task tuần tự với session riêng.
+
+        `partitions` là list các hàm nhận hàm kích thước batch và trả về iterator các batch của
+        partition đó, nên batch được sinh dần theo kích thước hiện tại thay vì dựng sẵn cả chunk.
+        """
+        if adaptive and phase not in sizers:
+            sizers[phase] = AdaptiveBatchSizer(phase)
+
+        def batch_size():
+            return sizers[phase].size if adaptive else BATCH_SIZE
+
+        async def write_partition(batches):
+            async with self.driver.session() as session:
+                for batch in batches(batch_size):
+                    attempts = 0
+
+                    async def work(tx):
+                        nonlocal attempts
+                        attempts += 1
+                        result = await tx.run(query, {key: batch})
+                        await result.consume()
+
+                    batch_start = time.time()
+                    await session.execute_write(work)
+                    latency = time.time() - batch_start
+                    stats.record_batch(phase, len(batch), latency, retries=attempts - 1)
+                    if adaptive:
+                        sizers[phase].observe(len(batch), latency, retries=attempts - 1)
+
+        await asyncio.gather(*(write_partition(batches) for batches in partitions))
+
+    async def _count(self, query, params=None):
+        """Chạy truy vấn trả về một cột `count` và trả về giá trị đó (0 nếu không có record)."""
+        record = await self._execute(query, params, lambda result: result.single())
+        return record["count"] if record else 0
+
+    def _create_driver(self, uri):
+        return AsyncGraphDatabase.driver(uri, auth=self.auth, **DRIVER_OPTIONS)
+
+    async def _get_read_driver(self):
+        """Driver cho truy vấn đọc; quay về driver chính nếu server không hỗ trợ routing."""
+        if self.routing != ROUTE_READ_REPLICAS or not self.read_uri or self.read_uri == self.uri:
+            return self.driver
+        if self._read_driver is None:
+            driver = self._create_driver(self.read_uri)
+            try:
+                await driver.verify_connectivity()
+            except Exception as e:
+                print(f"⚠️ Không dùng được routing {self.read_uri} ({str(e)}), đọc qua driver chính")
+                await driver.close()
+                driver = self.driver
+            # Các coroutine chạy đồng thời có thể cùng tạo driver, chỉ giữ lại driver đầu tiên
+            if self._read_driver is None:
+                self._read_driver = driver
+            elif driver is not self.driver:
+                await driver.close()
+        return self._read_driver
+
+    async def _execute(self, query, params, consume, write=None):
+        """
+        Chạy một truy vấn và trả về `await consume(result)` bên trong managed transaction
+        (hoặc auto-commit với CALL {...} IN TRANSACTIONS), giống DatabaseManager._execute.
+        """
+        if write is None:
+            write = is_write_query(query)
+        params = params or {}
+        auto_commit = is_auto_commit_query(query)
+        driver = self.driver if write or auto_commit else await self._get_read_driver()
+
+        async with driver.session() as session:
+            if auto_commit:
+                return await consume(await session.run(query, params))
+
+            async def work(tx):
+                return await consume(await tx.run(query, params))
+
+            if write:
+                return await session.execute_write(work)
+            return await session.execute_read(work)
@@ -0,0 +1,191 @@
+"""
+Các writer ghi batch (account/SENT) vào Neo4j bằng managed transaction.
+
+BatchWriter ghi tuần tự trên một session; ParallelBatchWriter dùng một thread
+producer (thread gọi submit) và N thread writer, mỗi writer giữ session và hàng
+đợi riêng. Batch được định tuyến theo partition nên các writer khác nhau không
+ghi cùng một tài khoản nguồn.
+"""
+import queue
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .utils.config import BATCH_SIZE, BATCH_SIZE_MIN, BATCH_SIZE_MAX, BATCH_TARGET_LATENCY
+from .utils.import_stats import ImportStats, RELATIONSHIPS_PHASE
+
+
+def partition_values(values, workers):
+    """Trả về mảng partition (0..workers-1) ổn định theo hash của từng giá trị."""
+    values = np.asarray(values, dtype=object)
+    if workers <= 1:
+        return np.zeros(len(values), dtype=np.int64)
+    return (pd.util.hash_array(values) % workers).astype(np.int64)
+
+
+class AdaptiveBatchSizer:
+    """
+    Điều chỉnh kích thước batch của một phase theo latency commit và lỗi tạm thời.
+    
+    - Có retry (deadlock, lock timeout, heap pressure...): giảm một nửa
+    - Latency vượt xa mục tiêu: thu nhỏ theo tỷ lệ target/latency
+    - Latency thấp hơn nhiều so với mục tiêu: tăng 25%
+    Kích thước luôn nằm trong [min_size, max_size].
+    """
+
+    def __init__(self, phase, initial=BATCH_SIZE, min_size=BATCH_SIZE_MIN, max_size=BATCH_SIZE_MAX,
+                 target_latency=BATCH_TARGET_LATENCY):
+        self.phase = phase
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_latency = target_latency
+        self._size = float(min(max(initial, min_size), max_size))
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        return int(self._size)
+
+    def observe(self, rows, latency, retries=0):
+        """Cập nhật kích thước dựa trên một batch vừa commit."""
+        with self._lock:
+            # Batch cuối của một phase thường nhỏ hơn kích thước hiện tại, quy đổi latency về cùng cỡ
+            if rows <= 0:
+                return
+            scaled_latency = latency * self._size / rows
+            if retries > 0:
+                self._size *= 0.5
+            elif scaled_latency > self.target_latency * 1.5:
+                self._size *= max(self.target_latency / scaled_latency, 0.5)
+            elif scaled_latency < self.target_latency * 0.5:
+                self._size *= 1.25
+            self._size = min(max(self._size, self.min_size), self.max_size)
+
+
+class BatchWriter:
+    """Ghi tuần tự các batch trên một session; latency và số lần retry được ghi vào ImportStats."""
+
+    workers = 1
+
+    def __init__(self, driver, stats=None, adaptive=False):
+        self.driver = driver
+        self.stats = stats or ImportStats(workers=self.workers)
+        self.adaptive = adaptive
+        self._sizers = {}
+        self._session = None
+
+    def __enter__(self):
+        self._session = self.driver.session()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def submit(self, query, params, rows, partition=0, phase=RELATIONSHIPS_PHASE):
+        """Ghi một batch; `rows` là số dòng của batch, được thống kê theo `phase`."""
+        self._write(self._session, query, params, rows, phase)
+
+    def batch_size(self, phase):
+        """Kích thước batch nên dùng cho batch tiếp theo của `phase`."""
+        if not self.adaptive:
+            return BATCH_SIZE
+        return self._sizer(phase).size
+
+    def report_batch_sizes(self):
+        """In kích thước batch mà mỗi phase đã ổn định và lưu vào ImportStats."""
+        for phase, sizer in self._sizers.items():
+            self.stats.batch_sizes[phase] = sizer.size
+            print(f"  Batch size {phase}: ổn định ở {sizer.size} (giới hạn {sizer.min_size}-{sizer.max_size})")
+
+    def flush(self):
+        """Chờ tất cả các batch đã gửi được commit (ghi tuần tự nên không cần chờ)."""
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def _write(self, session, query, params, rows, phase):
+        attempts = 0
+        start = time.time()
+
+        def work(tx):
+            nonlocal attempts
+            attempts += 1
+            tx.run(query, params).consume()
+
+        # execute_write tự retry khi gặp lỗi tạm thời (deadlock, leader switch, ...)
+        session.execute_write(work)
+
+        latency = time.time() - start
+        self.stats.record_batch(phase, rows, latency, retries=attempts - 1)
+        if self.adaptive:
+            self._sizer(phase).observe(rows, latency, retries=attempts - 1)
+
+    def _sizer(self, phase):
+        sizer = self._sizers.get(phase)
+        if sizer is None:
+            # setdefault là atomic với dict nên an toàn khi nhiều writer cùng truy cập
+            sizer = self._sizers.setdefault(phase, AdaptiveBatchSizer(phase))
+        return sizer
+
+
+class ParallelBatchWriter(BatchWriter):
+    """Ghi song song: mỗi partition được gán cho một thread writer với session riêng."""
+
+    def __init__(self, driver, workers, stats=None, adaptive=False, queue_size=4):
+        self.workers = workers
+        super().__init__(driver, stats, adaptive)
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(workers)]
+        self._threads = []
+        self._error = None
+
+    def __enter__(self):
+        for index, batch_queue in enumerate(self._queues):
+            thread = threading.Thread(
+                target=self._worker, args=(batch_queue,),
+                name=f"neo4j-writer-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, query, params, rows, partition=0, phase=RELATIONSHIPS_PHASE):
+        self._raise_if_failed()
+        # Hàng đợi có giới hạn nên producer sẽ bị chặn khi writer ghi không kịp
+        self._queues[partition % self.workers].put((query, params, rows, phase))
+
+    def flush(self):
+        for batch_queue in self._queues:
+            batch_queue.join()
+        self._raise_if_failed()
+
+    def close(self):
+        for batch_queue in self._queues:
+            batch_queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _worker(self, batch_queue):
+        with self.driver.session() as session:
+            while True:
+                item = batch_queue.get()
+                try:
+                    if item is None:
+                        return
+                    # Sau khi có lỗi, bỏ qua các batch còn lại để producer không bị treo
+                    if self._error is None:
+                        self._write(session, *item)
+                except Exception as e:
+                    if self._error is None:
+                        self._error = e
+                finally:
+                    batch_queue.task_done()
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise self._error
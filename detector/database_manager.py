@@ -1,29 +1,65 @@
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, READ_ACCESS as DRIVER_READ, WRITE_ACCESS as DRIVER_WRITE
 import pandas as pd
+import numpy as np
+import atexit
+import functools
 import logging
+import os
+import re
+import threading
 import time
-from .utils.config import BATCH_SIZE, MAX_NODES, MAX_RELATIONSHIPS
+from .utils.config import (
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, NEO4J_READ_URI, STATS_CACHE_TTL,
+    NEO4J_MAX_POOL_SIZE, NEO4J_ACQUISITION_TIMEOUT, NEO4J_MAX_CONNECTION_LIFETIME, NEO4J_MAX_RETRY_TIME,
+    QUERY_FETCH_SIZE, PERIODIC_COMMIT_SIZE, QUERY_PROFILE, SLOW_QUERY_SECONDS,
+    BATCH_SIZE, MAX_NODES, MAX_RELATIONSHIPS, IMPORT_CHUNK_SIZE, IMPORT_WORKERS, ADAPTIVE_BATCHING
+)
+from .batch_writer import BatchWriter, ParallelBatchWriter, partition_values
+from .import_checkpoint import ImportCheckpoint
+from .feature_scaling import NORMALIZED_FEATURES, raw_property
+from .utils.paysim_loader import load_paysim
+from .utils.import_stats import ImportStats, PARSE_PHASE, ACCOUNTS_PHASE, RELATIONSHIPS_PHASE
+from .utils.query_profiler import QueryProfiler
+from .utils.stats_cache import StatsSnapshot
+from .queries.graph_algorithms_queries import get_kcore_graph_name, get_triangle_graph_name
 from .queries.database_manager_queries import (
+    # Schema queries
+    CREATE_ACCOUNT_ID_CONSTRAINT,
+    FIND_PLAIN_ACCOUNT_ID_INDEXES,
+    SENT_INDEXED_PROPERTIES,
+    get_sent_property_index_query,
+    get_drop_index_query,
+    get_periodic_commit_query,
+    
     # Import queries
-    CREATE_ACCOUNT_INDEX,
     CREATE_ACCOUNTS_QUERY,
+    CREATE_NEW_ACCOUNTS_QUERY,
     CREATE_TRANSACTIONS_QUERY,
+    CREATE_TRANSACTIONS_IDEMPOTENT_QUERY,
+    
+    # Append import queries
+    IMPORT_META_ID,
+    CREATE_ACCOUNT_IMPORT_INDEX,
+    GET_IMPORT_WATERMARK,
+    GET_IMPORTED_RANGE,
+    UPDATE_IMPORT_WATERMARK,
+    FIND_EXISTING_ACCOUNTS_QUERY,
+    TAG_TOUCHED_ACCOUNTS_QUERY,
+    GET_TOUCHED_ACCOUNTS,
     
     # Check queries
     COUNT_ALL_NODES,
     COUNT_ACCOUNTS,
-    COUNT_TRANSACTIONS,
-    CHECK_ANALYZED,
+    STATS_SNAPSHOT_QUERY,
     
     # Cleanup queries
-    DROP_ACCOUNT_INDEX,
     DELETE_ALL,
     
     # Graph projection queries
-    get_main_projection,
-    get_similarity_projection,
-    get_temporal_projection,
-    get_drop_graph_query,
+    MAIN_PROJECTION_QUERY,
+    SIMILARITY_PROJECTION_QUERY,
+    TEMPORAL_PROJECTION_QUERY,
+    DROP_GRAPH_QUERY,
     
     # Property cleanup queries
     get_cleanup_node_properties_query,
@@ -34,170 +70,916 @@ from .queries.database_manager_queries import (
 # Disable Neo4j driver's INFO and WARNING logs
 logging.getLogger("neo4j").setLevel(logging.ERROR)
 
+# Loại transaction dùng cho thống kê truy vấn (READ_ACCESS/WRITE_ACCESS của driver là "READ"/"WRITE")
+READ_ACCESS = "read"
+WRITE_ACCESS = "write"
+AUTO_COMMIT = "auto_commit"
+
+# Các mệnh đề ghi dữ liệu/schema; CALL được coi là ghi vì procedure GDS/APOC có thể ghi
+_WRITE_CLAUSE = re.compile(
+    r"\b(CREATE|MERGE|SET|DELETE|REMOVE|DROP|FOREACH|LOAD\s+CSV|CALL)\b", re.IGNORECASE
+)
+_IN_TRANSACTIONS = re.compile(r"\}\s*IN\s+(\d+\s+CONCURRENT\s+)?TRANSACTIONS\b", re.IGNORECASE)
+# Chuỗi ký tự và comment được bỏ qua khi nhận diện mệnh đề
+_LITERALS_AND_COMMENTS = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`|//[^\n]*")
+
+
+def is_write_query(query):
+    """Truy vấn có mệnh đề ghi (hoặc gọi procedure) hay không."""
+    return bool(_WRITE_CLAUSE.search(_LITERALS_AND_COMMENTS.sub(" ", query)))
+
+
+def is_auto_commit_query(query):
+    """Truy vấn dùng CALL {...} IN TRANSACTIONS, chỉ chạy được ở chế độ auto-commit."""
+    return bool(_IN_TRANSACTIONS.search(_LITERALS_AND_COMMENTS.sub(" ", query)))
+
+
+def _row_count(value):
+    """Số dòng kết quả của giá trị trả về từ _execute (list/DataFrame, một Record, hoặc counters)."""
+    if value is None or isinstance(value, dict):
+        return 0
+    if isinstance(value, (list, pd.DataFrame)):
+        return len(value)
+    return 1
+
+
+# Chính sách định tuyến: ROUTE_LEADER chạy mọi truy vấn trên driver chính, ROUTE_READ_REPLICAS
+# chuyển truy vấn đọc sang driver routing (NEO4J_READ_URI), truy vấn ghi vẫn tới leader
+ROUTE_LEADER = "leader"
+ROUTE_READ_REPLICAS = "read_replicas"
+
+# Snapshot thống kê dùng chung cho mọi manager (đồng bộ và async) trong tiến trình
+stats_snapshot = StatsSnapshot(ttl=STATS_CACHE_TTL)
+
+# Driver dùng chung cho toàn tiến trình (xem get_shared_driver, get_shared_read_driver)
+_shared_driver = None
+_shared_read_driver = None
+_shared_driver_lock = threading.Lock()
+
+
+# Cấu hình connection pool dùng chung cho driver đồng bộ và driver async (AsyncDatabaseManager)
+DRIVER_OPTIONS = {
+    "max_connection_pool_size": NEO4J_MAX_POOL_SIZE,
+    "connection_acquisition_timeout": NEO4J_ACQUISITION_TIMEOUT,
+    "max_connection_lifetime": NEO4J_MAX_CONNECTION_LIFETIME,
+    "max_transaction_retry_time": NEO4J_MAX_RETRY_TIME
+}
+
+
+def create_driver(uri, user, password):
+    """Tạo driver Neo4j với cấu hình connection pool từ config (DRIVER_OPTIONS)."""
+    return GraphDatabase.driver(uri, auth=(user, password), **DRIVER_OPTIONS)
+
+
+def get_shared_driver():
+    """
+    Trả về driver dùng chung cho toàn tiến trình, chỉ được tạo ở lần gọi đầu tiên.
+    
+    Các request dùng lại kết nối trong pool thay vì bắt tay TLS/Bolt lại mỗi lần.
+    """
+    global _shared_driver
+    if _shared_driver is None:
+        with _shared_driver_lock:
+            if _shared_driver is None:
+                _shared_driver = create_driver(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    return _shared_driver
+
+
+def get_shared_read_driver():
+    """
+    Trả về driver routing dùng chung cho truy vấn đọc (NEO4J_READ_URI).
+    
+    Nếu không có NEO4J_READ_URI hoặc server không hỗ trợ routing (instance đơn cũ, môi
+    trường test), dùng lại driver chính để truy vấn vẫn chạy được.
+    """
+    global _shared_read_driver
+    if _shared_read_driver is None:
+        driver = get_shared_driver()
+        with _shared_driver_lock:
+            if _shared_read_driver is None:
+                if NEO4J_READ_URI and NEO4J_READ_URI != NEO4J_URI:
+                    read_driver = create_driver(NEO4J_READ_URI, NEO4J_USER, NEO4J_PASSWORD)
+                    try:
+                        read_driver.verify_connectivity()
+                        driver = read_driver
+                    except Exception as e:
+                        print(f"⚠️ Không dùng được routing {NEO4J_READ_URI} ({str(e)}), đọc qua driver chính")
+                        read_driver.close()
+                _shared_read_driver = driver
+    return _shared_read_driver
+
+
+@atexit.register
+def close_shared_driver():
+    """Đóng các driver dùng chung (tự động gọi khi tiến trình kết thúc)."""
+    global _shared_driver, _shared_read_driver
+    with _shared_driver_lock:
+        if _shared_read_driver is not None and _shared_read_driver is not _shared_driver:
+            _shared_read_driver.close()
+        _shared_read_driver = None
+        if _shared_driver is not None:
+            _shared_driver.close()
+            _shared_driver = None
+
+
+class ImportChunkPlanner:
+    """
+    Lập kế hoạch ghi cho từng chunk CSV khi import theo chunk, dùng chung cho DatabaseManager
+    và AsyncDatabaseManager: giới hạn MAX_RELATIONSHIPS / MAX_NODES, dedup tài khoản tăng dần
+    qua các chunk và theo dõi watermark (step lớn nhất, số dòng, số giao dịch).
+    """
+
+    def __init__(self):
+        self.seen_accounts = set()
+        self.total_rows = 0
+        self.total_tx = 0
+        self.max_step = None
+
+    @property
+    def remaining(self):
+        """Số giao dịch còn được phép đọc trước khi chạm MAX_RELATIONSHIPS."""
+        return MAX_RELATIONSHIPS - self.total_rows
+
+    def plan(self, chunk, verbose=False):
+        """
+        Chuẩn bị một chunk.
+
+        Returns:
+            tuple: (chunk đã chuẩn hóa, tài khoản mới cần tạo, frame giao dịch cần ghi)
+        """
+        chunk = DatabaseManager._prepare_import_frame(chunk.head(self.remaining), verbose=verbose)
+        self.total_rows += len(chunk)
+
+        # Chỉ tạo các tài khoản chưa gặp ở các chunk trước, trong giới hạn MAX_NODES
+        chunk_accounts = DatabaseManager._unique_accounts(chunk)
+        new_accounts = [acc for acc in chunk_accounts if acc not in self.seen_accounts]
+        new_accounts = new_accounts[:max(MAX_NODES - len(self.seen_accounts), 0)]
+        self.seen_accounts.update(new_accounts)
+
+        # Lọc giao dịch theo các tài khoản đã tồn tại (chỉ xét tài khoản của chunk này)
+        known_accounts = [acc for acc in chunk_accounts if acc in self.seen_accounts]
+        tx_df = DatabaseManager._build_transaction_frame(chunk, known_accounts)
+        self.total_tx += len(tx_df)
+        if len(tx_df):
+            self.max_step = max(self.max_step or 0, int(tx_df['step'].max()))
+        return chunk, new_accounts, tx_df
+
+
 class DatabaseManager:
-    def __init__(self, uri, user, password):
-        """Khởi tạo kết nối Neo4j."""
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+    def __init__(self, uri=None, user=None, password=None, routing=ROUTE_LEADER):
+        """
+        Khởi tạo kết nối Neo4j.
+        
+        Không truyền uri: dùng driver dùng chung của tiến trình (tạo khi cần lần đầu).
+        Có uri: tạo driver riêng, được đóng khi gọi close().
+        routing=ROUTE_READ_REPLICAS: truy vấn đọc chạy qua driver routing dùng chung (dashboard).
+        """
+        self._driver = create_driver(uri, user, password) if uri else None
+        self._owns_driver = uri is not None
+        self.routing = routing
+        self._query_metrics = {
+            READ_ACCESS: 0, WRITE_ACCESS: 0, AUTO_COMMIT: 0,
+            f"{READ_ACCESS}_retries": 0, f"{WRITE_ACCESS}_retries": 0
+        }
+        self._metrics_lock = threading.Lock()
+        # Thời gian từng truy vấn theo stage; dùng self.profiler.stage(name) để gắn stage
+        self.profiler = QueryProfiler(profile=QUERY_PROFILE, slow_query_seconds=SLOW_QUERY_SECONDS)
+    
+    @property
+    def driver(self):
+        if self._driver is None:
+            self._driver = get_shared_driver()
+        return self._driver
+    
+    @driver.setter
+    def driver(self, driver):
+        self._driver = driver
+    
+    @property
+    def read_driver(self):
+        """Driver cho truy vấn đọc theo chính sách routing (driver riêng/gán thủ công luôn đọc qua chính nó)."""
+        if self.routing == ROUTE_READ_REPLICAS and self._driver in (None, _shared_driver):
+            return get_shared_read_driver()
+        return self.driver
     
     def close(self):
-        """Đóng kết nối Neo4j."""
-        if self.driver:
-            self.driver.close()
+        """Đóng kết nối Neo4j (driver dùng chung chỉ được đóng bởi close_shared_driver)."""
+        if self._owns_driver and self._driver:
+            self._driver.close()
+            self._driver = None
+    
+    def run_query(self, query, params=None, write=None, stage=None):
+        """
+        Chạy truy vấn Cypher trong managed transaction và trả về kết quả.
+        
+        Truy vấn ghi chạy qua execute_write, truy vấn chỉ đọc qua execute_read (có thể được
+        định tuyến tới follower trong cluster); driver tự retry với backoff lũy thừa khi gặp
+        lỗi tạm thời. `write` ghi đè kết quả tự nhận diện của is_write_query; `stage` ghi đè
+        stage hiện tại của profiler.
+        
+        Returns:
+            None nếu không có record, dict nếu có một record, ngược lại list các dict
+        """
+        try:
+            data = self._execute(query, params, lambda result: result.data(), write, stage)
+        except Exception as e:
+            print(f"Query error: {str(e)}")
+            raise e
+        
+        if not data:
+            # For queries that don't return data (CREATE, SET, DELETE, ...)
+            return None
+        # If only one record, return it directly
+        # Otherwise, return the full list of records
+        if len(data) == 1:
+            return data[0]
+        return data
+    
+    def run_periodic(self, match_clause, variables, update_clause, params=None, batch_size=PERIODIC_COMMIT_SIZE,
+                     stage=None):
+        """
+        Chạy một cập nhật toàn đồ thị theo từng transaction `batch_size` dòng
+        (CALL {...} IN TRANSACTIONS) để không vượt giới hạn bộ nhớ transaction.
+        
+        Các truy vấn dạng này thường được khai báo thành tuple (match_clause, variables,
+        update_clause) trong module queries và gọi bằng run_periodic(*QUERY).
+        
+        Args:
+            match_clause: Phần MATCH/WHERE/WITH sinh ra các dòng cần cập nhật
+            variables: Các biến của match_clause được dùng trong update_clause, ví dụ "a, r"
+            update_clause: Mệnh đề cập nhật (SET/REMOVE/DELETE) cho từng dòng
+            params: Tham số của truy vấn (dùng được trong cả hai phần)
+        
+        Returns:
+            dict: Counters tổng hợp của truy vấn, ví dụ {"properties_set": 600000}
+        """
+        query = get_periodic_commit_query(match_clause, variables, update_clause)
+        params = {**(params or {}), "batch_size": int(batch_size)}
+        return self._execute(query, params, lambda result: dict(vars(result.consume().counters)), True, stage)
     
-    def run_query(self, query, params=None):
-        """Chạy truy vấn Cypher và trả về kết quả."""
-        with self.driver.session() as session:
+    def stream_query(self, query, params=None, fetch_size=QUERY_FETCH_SIZE, write=None, stage=None):
+        """
+        Chạy truy vấn Cypher và sinh từng record (dict) khi nhận được từ server.
+        
+        Record được kéo về theo từng đợt `fetch_size` nên bộ nhớ không phụ thuộc vào số dòng
+        kết quả. Session được giữ mở cho tới khi generator chạy hết hoặc bị đóng. Vì các record
+        đã được trả ra không thể retry, truy vấn chạy auto-commit trong session có access mode
+        tương ứng (READ được định tuyến tới follower).
+        """
+        if write is None:
+            write = is_write_query(query)
+        access_mode = DRIVER_WRITE if write else DRIVER_READ
+        stage = stage or self.profiler.current_stage
+        start = time.time()
+        rows = 0
+        driver = self.driver if write else self.read_driver
+        with driver.session(fetch_size=fetch_size, default_access_mode=access_mode) as session:
+            result = session.run(self.profiler.prepare(query), params or {})
+            self._record_transaction(AUTO_COMMIT)
+            summary = None
             try:
-                if params:
-                    result = session.run(query, params)
-                else:
-                    result = session.run(query)
-                    
-                # Check if the result has records without consuming them
-                has_records = result.peek() is not None
+                for record in result:
+                    rows += 1
+                    yield record.data()
+                summary = result.consume()
+            finally:
+                # Ghi nhận cả khi generator bị đóng sớm (break, GC) hoặc lỗi giữa chừng
+                self.profiler.record(query, time.time() - start, rows, summary, stage)
+    
+    def query_frame(self, query, params=None, fetch_size=QUERY_FETCH_SIZE, write=None, stage=None):
+        """Chạy truy vấn Cypher và dựng DataFrame trực tiếp từ stream record (cột theo thứ tự RETURN)."""
+        # Record là tuple nên from_records không cần tạo dict trung gian cho từng dòng
+        return self._execute(
+            query, params,
+            lambda result: pd.DataFrame.from_records(iter(result), columns=result.keys()),
+            write, stage, fetch_size=fetch_size
+        )
+    
+    def get_query_metrics(self):
+        """
+        Số transaction đã chạy và số lần retry theo loại (read/write/auto_commit).
+        
+        Returns:
+            dict: {"read": n, "write": n, "auto_commit": n, "read_retries": n, "write_retries": n}
+        """
+        with self._metrics_lock:
+            return dict(self._query_metrics)
+    
+    def _execute(self, query, params, consume, write=None, stage=None, **session_kwargs):
+        """
+        Chạy một truy vấn và trả về `consume(result)`, được gọi bên trong transaction.
+        
+        Truy vấn `CALL {...} IN TRANSACTIONS` tự quản lý commit nên bắt buộc chạy auto-commit.
+        Thời gian, số dòng và summary của truy vấn được ghi vào self.profiler.
+        """
+        if write is None:
+            write = is_write_query(query)
+        params = params or {}
+        stage = stage or self.profiler.current_stage
+        text = self.profiler.prepare(query)
+        start = time.time()
+        
+        def run(runner):
+            result = runner.run(text, params)
+            value = consume(result)
+            return value, result.consume()
+        
+        auto_commit = is_auto_commit_query(query)
+        driver = self.driver if write or auto_commit else self.read_driver
+        with driver.session(**session_kwargs) as session:
+            if auto_commit:
+                value, summary = run(session)
+                self._record_transaction(AUTO_COMMIT)
+            else:
+                attempts = 0
                 
-                if not has_records:
-                    # For queries that don't return data (CREATE, SET, DELETE, ...)
-                    return None
-                else:                    # For queries that return data, collect them first to avoid consumption issues
-                    data = result.data()
-                    if len(data) == 0:
-                        return None
-                        
-                    # If only one record, return it directly
-                    # Otherwise, return the full list of records
-                    if len(data) == 1:
-                        return data[0]
-                    else:
-                        return data
-            except Exception as e:
-                print(f"Query error: {str(e)}")
-                raise e
-                    
-    def import_data(self, csv_path):
-        """Import dữ liệu sử dụng API Neo4j thay vì LOAD CSV"""
-        try:            # Đọc file CSV
-            df = pd.read_csv(csv_path)
-            print(f"Đã đọc file CSV: {len(df)} giao dịch")
-            
-            # Kiểm tra các cột bắt buộc
-            required_columns = ['nameOrig', 'nameDest', 'amount', 'step', 'type']
-            for col in required_columns:
-                if col not in df.columns:
-                    raise ValueError(f"Thiếu cột {col} trong file CSV")
-              # Kiểm tra và xử lý cột is_fraud hoặc isFraud
-            if 'is_fraud' not in df.columns:
-                if 'isFraud' in df.columns:
-                    print("Tìm thấy cột isFraud, mapping sang is_fraud")
-                    df['is_fraud'] = df['isFraud']
+                def work(tx):
+                    nonlocal attempts
+                    attempts += 1
+                    return run(tx)
+                
+                if write:
+                    value, summary = session.execute_write(work)
                 else:
-                    print("Không tìm thấy cột is_fraud hoặc isFraud trong dữ liệu, tạo cột mặc định với giá trị 0")
-                    df['is_fraud'] = 0
+                    value, summary = session.execute_read(work)
+                self._record_transaction(WRITE_ACCESS if write else READ_ACCESS, attempts - 1)
+        
+        self.profiler.record(query, time.time() - start, _row_count(value), summary, stage)
+        return value
+    
+    def _single(self, query, params=None):
+        """Chạy truy vấn và trả về record đầu tiên (neo4j.Record) hoặc None."""
+        return self._execute(query, params, lambda result: result.single())
+    
+    def _record_transaction(self, kind, retries=0):
+        with self._metrics_lock:
+            self._query_metrics[kind] += 1
+            if retries:
+                self._query_metrics[f"{kind}_retries"] += retries
+    
+    def import_data(self, csv_path, streaming=False, chunksize=IMPORT_CHUNK_SIZE, workers=IMPORT_WORKERS,
+                    checkpoint_path=None, adaptive=ADAPTIVE_BATCHING, append=False):
+        """
+        Import dữ liệu sử dụng API Neo4j thay vì LOAD CSV.
+        
+        Args:
+            csv_path: Đường dẫn file CSV PaySim
+            streaming: Đọc và đẩy dữ liệu theo từng chunk để giới hạn bộ nhớ với các file rất lớn
+            chunksize: Số dòng mỗi chunk khi streaming=True
+            workers: Số session ghi song song (1 = ghi tuần tự trên một session)
+            checkpoint_path: File JSON lưu tiến độ; nếu được chỉ định, import chạy ở chế độ
+                             streaming và có thể tiếp tục từ chunk cuối cùng đã commit
+            adaptive: Tự điều chỉnh kích thước batch của từng phase theo latency commit và
+                      lỗi tạm thời, trong khoảng [BATCH_SIZE_MIN, BATCH_SIZE_MAX]
+            append: Chỉ import các giao dịch có step lớn hơn watermark của lần import trước,
+                    giữ nguyên dữ liệu và kết quả phân tích đã có (xem _import_append)
+        
+        Returns:
+            ImportStats: Thống kê thời gian từng phase, latency batch và throughput; False nếu lỗi
+        """
+        if append:
+            return self._import_append(csv_path, workers, adaptive)
+        if streaming or checkpoint_path:
+            return self._import_streaming(csv_path, chunksize, workers, checkpoint_path, adaptive)
+        
+        try:
+            stats = ImportStats(source_bytes=os.path.getsize(csv_path), workers=workers or 1)
             
-            with self.driver.session() as session:
-                # Tạo index và xóa dữ liệu cũ
-                session.run(CREATE_ACCOUNT_INDEX)
+            with stats.phase(PARSE_PHASE):
+                # Đọc file CSV
+                df = load_paysim(csv_path)
+                print(f"Đã đọc file CSV: {len(df)} giao dịch")
+                df = self._prepare_import_frame(df)
+                stats.add_rows(PARSE_PHASE, len(df))
                 
                 # Lấy danh sách tài khoản độc nhất
-                all_accounts = set(df['nameOrig'].unique()) | set(df['nameDest'].unique())
+                all_accounts = self._unique_accounts(df)
                 print(f"Tổng số tài khoản: {len(all_accounts)}")
                 
                 # Giới hạn số tài khoản nếu cần
                 if len(all_accounts) > MAX_NODES:
                     print(f"Giới hạn số tài khoản tối đa: {MAX_NODES}")
-                    all_accounts = list(all_accounts)[:MAX_NODES]
-                
+                    all_accounts = all_accounts[:MAX_NODES]
+            
+            # Tạo constraint/index trước khi ghi dữ liệu
+            self.ensure_schema()
+            accounts_query = self._accounts_write_query()
+            
+            with self._create_batch_writer(workers, stats, adaptive) as writer:
                 # 1. Tạo tài khoản (nodes)
                 print("Đang tạo tài khoản...")
-                start_time = time.time()
-                
-                account_batches = [list(all_accounts)[i:i+BATCH_SIZE] for i in range(0, len(all_accounts), BATCH_SIZE)]
-                for i, account_batch in enumerate(account_batches):
-                    session.run(CREATE_ACCOUNTS_QUERY, {"accounts": account_batch})
-                    print(f"  Đã tạo {(i+1)*BATCH_SIZE if (i+1)*BATCH_SIZE < len(all_accounts) else len(all_accounts)}/{len(all_accounts)} tài khoản")
+                with stats.phase(ACCOUNTS_PHASE):
+                    self._write_accounts(writer, all_accounts.tolist(), accounts_query, verbose=True)
                 
                 # 2. Tạo giao dịch (relationships) - giới hạn số lượng nếu cần
-                if len(df) > MAX_RELATIONSHIPS:
-                    print(f"Giới hạn số giao dịch tối đa: {MAX_RELATIONSHIPS}")
-                    df = df.head(MAX_RELATIONSHIPS)
+                with stats.phase(PARSE_PHASE):
+                    if len(df) > MAX_RELATIONSHIPS:
+                        print(f"Giới hạn số giao dịch tối đa: {MAX_RELATIONSHIPS}")
+                        df = df.head(MAX_RELATIONSHIPS)
+                    tx_df = self._build_transaction_frame(df, all_accounts)
                 
                 print("Đang tạo giao dịch...")
-                tx_batches = [df.iloc[i:i+BATCH_SIZE] for i in range(0, len(df), BATCH_SIZE)]
+                with stats.phase(RELATIONSHIPS_PHASE):
+                    self._write_transactions(writer, tx_df, verbose=True)
+                writer.report_batch_sizes()
+            
+            if len(tx_df):
+                self._record_import(stats, 'full', int(tx_df['step'].max()),
+                                    int(tx_df['row_id'].max()) + 1, len(tx_df))
+            
+            stats.finish().report()
+            print(f"Hoàn thành import trong {stats.total_seconds:.2f}s")
+            return stats
                 
-                for i, batch_df in enumerate(tx_batches):
-                    records = []
-                    for _, row in batch_df.iterrows():
-                        # Chỉ thêm giao dịch nếu cả hai tài khoản đều trong danh sách tài khoản đã lọc
-                        if row['nameOrig'] in all_accounts and row['nameDest'] in all_accounts:
-                            records.append({
-                                "from_ac": row['nameOrig'],
-                                "to_ac": row['nameDest'],
-                                "amount": float(row['amount']),
-                                "step": int(row['step']),
-                                "is_fraud": int(row['is_fraud']),
-                                "type": row['type']
-                            })
+        except Exception as e:
+            print(f"Lỗi khi import dữ liệu: {e}")
+            return False
+    
+    def export_bulk_import(self, csv_path, output_dir):
+        """
+        Chuyển file CSV PaySim sang định dạng của `neo4j-admin database import` để nạp nguội.
+        
+        Áp dụng cùng cách lọc MAX_NODES / MAX_RELATIONSHIPS và mapping isFraud -> is_fraud
+        như import_data, nhưng ghi ra các file header/data thay vì gửi qua Bolt.
+        
+        Args:
+            csv_path: Đường dẫn file CSV PaySim
+            output_dir: Thư mục chứa các file node/relationship được sinh ra
+        
+        Returns:
+            dict: Đường dẫn các file đã tạo và lệnh neo4j-admin tương ứng, hoặc None nếu lỗi
+        """
+        try:
+            start_time = time.time()
+            df = load_paysim(csv_path)
+            print(f"Đã đọc file CSV: {len(df)} giao dịch")
+            df = self._prepare_import_frame(df)
+            
+            all_accounts = self._unique_accounts(df)
+            if len(all_accounts) > MAX_NODES:
+                print(f"Giới hạn số tài khoản tối đa: {MAX_NODES}")
+                all_accounts = all_accounts[:MAX_NODES]
+            
+            if len(df) > MAX_RELATIONSHIPS:
+                print(f"Giới hạn số giao dịch tối đa: {MAX_RELATIONSHIPS}")
+                df = df.head(MAX_RELATIONSHIPS)
+            tx_df = self._build_transaction_frame(df, all_accounts)
+            
+            os.makedirs(output_dir, exist_ok=True)
+            paths = {
+                "accounts_header": os.path.join(output_dir, "accounts_header.csv"),
+                "accounts": os.path.join(output_dir, "accounts.csv"),
+                "sent_header": os.path.join(output_dir, "sent_header.csv"),
+                "sent": os.path.join(output_dir, "sent.csv")
+            }
+            
+            # Node: id được lưu thành thuộc tính Account.id, nằm trong ID space "Account"
+            with open(paths["accounts_header"], 'w', encoding='utf-8') as f:
+                f.write("id:ID(Account)\n")
+            pd.DataFrame({"id": all_accounts}).to_csv(paths["accounts"], index=False, header=False)
+            
+            # Relationship: cùng thuộc tính và kiểu dữ liệu như CREATE_TRANSACTIONS_QUERY
+            with open(paths["sent_header"], 'w', encoding='utf-8') as f:
+                f.write(":START_ID(Account),:END_ID(Account),row_id:long,amount:double,step:long,is_fraud:long,type\n")
+            tx_df[["from_ac", "to_ac", "row_id", "amount", "step", "is_fraud", "type"]].to_csv(
+                paths["sent"], index=False, header=False
+            )
+            
+            paths["command"] = (
+                "neo4j-admin database import full "
+                f"--nodes=Account={paths['accounts_header']},{paths['accounts']} "
+                f"--relationships=SENT={paths['sent_header']},{paths['sent']} "
+                "--overwrite-destination neo4j"
+            )
+            
+            print(f"Đã xuất {len(all_accounts)} tài khoản và {len(tx_df)} giao dịch trong {time.time() - start_time:.2f}s")
+            print(f"Chạy lệnh sau khi database đã dừng:\n  {paths['command']}")
+            print("Sau khi khởi động lại database, gọi ensure_schema() để tạo constraint và index")
+            return paths
+        
+        except Exception as e:
+            print(f"Lỗi khi xuất dữ liệu bulk import: {e}")
+            return None
+    
+    def _import_streaming(self, csv_path, chunksize, workers, checkpoint_path=None, adaptive=False):
+        """Import CSV theo từng chunk: dedup tài khoản tăng dần và ghi ngay khi mỗi chunk tới."""
+        try:
+            stats = ImportStats(source_bytes=os.path.getsize(csv_path), workers=workers or 1)
+            planner = ImportChunkPlanner()
+            
+            checkpoint = ImportCheckpoint(checkpoint_path, csv_path, chunksize) if checkpoint_path else None
+            resume_chunk = checkpoint.load() if checkpoint else None
+            if resume_chunk is not None:
+                print(f"Tiếp tục import từ chunk {resume_chunk + 1} theo checkpoint {checkpoint_path}")
+            elif checkpoint:
+                # Tạo manifest ngay từ đầu để lần chạy sau biết chunk đầu tiên có thể đã ghi dở
+                checkpoint.commit(0, 0, 0)
+            
+            self.ensure_schema()
+            accounts_query = self._accounts_write_query()
+            
+            with self._create_batch_writer(workers, stats, adaptive) as writer:
+                chunks = stats.timed_iter(PARSE_PHASE, load_paysim(csv_path, chunksize=chunksize))
+                for chunk_index, chunk in enumerate(chunks):
+                    # Giới hạn số giao dịch giống chế độ đọc toàn bộ file
+                    if planner.remaining <= 0:
+                        print(f"Giới hạn số giao dịch tối đa: {MAX_RELATIONSHIPS}")
+                        break
                     
-                    session.run(CREATE_TRANSACTIONS_QUERY, {"batch": records})
+                    with stats.phase(PARSE_PHASE):
+                        chunk, new_accounts, tx_df = planner.plan(chunk, verbose=chunk_index == 0)
+                        stats.add_rows(PARSE_PHASE, len(chunk))
                     
-                    progress = (i+1)/len(tx_batches)*100
-                    print(f"  Đã tạo {progress:.1f}% giao dịch ({(i+1)*BATCH_SIZE if (i+1)*BATCH_SIZE < len(df) else len(df)}/{len(df)})")
-                
-                print(f"Hoàn thành import trong {time.time() - start_time:.2f}s")
-                return True
+                    # Các chunk đã commit trước đó chỉ được đọc lại để dựng lại tập tài khoản
+                    if resume_chunk is not None and chunk_index < resume_chunk:
+                        continue
+                    
+                    # Chunk dang dở lúc bị gián đoạn có thể đã ghi một phần, gửi lại theo kiểu idempotent
+                    if chunk_index == resume_chunk:
+                        tx_query = CREATE_TRANSACTIONS_IDEMPOTENT_QUERY
+                    else:
+                        tx_query = CREATE_TRANSACTIONS_QUERY
+                    with stats.phase(ACCOUNTS_PHASE):
+                        self._write_accounts(writer, new_accounts, accounts_query)
+                    with stats.phase(RELATIONSHIPS_PHASE):
+                        self._write_transactions(writer, tx_df, tx_query)
+                    
+                    if checkpoint:
+                        checkpoint.commit(chunk_index + 1, planner.total_rows, planner.total_tx)
+                    
+                    print(f"  Chunk {chunk_index + 1}: {len(chunk)} dòng, +{len(new_accounts)} tài khoản, "
+                          f"+{len(tx_df)} giao dịch (tổng: {len(planner.seen_accounts)} tài khoản, "
+                          f"{planner.total_tx} giao dịch)")
                 
+                writer.report_batch_sizes()
+            
+            if planner.max_step is not None:
+                # row_id là số thứ tự dòng trong file nên dòng tiếp theo chính là total_rows
+                self._record_import(stats, 'streaming', planner.max_step, planner.total_rows, planner.total_tx)
+            if checkpoint:
+                checkpoint.clear()
+            stats.finish().report()
+            print(f"Hoàn thành import streaming trong {stats.total_seconds:.2f}s")
+            return stats
+        
         except Exception as e:
             print(f"Lỗi khi import dữ liệu: {e}")
             return False
-
-    def check_data(self):
-        """Kiểm tra xem đã có dữ liệu trong database chưa"""
-        with self.driver.session() as session:
-            result = session.run(COUNT_ALL_NODES)
-            count = result.single()["count"]
+    
+    def ensure_schema(self):
+        """Tạo constraint duy nhất trên Account.id và các index trên thuộc tính SENT."""
+        # Index thường trên Account.id sẽ xung đột với constraint, cần xóa trước
+        plain_indexes = self.run_query(FIND_PLAIN_ACCOUNT_ID_INDEXES)
+        if isinstance(plain_indexes, dict):
+            plain_indexes = [plain_indexes]
+        for index in plain_indexes or []:
+            self.run_query(get_drop_index_query(index["name"]))
+        
+        self.run_query(CREATE_ACCOUNT_ID_CONSTRAINT)
+        self.run_query(CREATE_ACCOUNT_IMPORT_INDEX)
+        for prop in SENT_INDEXED_PROPERTIES:
+            self.run_query(get_sent_property_index_query(prop))
+    
+    def get_import_watermark(self):
+        """
+        Trả về watermark của lần import gần nhất.
+        
+        Returns:
+            dict: max_step, next_row_id, last_import_id, last_import_mode, last_import_transactions,
+                  dataset_id; None nếu database chưa có giao dịch nào
+        """
+        record = self._single(GET_IMPORT_WATERMARK, {"meta_id": IMPORT_META_ID})
+        if record is not None:
+            return record.data()
+        
+        # Database được import trước khi có node metadata: suy ra watermark từ các giao dịch
+        record = self._single(GET_IMPORTED_RANGE)
+        if record is None or record["max_step"] is None:
+            return None
+        return {
+            "max_step": record["max_step"],
+            "next_row_id": (record["max_row_id"] + 1) if record["max_row_id"] is not None else 0,
+            "last_import_id": None,
+            "last_import_mode": None,
+            "last_import_transactions": None,
+            "dataset_id": None
+        }
+    
+    def get_dataset_id(self):
+        """Mã lần import đầy đủ gần nhất của dữ liệu hiện tại (None nếu chưa có node metadata)."""
+        watermark = self.get_import_watermark()
+        return watermark.get("dataset_id") if watermark else None
+    
+    def get_touched_accounts(self, import_id=None):
+        """Danh sách id các tài khoản có giao dịch trong lần import append `import_id` (mặc định: lần gần nhất)."""
+        if import_id is None:
+            watermark = self.get_import_watermark()
+            import_id = watermark and watermark["last_import_id"]
+            if import_id is None:
+                return []
+        return self._execute(GET_TOUCHED_ACCOUNTS, {"import_id": import_id},
+                             lambda result: [record["id"] for record in result])
+    
+    def _import_append(self, csv_path, workers, adaptive=False):
+        """
+        Import tăng dần: chỉ nạp các giao dịch có step lớn hơn watermark đã lưu.
+        
+        Tài khoản đã có trong database không bị ghi lại; chỉ các tài khoản mới được MERGE.
+        Mọi tài khoản có giao dịch trong phần delta được gắn `last_import_id` để các bước
+        phân tích sau biết phần đồ thị nào vừa thay đổi.
+        """
+        try:
+            stats = ImportStats(source_bytes=os.path.getsize(csv_path), workers=workers or 1)
+            import_id = self._new_import_id()
+            self.ensure_schema()
             
-            # Lấy thêm thống kê
-            stats = {}
-            try:
-                accounts = session.run(COUNT_ACCOUNTS).single()
-                stats["accounts"] = accounts["count"] if accounts else 0
+            watermark = self.get_import_watermark() or {}
+            max_step = watermark.get("max_step")
+            next_row_id = watermark.get("next_row_id") or 0
+            
+            with stats.phase(PARSE_PHASE):
+                df = load_paysim(csv_path)
+                df = self._prepare_import_frame(df)
+                if max_step is not None:
+                    df = df[df['step'].to_numpy() > max_step]
+                    print(f"Watermark hiện tại: step {max_step}, {len(df)} giao dịch mới")
+                else:
+                    print(f"Database chưa có giao dịch, import toàn bộ {len(df)} giao dịch")
+                stats.add_rows(PARSE_PHASE, len(df))
                 
-                transactions = session.run(COUNT_TRANSACTIONS).single()
-                stats["transactions"] = transactions["count"] if transactions else 0
+                if len(df) > MAX_RELATIONSHIPS:
+                    print(f"Giới hạn số giao dịch tối đa: {MAX_RELATIONSHIPS}")
+                    df = df.head(MAX_RELATIONSHIPS)
+                # row_id tiếp nối các lần import trước để không trùng với giao dịch đã có
+                df = df.set_axis(pd.RangeIndex(next_row_id, next_row_id + len(df)))
+            
+            if len(df) == 0:
+                print("Không có giao dịch mới cần import")
+                stats.finish()
+                return stats
+            
+            with stats.phase(ACCOUNTS_PHASE):
+                delta_accounts = self._unique_accounts(df)
+                existing = self._existing_accounts(delta_accounts.tolist())
+                new_accounts = [acc for acc in delta_accounts if acc not in existing]
                 
-                has_analysis = session.run(CHECK_ANALYZED).single()
-                stats["has_analysis"] = has_analysis["count"] > 0 if has_analysis else False
-            except:
-                stats = {"accounts": 0, "transactions": 0, "has_analysis": False}
+                result = self.run_query(COUNT_ACCOUNTS)
+                remaining_nodes = max(MAX_NODES - (result["count"] if result else 0), 0)
+                if len(new_accounts) > remaining_nodes:
+                    print(f"Giới hạn số tài khoản tối đa: {MAX_NODES}")
+                    new_accounts = new_accounts[:remaining_nodes]
+                print(f"Tài khoản trong delta: {len(delta_accounts)} ({len(existing)} đã có, {len(new_accounts)} mới)")
+            
+            with stats.phase(PARSE_PHASE):
+                tx_df = self._build_transaction_frame(df, list(existing) + new_accounts)
+            
+            with self._create_batch_writer(workers, stats, adaptive) as writer:
+                print("Đang tạo tài khoản mới...")
+                with stats.phase(ACCOUNTS_PHASE):
+                    self._write_accounts(writer, new_accounts, CREATE_ACCOUNTS_QUERY)
                 
-            return count > 0, stats
+                print("Đang tạo giao dịch mới...")
+                with stats.phase(RELATIONSHIPS_PHASE):
+                    self._write_transactions(writer, tx_df, verbose=True)
+                
+                touched = pd.unique(np.concatenate([
+                    tx_df['from_ac'].to_numpy(dtype=object),
+                    tx_df['to_ac'].to_numpy(dtype=object)
+                ]))
+                with stats.phase(ACCOUNTS_PHASE):
+                    self._write_accounts(writer, touched.tolist(), TAG_TOUCHED_ACCOUNTS_QUERY,
+                                         params={"import_id": import_id})
+                writer.report_batch_sizes()
+            
+            if len(tx_df):
+                self._record_import(stats, 'append', int(tx_df['step'].max()),
+                                    int(tx_df['row_id'].max()) + 1, len(tx_df), import_id)
+            
+            stats.finish().report()
+            print(f"Hoàn thành import append {import_id}: {len(tx_df)} giao dịch, "
+                  f"{len(touched)} tài khoản bị ảnh hưởng trong {stats.total_seconds:.2f}s")
+            return stats
         
-    def clear_database(self):
-        """Xóa toàn bộ dữ liệu trong database"""
-        with self.driver.session() as session:
-            try:
-                # Xóa các indexes trước (nếu có)
-                try:
-                    session.run(DROP_ACCOUNT_INDEX)
-                except:
-                    pass
-                    
-                # Xóa tất cả nodes và relationships
-                session.run(DELETE_ALL)
+        except Exception as e:
+            print(f"Lỗi khi import dữ liệu: {e}")
+            return False
+    
+    def _existing_accounts(self, accounts):
+        """Trả về tập các id trong `accounts` đã tồn tại trong database (tra theo constraint Account.id)."""
+        existing = set()
+        for start in range(0, len(accounts), BATCH_SIZE):
+            existing.update(self._execute(
+                FIND_EXISTING_ACCOUNTS_QUERY, {"accounts": accounts[start:start+BATCH_SIZE]},
+                lambda result: [record["id"] for record in result]
+            ))
+        return existing
+    
+    @staticmethod
+    def _new_import_id():
+        """Mã lần import theo thời gian (đến mili giây), dùng làm giá trị của Account.last_import_id."""
+        now = time.time()
+        return f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{int(now * 1000) % 1000:03d}"
+    
+    def _record_import(self, stats, mode, max_step, next_row_id, transactions, import_id=None):
+        """Cập nhật watermark trên node metadata sau khi một lần import đã commit xong."""
+        import_id = import_id or self._new_import_id()
+        stats.import_id = import_id
+        self.run_query(UPDATE_IMPORT_WATERMARK,
+                       self._watermark_params(mode, max_step, next_row_id, transactions, import_id))
+        self.invalidate_stats()
+    
+    @staticmethod
+    def _watermark_params(mode, max_step, next_row_id, transactions, import_id):
+        """Tham số của UPDATE_IMPORT_WATERMARK (dùng chung với AsyncDatabaseManager)."""
+        return {
+            "meta_id": IMPORT_META_ID,
+            "max_step": max_step,
+            "next_row_id": next_row_id,
+            "import_id": import_id,
+            "mode": mode,
+            "transactions": transactions
+        }
+    
+    def _accounts_write_query(self):
+        """Dùng CREATE khi database chưa có tài khoản nào (mọi tài khoản đều mới), ngược lại MERGE."""
+        result = self.run_query(COUNT_ACCOUNTS)
+        if result and result["count"] > 0:
+            return CREATE_ACCOUNTS_QUERY
+        return CREATE_NEW_ACCOUNTS_QUERY
+    
+    def _create_batch_writer(self, workers, stats=None, adaptive=False):
+        """Tạo writer tuần tự hoặc song song tùy theo số workers."""
+        if workers and workers > 1:
+            return ParallelBatchWriter(self.driver, workers, stats, adaptive)
+        return BatchWriter(self.driver, stats, adaptive)
+    
+    def _write_accounts(self, writer, accounts, query=CREATE_ACCOUNTS_QUERY, verbose=False, params=None):
+        """
+        Ghi các tài khoản theo batch (kích thước do writer quyết định), chia partition theo id tài khoản.
+        
+        `params` là các tham số bổ sung gửi kèm mỗi batch ngoài danh sách `accounts`.
+        """
+        partitions = partition_values(accounts, writer.workers)
+        accounts = np.asarray(accounts, dtype=object)
+        done = 0
+        for partition in range(writer.workers):
+            part_accounts = accounts[partitions == partition].tolist()
+            start = 0
+            while start < len(part_accounts):
+                batch = part_accounts[start:start + writer.batch_size(ACCOUNTS_PHASE)]
+                start += len(batch)
+                writer.submit(query, {**(params or {}), "accounts": batch}, len(batch), partition, ACCOUNTS_PHASE)
                 
-                # Kiểm tra lại để đảm bảo đã xóa thành công
-                result = session.run(COUNT_ALL_NODES).single()
-                is_empty = result["count"] == 0
+                done += len(batch)
+                if verbose and writer.workers == 1:
+                    print(f"  Đã tạo {done}/{len(accounts)} tài khoản")
+        
+        # Tất cả tài khoản phải tồn tại trước khi tạo các giao dịch tham chiếu tới chúng
+        writer.flush()
+    
+    def _write_transactions(self, writer, tx_df, query=CREATE_TRANSACTIONS_QUERY, verbose=False):
+        """
+        Ghi các giao dịch (SENT) theo batch (kích thước do writer quyết định) từ frame đã được lọc.
+        
+        Giao dịch được chia partition theo tài khoản nguồn để các writer song song
+        không tranh chấp lock trên cùng một node gửi.
+        """
+        total_tx = len(tx_df)
+        partitions = partition_values(tx_df['from_ac'], writer.workers)
+        done = 0
+        batch_size = functools.partial(writer.batch_size, RELATIONSHIPS_PHASE)
+        for partition in range(writer.workers):
+            part_df = tx_df[partitions == partition] if writer.workers > 1 else tx_df
+            for records in self._iter_record_batches(part_df, batch_size):
+                writer.submit(query, {"batch": records}, len(records), partition, RELATIONSHIPS_PHASE)
                 
-                if is_empty:
-                    print("Đã xóa thành công toàn bộ dữ liệu từ database")
-                else:
-                    print(f"Vẫn còn {result['count']} nodes trong database")
-                    
-                return is_empty
-            except Exception as e:
-                print(f"Lỗi khi xóa database: {e}")
-                return False
+                done += len(records)
+                if verbose and writer.workers == 1:
+                    print(f"  Đã tạo {done/total_tx*100:.1f}% giao dịch ({done}/{total_tx})")
+        writer.flush()
+    
+    @staticmethod
+    def _prepare_import_frame(df, verbose=True):
+        """Kiểm tra các cột bắt buộc và chuẩn hóa cột is_fraud."""
+        # Kiểm tra các cột bắt buộc
+        required_columns = ['nameOrig', 'nameDest', 'amount', 'step', 'type']
+        for col in required_columns:
+            if col not in df.columns:
+                raise ValueError(f"Thiếu cột {col} trong file CSV")
+        
+        # Kiểm tra và xử lý cột is_fraud hoặc isFraud
+        if 'is_fraud' not in df.columns:
+            df = df.copy()
+            if 'isFraud' in df.columns:
+                if verbose:
+                    print("Tìm thấy cột isFraud, mapping sang is_fraud")
+                df['is_fraud'] = df['isFraud']
+            else:
+                if verbose:
+                    print("Không tìm thấy cột is_fraud hoặc isFraud trong dữ liệu, tạo cột mặc định với giá trị 0")
+                df['is_fraud'] = 0
+        return df
+
+    @staticmethod
+    def _unique_accounts(df):
+        """Trả về mảng các tài khoản độc nhất (nameOrig trước, nameDest sau) theo thứ tự xuất hiện."""
+        return pd.unique(np.concatenate([
+            df['nameOrig'].to_numpy(dtype=object),
+            df['nameDest'].to_numpy(dtype=object)
+        ]))
+    
+    @staticmethod
+    def _build_transaction_frame(df, accounts):
+        """
+        Lọc giao dịch theo danh sách tài khoản và ép kiểu theo cột (vectorized).
+        
+        Chỉ giữ giao dịch có cả hai tài khoản nằm trong `accounts`; các cột đã được đổi
+        tên đúng với tham số của CREATE_TRANSACTIONS_QUERY. `row_id` là số thứ tự dòng
+        trong file CSV nguồn (index của frame), dùng để nhận diện giao dịch khi import lại.
+        """
+        accounts = pd.Index(accounts)
+        mask = (df['nameOrig'].isin(accounts) & df['nameDest'].isin(accounts)).to_numpy()
+        return pd.DataFrame({
+            "row_id": df.index.to_numpy(dtype='int64')[mask],
+            "from_ac": df['nameOrig'].to_numpy(dtype=object)[mask],
+            "to_ac": df['nameDest'].to_numpy(dtype=object)[mask],
+            "amount": df['amount'].to_numpy(dtype='float64')[mask],
+            "step": df['step'].to_numpy(dtype='int64')[mask],
+            "is_fraud": df['is_fraud'].to_numpy(dtype='int64')[mask],
+            "type": df['type'].to_numpy(dtype=object)[mask]
+        })
+    
+    @staticmethod
+    def _iter_record_batches(frame, batch_size):
+        """
+        Sinh các batch tham số (list of dict) trực tiếp từ các cột NumPy của frame.
+        
+        `batch_size` có thể là số nguyên hoặc hàm trả về kích thước cho batch kế tiếp.
+        """
+        keys = list(frame.columns)
+        columns = [frame[key].to_numpy() for key in keys]
+        start = 0
+        while start < len(frame):
+            end = start + (batch_size() if callable(batch_size) else batch_size)
+            # tolist() trả về kiểu Python gốc (str/int/float) mà Bolt driver chấp nhận
+            rows = zip(*(column[start:end].tolist() for column in columns))
+            yield [dict(zip(keys, row)) for row in rows]
+            start = end
+
+    def check_data(self):
+        """
+        Kiểm tra xem đã có dữ liệu trong database chưa (dùng snapshot thống kê nếu còn hiệu lực).
+        
+        Chỉ tính Account và SENT: node metadata ImportMeta (watermark) không phải dữ liệu giao dịch.
+        """
+        snapshot = self.get_stats()
+        stats = {key: snapshot[key] for key in ("accounts", "transactions", "has_analysis")}
+        return snapshot["accounts"] > 0 or snapshot["transactions"] > 0, stats
+    
+    def get_stats(self, refresh=False):
+        """
+        Snapshot thống kê {nodes, accounts, transactions, has_analysis}, chỉ truy vấn lại khi
+        đồ thị đã thay đổi (xem invalidate_stats) hoặc snapshot quá STATS_CACHE_TTL.
+        """
+        if refresh:
+            stats_snapshot.invalidate()
+        # CALL {...} ở đây là subquery chỉ đọc, không phải procedure ghi
+        return stats_snapshot.get(
+            lambda: self._execute(STATS_SNAPSHOT_QUERY, None, lambda result: result.single().data(), write=False)
+        )
+    
+    def invalidate_stats(self):
+        """Bỏ snapshot thống kê (gọi sau import, clear database và khi pipeline hoàn tất)."""
+        stats_snapshot.invalidate()
+        
+    def clear_database(self):
+        """
+        Xóa toàn bộ dữ liệu trong database.
+        
+        Node metadata ImportMeta cũng bị xóa, nên watermark được reset và lần import append sau
+        bắt đầu lại từ đầu; dataset_id mất theo nên scaler state đã lưu không còn khớp và sẽ
+        được fit lại (xem ScalerState). Constraint và index (ensure_schema) được giữ lại vì đều tạo bằng
+        IF NOT EXISTS và lần import sau dùng lại được.
+        """
+        try:
+            # Xóa tất cả nodes và relationships
+            self._execute(DELETE_ALL, None, lambda result: result.consume())
+            
+            # Kiểm tra lại để đảm bảo đã xóa thành công (đếm mọi node, kể cả ImportMeta)
+            result = self._single(COUNT_ALL_NODES)
+            is_empty = result["count"] == 0
+            
+            if is_empty:
+                print("Đã xóa thành công toàn bộ dữ liệu từ database")
+            else:
+                print(f"Vẫn còn {result['count']} nodes trong database")
+                
+            return is_empty
+        except Exception as e:
+            print(f"Lỗi khi xóa database: {e}")
+            return False
+        finally:
+            self.invalidate_stats()
             
     def create_graph_projections(self):
         """Tạo các graph projection dùng cho các thuật toán GDS."""
@@ -210,13 +992,13 @@ class DatabaseManager:
         self.temporal_graph_name = f'temporal-graph-{timestamp}'
         
         # 1. Graph projection cho các Account và mối quan hệ SENT
-        self.run_query(get_main_projection(self.main_graph_name))
+        self.run_query(MAIN_PROJECTION_QUERY, {"graph_name": self.main_graph_name})
         
         # 2. Graph projection cho account similarity
-        self.run_query(get_similarity_projection(self.similarity_graph_name))
+        self.run_query(SIMILARITY_PROJECTION_QUERY, {"graph_name": self.similarity_graph_name})
         
         # 3. Graph projection cho temporal analysis
-        self.run_query(get_temporal_projection(self.temporal_graph_name))
+        self.run_query(TEMPORAL_PROJECTION_QUERY, {"graph_name": self.temporal_graph_name})
         
         print("✅ Đã tạo xong các graph projection.")
             
@@ -226,11 +1008,14 @@ class DatabaseManager:
         
         # Xóa các graph projections cụ thể
         try:
-            self.run_query(get_drop_graph_query(self.main_graph_name))
-            self.run_query(get_drop_graph_query(self.similarity_graph_name))
-            self.run_query(get_drop_graph_query(self.temporal_graph_name))
-            self.run_query(get_drop_graph_query(f"{self.main_graph_name}-undirected"))
-            self.run_query(get_drop_graph_query(f"{self.main_graph_name}-undirected-tri"))
+            for graph_name in (
+                self.main_graph_name,
+                self.similarity_graph_name,
+                self.temporal_graph_name,
+                get_kcore_graph_name(self.main_graph_name),
+                get_triangle_graph_name(self.main_graph_name)
+            ):
+                self.run_query(DROP_GRAPH_QUERY, {"graph_name": graph_name})
             print("✅ Đã xóa tất cả các graph projections.")
         except Exception as e:
             print(f"⚠️ Lưu ý khi xóa graph: {str(e)}")
@@ -243,7 +1028,8 @@ class DatabaseManager:
         added_properties = [
             'degScore', 'prScore', 'communityId', 'communitySize', 'normCommunitySize',
             'simScore', 'btwScore', 'hubScore', 'authScore', 'coreScore', 'triCount',
-            'cycleCount', 'tempBurst', 'tempBurst1h', 'tempBurst24h', 'anomaly_score', 'flagged'
+            'cycleCount', 'tempBurst', 'tempBurst1h', 'tempBurst24h', 'anomaly_score', 'flagged',
+            *(raw_property(feature) for feature in NORMALIZED_FEATURES)
         ]
         
         try:
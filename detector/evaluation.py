@@ -136,38 +136,36 @@ class EvaluationManager:
         print("🔄 Đang trực quan hóa kết quả...")
         
         try:
-            # Get all records for visualization
-            with self.db_manager.driver.session() as session:
-                records = session.run(SCORE_DISTRIBUTION_QUERY).data()
-                
-            if records:
-                # Extract data for plotting
-                scores = [record['score'] for record in records]
-                flagged = [record['flagged'] for record in records]
-                is_fraud = [record['is_fraud'] for record in records]
+            # Đọc kết quả dạng stream và cộng dồn thống kê, không giữ toàn bộ record trong bộ nhớ
+            total = flagged_count = fraud_count = correct_flags = 0
+            out = open(output_file, 'w') if output_file else None
+            try:
+                if out:
+                    out.write("score,flagged,is_fraud\n")
+                for record in self.db_manager.stream_query(SCORE_DISTRIBUTION_QUERY):
+                    s, fl, fr = record['score'], record['flagged'], record['is_fraud']
+                    if out:
+                        out.write(f"{s},{fl},{fr}\n")
+                    total += 1
+                    flagged_count += 1 if fl else 0
+                    fraud_count += 1 if fr else 0
+                    correct_flags += 1 if fl and fr else 0
+            finally:
+                if out:
+                    out.close()
                 
-                # Create a simple visualization or export to file for external visualization
+            if total:
                 if output_file:
-                    # Export to CSV for external visualization
-                    with open(output_file, 'w') as f:
-                        f.write("score,flagged,is_fraud\n")
-                        for s, fl, fr in zip(scores, flagged, is_fraud):
-                            f.write(f"{s},{fl},{fr}\n")
                     print(f"✅ Đã xuất dữ liệu trực quan hóa ra file {output_file}")
                 
-                # Basic statistics for console output
-                flagged_count = sum(1 for f in flagged if f)
-                fraud_count = sum(1 for f in is_fraud if f)
-                correct_flags = sum(1 for fl, fr in zip(flagged, is_fraud) if fl and fr)
-                
                 print("\n📊 Thống kê trực quan:")
-                print(f"  • Tổng số giao dịch: {len(records)}")
+                print(f"  • Tổng số giao dịch: {total}")
                 print(f"  • Số giao dịch được đánh dấu bất thường: {flagged_count}")
                 print(f"  • Số giao dịch gian lận thực tế: {fraud_count}")
                 print(f"  • Số giao dịch gian lận đã phát hiện đúng: {correct_flags}")
                 
                 return {
-                    "total": len(records),
+                    "total": total,
                     "flagged": flagged_count,
                     "fraud": fraud_count,
                     "correct_flags": correct_flags
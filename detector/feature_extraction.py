@@ -1,35 +1,64 @@
-from .utils.config import FEATURE_WEIGHTS
+import numpy as np
+
+from .utils.config import (
+    FEATURE_WEIGHTS, TEMPORAL_ENGINE, BATCH_SIZE, DEFAULT_SCALER, FEATURE_SCALERS, SCALER_STATE_PATH
+)
 from .database_manager import DatabaseManager
+from .feature_scaling import (
+    NORMALIZED_FEATURES, ScalerState, get_scaler, raw_property, raw_value, to_query_params
+)
+from .temporal_features import (
+    ENGINE_CYPHER, ENGINE_NUMPY, compute_temporal_features, to_write_rows, compare_features
+)
 from .queries.feature_extraction_queries import (
-    TRANSACTION_VELOCITY_QUERY,
-    SIMPLE_VOLATILITY_QUERY,
-    BURST_DETECTION_QUERY,
-    TIME_PATTERNS_QUERY,
-    get_normalize_query,
-    get_rename_query,
-    get_default_query
+    TEMPORAL_FEATURES_QUERY,
+    TEMPORAL_TRANSACTIONS_QUERY,
+    WRITE_TEMPORAL_FEATURES_QUERY,
+    GET_TEMPORAL_FEATURES_QUERY,
+    get_feature_values_query,
+    get_scaler_stats_query,
+    get_scale_features_query,
+    get_restore_raw_features_query
 )
 
 class FeatureExtractor:
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, engine=TEMPORAL_ENGINE, scalers=None,
+                 scaler_state_path=SCALER_STATE_PATH):
+        """
+        Args:
+            engine: Engine tính đặc trưng thời gian ('cypher' hoặc 'numpy')
+            scalers: {đặc trưng: tên scaler} ghi đè FEATURE_SCALERS
+            scaler_state_path: File JSON lưu tham số scaler đã fit (None: không lưu)
+        """
         self.db_manager = db_manager
         self.weights = FEATURE_WEIGHTS
+        self.engine = engine
+        self.scalers = {**FEATURE_SCALERS, **(scalers or {})}
+        self.scaler_state_path = scaler_state_path
+        self.scaler_state = ScalerState(scaler_state_path)
     
-    def extract_temporal_features(self):
-        """Trích xuất các đặc trưng thời gian (temporal features) để phát hiện mẫu bất thường."""
-        print("🔄 Đang trích xuất đặc trưng thời gian...")
-        
-        # 1. Tính tốc độ giao dịch (giao dịch/giờ) trong cửa sổ thời gian
-        self.db_manager.run_query(TRANSACTION_VELOCITY_QUERY)
-        
-        # 2. Phát hiện sự thay đổi đột ngột trong số tiền giao dịch (sửa lại để hoạt động đúng)
-        self.db_manager.run_query(SIMPLE_VOLATILITY_QUERY)
+    def extract_temporal_features(self, engine=None):
+        """
+        Trích xuất các đặc trưng thời gian (temporal features) để phát hiện mẫu bất thường.
         
-        # 3. Phát hiện burst (nhiều giao dịch trong thời gian ngắn) - (Đã hoạt động)
-        self.db_manager.run_query(BURST_DETECTION_QUERY)
+        Args:
+            engine: 'cypher' (tính trong Neo4j) hoặc 'numpy' (đọc giao dịch, tính bằng NumPy và
+                    ghi lại theo lô); mặc định dùng engine của FeatureExtractor
+        """
+        engine = engine or self.engine
+        print(f"🔄 Đang trích xuất đặc trưng thời gian (engine {engine})...")
         
-        # 4. Thời gian trung bình và độ lệch chuẩn - (Đã hoạt động)
-        self.db_manager.run_query(TIME_PATTERNS_QUERY)
+        # Một lần duyệt giao dịch của mỗi tài khoản cho cả 6 đặc trưng: tốc độ giao dịch,
+        # biến động số tiền, tỷ lệ số tiền lớn nhất, burst, thời gian trung bình và độ lệch chuẩn
+        if engine == ENGINE_NUMPY:
+            features = self._compute_temporal_features_numpy()
+            self._write_temporal_features(features)
+            print(f"  - Đã cập nhật đặc trưng thời gian cho {len(features)} tài khoản.")
+        elif engine == ENGINE_CYPHER:
+            counters = self.db_manager.run_periodic(*TEMPORAL_FEATURES_QUERY)
+            print(f"  - Đã cập nhật {counters.get('properties_set', 0)} thuộc tính thời gian.")
+        else:
+            raise ValueError(f"Engine đặc trưng thời gian không hợp lệ: {engine}")
         
         # Cập nhật trọng số
         self.weights['txVelocity'] = 0.05
@@ -39,21 +68,135 @@ class FeatureExtractor:
         self.weights['stdTimeBetweenTx'] = 0.05
         
         print("✅ Đã trích xuất các đặc trưng thời gian.")
+    
+    def check_temporal_parity(self, tolerance=1e-6):
+        """
+        Chạy engine Cypher rồi so sánh giá trị trên đồ thị với engine NumPy.
+        
+        Phải gọi trước normalize_features (normalize ghi đè giá trị gốc, chỉ giữ bản thô ở *_raw).
+        
+        Returns:
+            dict: {đặc trưng: số tài khoản lệch}; rỗng nếu hai engine khớp nhau
+        """
+        print("🔄 Đang kiểm tra độ khớp giữa engine Cypher và NumPy...")
+        self.db_manager.run_periodic(*TEMPORAL_FEATURES_QUERY)
+        graph_features = self.db_manager.query_frame(GET_TEMPORAL_FEATURES_QUERY).set_index('id')
+        mismatches = compare_features(self._compute_temporal_features_numpy(), graph_features, tolerance)
+        
+        if mismatches:
+            print(f"⚠️ Hai engine lệch nhau: {mismatches}")
+        else:
+            print(f"✅ Hai engine khớp nhau trên {len(graph_features)} tài khoản.")
+        return mismatches
+    
+    def _compute_temporal_features_numpy(self):
+        transactions = self.db_manager.query_frame(TEMPORAL_TRANSACTIONS_QUERY)
+        return compute_temporal_features(transactions)
+    
+    def _write_temporal_features(self, features):
+        """Ghi kết quả engine NumPy về đồ thị theo lô BATCH_SIZE tài khoản bằng UNWIND."""
+        rows = to_write_rows(features)
+        for start in range(0, len(rows), BATCH_SIZE):
+            self.db_manager.run_query(WRITE_TEMPORAL_FEATURES_QUERY, {"rows": rows[start:start + BATCH_SIZE]})
         
-    def normalize_features(self):
-        """Min-max normalize tất cả các đặc trưng về khoảng [0, 1]."""
+    def normalize_features(self, refit=True, account_ids=None):
+        """
+        Normalize tất cả các đặc trưng về khoảng [0, 1] bằng scaler của từng đặc trưng.
+        
+        Các scaler cần fit được fit trong một lần đọc giá trị thô, sau đó giá trị normalize và
+        giá trị mặc định (0 cho node thiếu đặc trưng) được ghi trong một lần SET theo lô. Giá trị
+        thô được giữ ở `<feature>_raw` (chỉ chép khi chưa có) và mọi giá trị normalize được tính
+        từ bản thô đó, nên gọi lại không normalize hai lần; AnomalyDetector dùng bản thô để tính
+        lại điểm với trọng số khác mà không cần trích xuất lại. Trước khi trích xuất lại đặc
+        trưng cần gọi restore_raw_features để lần normalize sau nhận giá trị thô mới.
+        
+        Args:
+            refit: Fit lại mọi scaler; False thì dùng tham số đã lưu, chỉ fit đặc trưng chưa có
+            account_ids: Chỉ áp dụng cho các tài khoản này (lần chạy tăng dần, nên dùng với refit=False)
+        """
         print("🔄 Đang normalize các đặc trưng...")
         
-        features_to_normalize = [
-            'degScore', 'prScore', 'simScore', 'btwScore', 'hubScore', 
-            'authScore', 'coreScore', 'triCount', 'cycleCount', 'tempBurst',
-            'txVelocity', 'amountVolatility', 'maxAmountRatio', 'stdTimeBetweenTx'
-        ]
-        
-        for feature in features_to_normalize:
-            # Sử dụng các hàm tạo query thay vì hardcode truy vấn
-            self.db_manager.run_query(get_normalize_query(feature))
-            self.db_manager.run_query(get_rename_query(feature))
-            self.db_manager.run_query(get_default_query(feature))
-            
-        print("✅ Đã normalize xong tất cả các đặc trưng.")
\ No newline at end of file
+        # State được nạp theo dữ liệu hiện tại; state của lần import đầy đủ khác bị bỏ qua
+        self.scaler_state = ScalerState(self.scaler_state_path, self.db_manager.get_dataset_id()).load()
+        scaler_names = {feature: self.scalers.get(feature, DEFAULT_SCALER) for feature in NORMALIZED_FEATURES}
+        to_fit = [feature for feature in NORMALIZED_FEATURES
+                  if refit or self.scaler_state.get(feature, scaler_names[feature]) is None]
+        if to_fit:
+            self._fit_scalers(to_fit, scaler_names)
+        
+        params = {}
+        for feature in NORMALIZED_FEATURES:
+            params.update(to_query_params(feature, self.scaler_state.get(feature, scaler_names[feature])))
+        assignments = tuple(
+            (feature, raw_property(feature),
+             get_scaler(scaler_names[feature]).expression(feature, value=f"n.{raw_property(feature)}"))
+            for feature in NORMALIZED_FEATURES
+        )
+        if account_ids is not None:
+            params["account_ids"] = list(account_ids)
+        counters = self.db_manager.run_periodic(
+            *get_scale_features_query(assignments, restricted=account_ids is not None), params=params
+        )
+        
+        reused = len(NORMALIZED_FEATURES) - len(to_fit)
+        print(f"✅ Đã normalize xong {len(NORMALIZED_FEATURES)} đặc trưng "
+              f"(fit {len(to_fit)}, dùng lại {reused} scaler đã lưu; "
+              f"{counters.get('properties_set', 0)} thuộc tính được cập nhật).")
+    
+    def restore_raw_features(self, account_ids=None):
+        """
+        Đưa các đặc trưng đã normalize về giá trị thô đã lưu và xóa các thuộc tính `<feature>_raw`.
+        
+        Gọi trước khi trích xuất lại đặc trưng: giá trị mới ghi đè lên giá trị thô (các đặc trưng
+        không được tính lại, như tempBurst của tài khoản chỉ có một giao dịch, giữ giá trị thô
+        cũ thay vì giá trị đã normalize), và lần normalize sau chép lại bản thô mới.
+        
+        Args:
+            account_ids: Chỉ áp dụng cho các tài khoản này
+        """
+        pairs = tuple((feature, raw_property(feature)) for feature in NORMALIZED_FEATURES)
+        params = {"account_ids": list(account_ids)} if account_ids is not None else None
+        counters = self.db_manager.run_periodic(
+            *get_restore_raw_features_query(pairs, restricted=account_ids is not None), params=params
+        )
+        print(f"  - Đã khôi phục giá trị thô của các đặc trưng "
+              f"({counters.get('properties_set', 0)} thuộc tính được cập nhật).")
+    
+    def _fit_scalers(self, features, scaler_names):
+        """
+        Fit scaler cho `features` và lưu tham số vào scaler state.
+
+        Thống kê của các scaler có aggregation (min/max, phân vị) được tính trong một truy vấn
+        phía server; chỉ các đặc trưng dùng scaler cần toàn bộ phân phối mới đọc giá trị về.
+        Scaler luôn được fit trên giá trị thô (`<feature>_raw` nếu đã có).
+        """
+        scalers = {feature: get_scaler(scaler_names[feature]) for feature in features}
+        aggregates = {feature: scalers[feature].aggregates(feature, value=raw_value(feature))
+                      for feature in features}
+        to_aggregate = [feature for feature in features if aggregates[feature] is not None]
+        to_fetch = [feature for feature in features if aggregates[feature] is None]
+        
+        if to_aggregate:
+            columns = tuple(
+                (f"{feature}_{stat}", expression)
+                for feature in to_aggregate
+                for stat, expression in (*aggregates[feature], ("count", f"count({raw_value(feature)})"))
+            )
+            stats = self.db_manager.run_query(get_scaler_stats_query(columns), write=False)
+            for feature in to_aggregate:
+                feature_stats = {stat: stats[f"{feature}_{stat}"] for stat, _ in aggregates[feature]}
+                self._set_scaler(feature, scaler_names[feature], scalers[feature].fit_aggregates(feature_stats),
+                                 stats[f"{feature}_count"])
+        
+        if to_fetch:
+            values = self.db_manager.query_frame(get_feature_values_query(
+                tuple((feature, raw_value(feature)) for feature in to_fetch)
+            ))
+            for feature in to_fetch:
+                column = values[feature].dropna().to_numpy(dtype=np.float64) if feature in values else np.array([])
+                self._set_scaler(feature, scaler_names[feature], scalers[feature].fit(column), len(column))
+        self.scaler_state.save()
+    
+    def _set_scaler(self, feature, scaler_name, params, count):
+        self.scaler_state.set(feature, scaler_name, params, count)
+        print(f"  - {feature}: scaler {scaler_name} (fit trên {count} tài khoản)")
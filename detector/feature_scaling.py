@@ -0,0 +1,265 @@
+"""
+Registry các scaler dùng để normalize đặc trưng về khoảng [0, 1].
+
+Scaler chỉ cần thống kê tổng hợp (min/max, phân vị) khai báo các aggregation Cypher
+(`aggregates`) để fit trong một lần quét phía server, không phải kéo giá trị về client; scaler
+cần toàn bộ phân phối (rank) trả về None và được fit bằng NumPy trên các giá trị khác null.
+Mỗi scaler sinh biểu thức Cypher áp dụng với tham số đã fit (`$<feature>_<tên tham số>`), nên
+lần SET trên đồ thị không cần quét lại để tính thống kê. Tham số đã fit được lưu ở file JSON (ScalerState) để các lần
+chạy tăng dần áp dụng lại scaler cũ mà không cần fit lại trên toàn đồ thị.
+
+Giá trị thô được giữ ở thuộc tính `<feature>_raw`, nên anomaly score có thể normalize lại
+ngay khi tính điểm từ giá trị thô và tham số đã lưu mà không cần trích xuất lại đặc trưng.
+
+Quy ước chung: giá trị null -> 0; scaler suy biến (mọi giá trị bằng nhau) giữ nguyên giá trị.
+`expression(feature, value)` và `aggregates(feature, value)` đọc giá trị từ biểu thức Cypher
+`value` (mặc định `n.<feature>`).
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+# Số điểm phân vị lưu cho RankScaler (0%, 1%, ..., 100%)
+RANK_QUANTILES = 100
+
+# RobustScaler cắt z = (x - median) / IQR trong [-ROBUST_CLIP, ROBUST_CLIP] trước khi đưa về [0, 1]
+ROBUST_CLIP = 3.0
+
+# Các đặc trưng được normalize về [0, 1] trước khi tính anomaly score
+NORMALIZED_FEATURES = (
+    'degScore', 'prScore', 'simScore', 'btwScore', 'hubScore',
+    'authScore', 'coreScore', 'triCount', 'cycleCount', 'tempBurst',
+    'txVelocity', 'amountVolatility', 'maxAmountRatio', 'stdTimeBetweenTx'
+)
+
+# Hậu tố thuộc tính giữ giá trị thô của đặc trưng đã normalize
+RAW_SUFFIX = '_raw'
+
+
+def raw_property(feature):
+    """Tên thuộc tính giữ giá trị thô của `feature`."""
+    return f"{feature}{RAW_SUFFIX}"
+
+
+def raw_value(feature):
+    """Biểu thức Cypher cho giá trị thô: bản đã lưu ở `<feature>_raw`, nếu chưa có thì chính `n.<feature>`."""
+    return f"coalesce(n.{raw_property(feature)}, n.{feature})"
+
+
+def _param(feature, name):
+    return f"${feature}_{name}"
+
+
+def _value(feature, value):
+    return value or f"n.{feature}"
+
+
+def _float(value):
+    return None if value is None else float(value)
+
+
+class MinMaxScaler:
+    """(x - min) / (max - min)."""
+
+    name = 'minmax'
+
+    def fit(self, values):
+        if len(values) == 0:
+            return {"min": None, "max": None}
+        return {"min": float(values.min()), "max": float(values.max())}
+
+    def aggregates(self, feature, value=None):
+        """Các cặp (tên thống kê, aggregation Cypher) cần để fit; None nếu phải fit bằng NumPy."""
+        x = self._transform(_value(feature, value))
+        return (("min", f"min({x})"), ("max", f"max({x})"))
+
+    def fit_aggregates(self, stats):
+        """Tham số đã fit từ kết quả các aggregation (null khi đặc trưng không có giá trị)."""
+        return {"min": _float(stats["min"]), "max": _float(stats["max"])}
+
+    @staticmethod
+    def _transform(x):
+        return x
+
+    def expression(self, feature, value=None):
+        x, low, high = _value(feature, value), _param(feature, "min"), _param(feature, "max")
+        return (f"CASE WHEN coalesce({high} = {low}, true) THEN {x} "
+                f"ELSE ({x} - {low}) / toFloat({high} - {low}) END")
+
+
+class LogMinMaxScaler(MinMaxScaler):
+    """Min-max trên sign(x) * log1p(|x|), giảm ảnh hưởng của outlier ở đặc trưng lệch phải."""
+
+    name = 'log_minmax'
+
+    def fit(self, values):
+        return super().fit(np.sign(values) * np.log1p(np.abs(values)))
+
+    @staticmethod
+    def _transform(x):
+        return f"sign({x}) * log(1 + abs({x}))"
+
+    def expression(self, feature, value=None):
+        value = _value(feature, value)
+        x = self._transform(value)
+        low, high = _param(feature, "min"), _param(feature, "max")
+        return (f"CASE WHEN coalesce({high} = {low}, true) THEN {value} "
+                f"ELSE ({x} - {low}) / toFloat({high} - {low}) END")
+
+
+class RankScaler:
+    """Phân vị của x, nội suy tuyến tính giữa RANK_QUANTILES + 1 điểm phân vị đã fit."""
+
+    name = 'rank'
+
+    def fit(self, values):
+        if len(values) == 0:
+            return {"quantiles": None}
+        quantiles = np.quantile(values, np.linspace(0, 1, RANK_QUANTILES + 1))
+        return {"quantiles": [float(q) for q in quantiles]}
+
+    def aggregates(self, feature, value=None):
+        # RANK_QUANTILES + 1 percentileCont riêng lẻ đắt hơn fit một lần trên giá trị đã đọc về
+        return None
+
+    def expression(self, feature, value=None):
+        x, q = _value(feature, value), _param(feature, "quantiles")
+        last = RANK_QUANTILES
+        # c = số điểm phân vị <= x, nên q[c-1] <= x < q[c] và mẫu số luôn dương
+        return (f"CASE WHEN coalesce({q}[0] = {q}[{last}], true) THEN {x} "
+                f"WHEN {x} <= {q}[0] THEN 0.0 WHEN {x} >= {q}[{last}] THEN 1.0 "
+                f"ELSE [c IN [size([b IN {q} WHERE b <= {x}])] | "
+                f"(c - 1 + ({x} - {q}[c - 1]) / toFloat({q}[c] - {q}[c - 1])) / {last}.0][0] END")
+
+
+class RobustScaler:
+    """
+    (x - median) / IQR, cắt trong [-clip, clip] rồi đưa về [0, 1] (median -> 0.5).
+
+    IQR bằng 0 (đặc trưng thưa, phần lớn giá trị bằng nhau) thì dùng max - min làm thang đo.
+    """
+
+    name = 'robust'
+
+    def __init__(self, clip=ROBUST_CLIP):
+        self.clip = clip
+
+    def fit(self, values):
+        if len(values) == 0:
+            return {"median": None, "scale": None, "clip": self.clip}
+        q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+        scale = q3 - q1 if q3 > q1 else values.max() - values.min()
+        return {"median": float(median), "scale": float(scale), "clip": self.clip}
+
+    def aggregates(self, feature, value=None):
+        # percentileCont nội suy tuyến tính như np.quantile
+        x = _value(feature, value)
+        return (("q1", f"percentileCont({x}, 0.25)"), ("median", f"percentileCont({x}, 0.5)"),
+                ("q3", f"percentileCont({x}, 0.75)"), ("min", f"min({x})"), ("max", f"max({x})"))
+
+    def fit_aggregates(self, stats):
+        if stats["median"] is None:
+            return {"median": None, "scale": None, "clip": self.clip}
+        q1, q3 = stats["q1"], stats["q3"]
+        scale = q3 - q1 if q3 > q1 else stats["max"] - stats["min"]
+        return {"median": float(stats["median"]), "scale": float(scale), "clip": self.clip}
+
+    def expression(self, feature, value=None):
+        x = _value(feature, value)
+        median, scale, clip = _param(feature, "median"), _param(feature, "scale"), _param(feature, "clip")
+        return (f"CASE WHEN coalesce({scale} = 0, true) THEN {x} "
+                f"ELSE [z IN [({x} - {median}) / toFloat({scale})] | "
+                f"CASE WHEN z < -{clip} THEN 0.0 WHEN z > {clip} THEN 1.0 "
+                f"ELSE (z + {clip}) / (2.0 * {clip}) END][0] END")
+
+
+SCALERS = {scaler.name: scaler for scaler in (MinMaxScaler, LogMinMaxScaler, RankScaler, RobustScaler)}
+
+
+def get_scaler(name):
+    """Tạo scaler theo tên trong registry SCALERS."""
+    if name not in SCALERS:
+        raise ValueError(f"Scaler không hợp lệ: {name} (hỗ trợ: {', '.join(SCALERS)})")
+    return SCALERS[name]()
+
+
+def register_scaler(scaler_class):
+    """
+    Thêm một scaler vào registry.
+
+    Class cần có name, fit(values), expression(feature, value) và aggregates(feature, value)
+    (trả về None nếu chỉ fit được bằng NumPy) cùng fit_aggregates(stats) nếu aggregates khác None.
+    """
+    SCALERS[scaler_class.name] = scaler_class
+    return scaler_class
+
+
+def to_query_params(feature, params):
+    """Đổi tham số đã fit của một đặc trưng thành tham số truy vấn `<feature>_<tên>`."""
+    return {f"{feature}_{name}": value for name, value in params.items()}
+
+
+class ScalerState:
+    """
+    Tham số đã fit của từng đặc trưng, lưu ở file JSON cục bộ.
+
+    State được gắn với `dataset_id` (mã lần import đầy đủ, xem DatabaseManager.get_dataset_id):
+    state của dữ liệu khác (import lại, hoặc database đã bị xóa) được bỏ qua khi nạp.
+    """
+
+    def __init__(self, path, dataset_id=None):
+        self.path = path
+        self.dataset_id = dataset_id
+        self.features = {}
+
+    def load(self):
+        """Nạp state đã lưu (bỏ qua nếu chưa có, file hỏng hoặc thuộc dữ liệu khác)."""
+        if not self.path or not os.path.exists(self.path):
+            return self
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Không đọc được scaler state {self.path}: {e}, sẽ fit lại")
+            self.features = {}
+            return self
+        if data.get("dataset_id") != self.dataset_id:
+            print(f"ℹ️ Scaler state {self.path} thuộc dữ liệu khác "
+                  f"(import {data.get('dataset_id')}), sẽ fit lại")
+            self.features = {}
+        else:
+            self.features = data.get("features", {})
+        return self
+
+    def get(self, feature, scaler_name):
+        """Tham số đã fit của `feature`, chỉ khi được fit bằng đúng scaler `scaler_name`."""
+        entry = self.features.get(feature)
+        if entry and entry.get("scaler") == scaler_name:
+            return entry["params"]
+        return None
+
+    def fitted(self, feature):
+        """(tên scaler, tham số) đã fit cho `feature`, hoặc None nếu chưa fit."""
+        entry = self.features.get(feature)
+        if entry:
+            return entry["scaler"], entry["params"]
+        return None
+
+    def set(self, feature, scaler_name, params, count):
+        self.features[feature] = {
+            "scaler": scaler_name,
+            "params": params,
+            "count": count,
+            "fitted_at": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+    def save(self):
+        if not self.path:
+            return
+        # Ghi ra file tạm rồi đổi tên để state không bị hỏng nếu tiến trình chết giữa chừng
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"dataset_id": self.dataset_id, "features": self.features}, f, indent=2)
+        os.replace(tmp_path, self.path)
@@ -3,6 +3,7 @@ from .database_manager import DatabaseManager
 from .feature_extraction import FeatureExtractor
 from .graph_algorithms import GraphAlgorithms
 from .anomaly_detection import AnomalyDetector
+from .feature_scaling import NORMALIZED_FEATURES, raw_property
 from .evaluation import EvaluationManager
 from .utils.config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, DEFAULT_PERCENTILE
 from .queries.fraud_detector_queries import (
@@ -29,7 +30,8 @@ class FraudDetector:
               # Khởi tạo các thành phần con
         self.feature_extractor = FeatureExtractor(self.db_manager)
         self.graph_algorithms = GraphAlgorithms(self.db_manager)
-        self.anomaly_detector = AnomalyDetector(self.db_manager, percentile_cutoff=DEFAULT_PERCENTILE)
+        self.anomaly_detector = AnomalyDetector(self.db_manager, percentile_cutoff=DEFAULT_PERCENTILE,
+                                                scaler_state_path=self.feature_extractor.scaler_state_path)
         self.evaluation = EvaluationManager(self.db_manager)
         
         # Config
@@ -148,7 +150,8 @@ class FraudDetector:
         added_properties = [
             'degScore', 'prScore', 'communityId', 'communitySize', 'normCommunitySize',
             'simScore', 'btwScore', 'hubScore', 'authScore', 'coreScore', 'triCount',
-            'cycleCount', 'tempBurst', 'tempBurst1h', 'tempBurst24h', 'anomaly_score', 'flagged'
+            'cycleCount', 'tempBurst', 'tempBurst1h', 'tempBurst24h', 'anomaly_score', 'flagged',
+            *(raw_property(feature) for feature in NORMALIZED_FEATURES)
         ]
         
         try:
@@ -184,22 +187,30 @@ class FraudDetector:
             self.anomaly_detector.percentile_cutoff = percentile_cutoff
             
         start_time = time.time()
+        profiler = self.db_manager.profiler
+        profiler.reset()
         
         print("=" * 50)
         print("🚀 Bắt đầu chạy pipeline phát hiện bất thường không giám sát")
         print("=" * 50)
         
         # 1. Chuẩn bị dữ liệu ground truth
-        self.prepare_ground_truth()
+        with profiler.stage("prepare_ground_truth"):
+            self.prepare_ground_truth()
 
         # 2. Kiểm tra và sửa lỗi dữ liệu
-        self.examine_data()
+        with profiler.stage("examine_data"):
+            self.examine_data()
         
         # 3. Tạo graph projections
-        self.db_manager.create_graph_projections()
+        with profiler.stage("graph_projections"):
+            self.db_manager.create_graph_projections()
 
-        # 4. Trích xuất đặc trưng thời gian
-        self.feature_extractor.extract_temporal_features()
+        # 4. Trích xuất đặc trưng thời gian (trước đó khôi phục giá trị thô của lần chạy trước
+        # để normalize lần này chép lại đúng bản thô mới)
+        with profiler.stage("temporal_features"):
+            self.feature_extractor.restore_raw_features()
+            self.feature_extractor.extract_temporal_features()
         
         # 5. Chạy các thuật toán Graph Data Science
         self.graph_algorithms = GraphAlgorithms(
@@ -208,39 +219,75 @@ class FraudDetector:
             self.db_manager.similarity_graph_name,
             self.db_manager.temporal_graph_name
         )
-        self.graph_algorithms.run_algorithms()
+        with profiler.stage("graph_algorithms"):
+            self.graph_algorithms.run_algorithms()
         
         # 6. Normalize các đặc trưng
-        self.feature_extractor.normalize_features()
+        with profiler.stage("normalize_features"):
+            self.feature_extractor.normalize_features()
         
         # 7. Tính toán anomaly score
-        self.anomaly_detector.compute_anomaly_scores()
+        with profiler.stage("anomaly_scores"):
+            self.anomaly_detector.compute_anomaly_scores()
         
         # 8. Đánh dấu các giao dịch bất thường
-        self.anomaly_detector.flag_anomalies(self.percentile_cutoff)
+        with profiler.stage("flag_anomalies"):
+            self.anomaly_detector.flag_anomalies(self.percentile_cutoff)
         
         # 9. Đánh giá hiệu suất
-        metrics = self.evaluation.evaluate_performance()
+        with profiler.stage("evaluation"):
+            metrics = self.evaluation.evaluate_performance()
         
         # 10. Phân tích tầm quan trọng của các đặc trưng
-        feature_importances = self.evaluation.analyze_feature_importance(self.feature_extractor.weights)
+        with profiler.stage("feature_importance"):
+            feature_importances = self.evaluation.analyze_feature_importance(self.feature_extractor.weights)
 
         # 11. Xóa các graph projections
-        self.db_manager.delete_graph_projections()
+        with profiler.stage("cleanup"):
+            self.db_manager.delete_graph_projections()
 
         # 12. Dọn dẹp các thuộc tính và mối quan hệ không cần thiết
         # cleanup_result = self.db_manager.cleanup_properties()
 
+        # Kết quả phân tích đã thay đổi đồ thị, snapshot thống kê của dashboard cần nạp lại
+        self.db_manager.invalidate_stats()
+
         end_time = time.time()
         execution_time = end_time - start_time
         
         print("\n⏱️ Thời gian thực thi: {:.2f} giây".format(execution_time))
+        query_metrics = self.db_manager.get_query_metrics()
+        print(f"🔁 Transaction: {query_metrics['write']} ghi ({query_metrics['write_retries']} lần retry), "
+              f"{query_metrics['read']} đọc ({query_metrics['read_retries']} lần retry), "
+              f"{query_metrics['auto_commit']} auto-commit")
+        profiler.report()
         print("=" * 50)
         print("✅ Hoàn thành pipeline phát hiện bất thường không giám sát")
         print("=" * 50)
         
-        return metrics  
-      
+        return metrics
+
+    def rescore(self, weights=None, percentile_cutoff=None):
+        """
+        Tính lại anomaly score, đánh dấu và đánh giá với bộ trọng số khác, bỏ qua trích xuất đặc trưng.
+
+        Dùng giá trị thô và tham số scaler do lần chạy run_pipeline trước đó lưu lại.
+
+        Args:
+            weights: {đặc trưng: trọng số}; None dùng trọng số của AnomalyDetector
+            percentile_cutoff: Ngưỡng phân vị; None dùng self.percentile_cutoff
+        """
+        if percentile_cutoff is not None:
+            self.percentile_cutoff = percentile_cutoff
+
+        self.anomaly_detector.compute_anomaly_scores(weights)
+        self.anomaly_detector.flag_anomalies(self.percentile_cutoff)
+        metrics = self.evaluation.evaluate_performance()
+
+        # Điểm và cờ đánh dấu đã thay đổi, snapshot thống kê của dashboard cần nạp lại
+        self.db_manager.invalidate_stats()
+        return metrics
+
     def get_suspicious_accounts(self, threshold=None, min_flagged_tx=1):
         """
         Lấy các tài khoản đáng ngờ dựa trên điểm bất thường và số giao dịch bị đánh dấu.
@@ -290,15 +337,7 @@ class FraudDetector:
         print(f"Executing query with params: {params}")
         
         # Ensure correct result handling
-        results = self.db_manager.run_query(query, params)
-        
-        # Convert to list if it's a single result
-        if isinstance(results, dict):
-            suspicious_accounts = [results]
-        elif isinstance(results, list):
-            suspicious_accounts = results
-        else:
-            suspicious_accounts = []
+        suspicious_accounts = list(self.db_manager.stream_query(query, params))
         
         # If no accounts found, try a direct approach
         if not suspicious_accounts:
@@ -327,15 +366,7 @@ class FraudDetector:
             LIMIT 10
             """
             
-            alt_results = self.db_manager.run_query(alt_query)
-            
-            # Handle results appropriately
-            if isinstance(alt_results, dict):
-                suspicious_accounts = [alt_results]
-            elif isinstance(alt_results, list):
-                suspicious_accounts = alt_results
-            else:
-                suspicious_accounts = []
+            suspicious_accounts = list(self.db_manager.stream_query(alt_query))
         
         # Display results
         if suspicious_accounts:
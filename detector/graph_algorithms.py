@@ -2,36 +2,38 @@ import time
 from .database_manager import DatabaseManager
 from .queries.graph_algorithms_queries import (
     # Degree Centrality
-    get_degree_query,
+    DEGREE_QUERY,
     
     # PageRank
-    get_pagerank_query,
+    PAGERANK_QUERY,
     
     # Community Detection
-    get_community_query,
+    COMMUNITY_QUERY,
     COMMUNITY_SIZE_QUERY,
     
     # Node Similarity
-    get_similarity_query,
-    get_fallback_similarity_query,
-    SET_DEFAULT_SIM_QUERY,
+    SIMILARITY_QUERY,
+    FALLBACK_SIMILARITY_QUERY,
     
     # Betweenness Centrality
-    get_betweenness_query,
+    BETWEENNESS_QUERY,
     
     # HITS Algorithm
-    get_hits_query,
+    HITS_QUERY,
+    
+    # Tên các graph vô hướng tạm
+    get_kcore_graph_name,
+    get_triangle_graph_name,
     
     # K-Core
-    get_kcore_projection_query,
-    get_kcore_query,
-    get_kcore_cleanup_query,
+    KCORE_PROJECTION_QUERY,
+    KCORE_QUERY,
+    KCORE_CLEANUP_QUERY,
     
     # Triangle Count
-    get_triangle_projection_query,
-    get_triangle_query,
-    get_triangle_cleanup_query,
-    SET_DEFAULT_TRI_QUERY,
+    TRIANGLE_PROJECTION_QUERY,
+    TRIANGLE_QUERY,
+    TRIANGLE_CLEANUP_QUERY,
     
     # Cycle Detection
     CYCLE_QUERY,
@@ -57,15 +59,15 @@ class GraphAlgorithms:
         
         # 1. Degree Centrality
         print("  - Đang chạy Degree Centrality...")
-        self.db_manager.run_query(get_degree_query(self.main_graph_name))
+        self.db_manager.run_query(DEGREE_QUERY, {"graph_name": self.main_graph_name})
         
         # 2. PageRank
         print("  - Đang chạy PageRank...")
-        self.db_manager.run_query(get_pagerank_query(self.main_graph_name))
+        self.db_manager.run_query(PAGERANK_QUERY, {"graph_name": self.main_graph_name})
         
         # 3. Louvain Community Detection
         print("  - Đang chạy Louvain Community Detection...")
-        self.db_manager.run_query(get_community_query(self.main_graph_name))
+        self.db_manager.run_query(COMMUNITY_QUERY, {"graph_name": self.main_graph_name})
 
         print("  - Đã chạy Louvain Community Detection. Đang tính toán kích thước cộng đồng...")
 
@@ -75,47 +77,43 @@ class GraphAlgorithms:
         # 4. Node Similarity (Jaccard) - chỉ chạy cho các Account
         print("  - Đang chạy Node Similarity (Jaccard)...")
         try:
-            self.db_manager.run_query(get_similarity_query(self.similarity_graph_name))
+            self.db_manager.run_query(SIMILARITY_QUERY, {"graph_name": self.similarity_graph_name})
         except Exception as e:
             print(f"Lỗi khi chạy Node Similarity: {e}")
             # Sử dụng cách thay thế: Stream một lượng nhỏ kết quả và ghi vào đồ thị
-            self.db_manager.run_query(get_fallback_similarity_query(self.similarity_graph_name))
-
-        # Gán simScore mặc định = 0 cho các node chưa có score
-        self.db_manager.run_query(SET_DEFAULT_SIM_QUERY)
+            self.db_manager.run_query(FALLBACK_SIMILARITY_QUERY, {"graph_name": self.similarity_graph_name})
         
         # 5. Betweenness Centrality
         print("  - Đang chạy Betweenness Centrality...")
-        self.db_manager.run_query(get_betweenness_query(self.main_graph_name))
+        self.db_manager.run_query(BETWEENNESS_QUERY, {"graph_name": self.main_graph_name})
         
         # 6. HITS (Hub and Authority Scores)
         print("  - Đang chạy HITS algorithm...")
-        self.db_manager.run_query(get_hits_query(self.main_graph_name))
+        self.db_manager.run_query(HITS_QUERY, {"graph_name": self.main_graph_name})
         
         # 7. K-Core Decomposition
         print("  - Đang chạy K-Core Decomposition...")
         # Create a specific undirected graph for K-Core
-        self.db_manager.run_query(get_kcore_projection_query(self.main_graph_name))
+        kcore_graph_name = get_kcore_graph_name(self.main_graph_name)
+        self.db_manager.run_query(KCORE_PROJECTION_QUERY, {"graph_name": kcore_graph_name})
 
         # Then run K-Core on the undirected graph
-        self.db_manager.run_query(get_kcore_query(self.main_graph_name))
+        self.db_manager.run_query(KCORE_QUERY, {"graph_name": kcore_graph_name})
 
         # Clean up the temporary graph
-        self.db_manager.run_query(get_kcore_cleanup_query(self.main_graph_name))
+        self.db_manager.run_query(KCORE_CLEANUP_QUERY, {"graph_name": kcore_graph_name})
         
         # 8. Clustering Coefficient (Triangle Count)
         print("  - Đang chạy Triangle Count...")
         # Create a specific undirected graph for Triangle Count (or reuse the K-Core graph)
-        self.db_manager.run_query(get_triangle_projection_query(self.main_graph_name))
+        triangle_graph_name = get_triangle_graph_name(self.main_graph_name)
+        self.db_manager.run_query(TRIANGLE_PROJECTION_QUERY, {"graph_name": triangle_graph_name})
 
         # Run Triangle Count on the undirected graph
-        self.db_manager.run_query(get_triangle_query(self.main_graph_name))
+        self.db_manager.run_query(TRIANGLE_QUERY, {"graph_name": triangle_graph_name})
 
         # Clean up the temporary graph
-        self.db_manager.run_query(get_triangle_cleanup_query(self.main_graph_name))
-        
-        # Gán triCount mặc định = 0 cho các node chưa có score
-        self.db_manager.run_query(SET_DEFAULT_TRI_QUERY)
+        self.db_manager.run_query(TRIANGLE_CLEANUP_QUERY, {"graph_name": triangle_graph_name})
         
         # 9. Motif/Cycle Detection (sử dụng APOC)
         print("  - Đang chạy Motif/Cycle Detection...")
@@ -125,7 +123,8 @@ class GraphAlgorithms:
         print("  - Đang chạy Temporal Burst Analysis...")
         self.db_manager.run_query(TEMPORAL_BURST_QUERY)
         
-        # Gán các giá trị mặc định cho node nếu chưa có
-        self.db_manager.run_query(SET_DEFAULT_VALUES_QUERY)
+        # Gán các giá trị mặc định (simScore, triCount và các đặc trưng khác) cho node chưa có,
+        # commit theo lô vì truy vấn chạm tới mọi tài khoản
+        self.db_manager.run_periodic(*SET_DEFAULT_VALUES_QUERY)
         
         print("✅ Đã chạy xong tất cả các thuật toán.")
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""
+Manifest tiến độ cho import streaming, lưu ở file JSON cục bộ.
+
+Checkpoint được ghi sau khi toàn bộ batch của một chunk đã commit. Khi import bị
+gián đoạn, lần chạy sau bỏ qua các chunk đã commit và gửi lại chunk dang dở bằng
+truy vấn idempotent (dựa trên row_id của SENT) nên các giao dịch đã ghi không bị
+tạo trùng.
+"""
+import json
+import os
+import time
+
+
+class ImportCheckpoint:
+    def __init__(self, path, csv_path, chunksize):
+        self.path = path
+        stat = os.stat(csv_path)
+        # Checkpoint chỉ hợp lệ cho đúng file và đúng cách chia chunk đã dùng
+        self.fingerprint = {
+            "csv_path": os.path.abspath(csv_path),
+            "csv_size": stat.st_size,
+            "csv_mtime": stat.st_mtime,
+            "chunksize": chunksize
+        }
+
+    def load(self):
+        """Trả về chỉ số chunk đầu tiên chưa commit, hoặc None nếu chưa có checkpoint hợp lệ."""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Không đọc được checkpoint {self.path}: {e}, import lại từ đầu")
+            return None
+
+        if state.get("fingerprint") != self.fingerprint:
+            print(f"⚠️ Checkpoint {self.path} thuộc về file/cấu hình khác, import lại từ đầu")
+            return None
+        return state.get("next_chunk", 0)
+
+    def commit(self, next_chunk, next_row, transactions):
+        """Ghi nhận các chunk < next_chunk (tương ứng các dòng < next_row) đã commit."""
+        state = {
+            "fingerprint": self.fingerprint,
+            "next_chunk": next_chunk,
+            "next_row": next_row,
+            "transactions": transactions,
+            "updated_at": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        # Ghi ra file tạm rồi đổi tên để checkpoint không bị hỏng nếu tiến trình chết giữa chừng
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """Xóa checkpoint sau khi import hoàn tất."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,69 +1,85 @@
 """
 Chứa tất cả các truy vấn CQL cho module phát hiện bất thường
 """
+from functools import lru_cache
 
-# Truy vấn liên quan đến anomaly detection
-COMPUTE_ANOMALY_SCORE = """
-MATCH (a:Account)
-WITH a, 
-    a.degScore AS degScore, 
-    a.prScore AS prScore,
-    a.simScore AS simScore,
-    a.btwScore AS btwScore,
-    a.hubScore AS hubScore,
-    a.authScore AS authScore,
-    a.coreScore AS coreScore,
-    a.triCount AS triCount,
-    a.cycleCount AS cycleCount,
-    a.tempBurst AS tempBurst,
-    a.txVelocity AS txVelocity,
-    a.amountVolatility AS amountVolatility,
-    a.maxAmountRatio AS maxAmountRatio,
-    a.stdTimeBetweenTx AS stdTimeBetweenTx,
-    a.normCommunitySize AS normCommunitySize
+from .registry import check_identifiers
 
-// Tính anomaly score = weighted sum của các đặc trưng, tập trung vào degScore và maxAmountRatio
-WITH a, 
-    (degScore * 0.60) + 
-    (prScore * 0.02) + 
-    (simScore * 0.01) + 
-    (btwScore * 0.02) + 
-    (hubScore * 0.08) + 
-    (authScore * 0.01) + 
-    (coreScore * 0.01) + 
-    (triCount * 0.01) + 
-    (cycleCount * 0.01) + 
-    (tempBurst * 0.05) + 
-    (txVelocity * 0.01) +
-    (amountVolatility * 0.02) +
-    (maxAmountRatio * 0.12) +
-    (stdTimeBetweenTx * 0.01) +
-    (0.02 * (1 - coalesce(normCommunitySize, 0))) AS score
-SET a.anomaly_score = score
-"""
-
-TRANSFER_SCORE_TO_RELATIONSHIP = """
-MATCH (a:Account)-[r:SENT]->()
-SET r.anomaly_score = a.anomaly_score
-"""
+# Anomaly score = weighted sum của các đặc trưng đã normalize, trọng số truyền qua $weights.
+# Đặc trưng có scaler đã lưu được normalize ngay từ giá trị thô `<feature>_raw` với tham số
+# $<feature>_<tên tham số>, nên đổi trọng số hay scaler không cần trích xuất lại đặc trưng;
+# thiếu giá trị thô thì dùng giá trị đã normalize trên node. Văn bản truy vấn chỉ phụ thuộc
+# vào bộ đặc trưng và scaler, nên được tạo một lần và cache lại.
+@lru_cache(maxsize=None)
+def get_anomaly_score_query(terms):
+    """
+    Truy vấn dạng (match_clause, variables, update_clause) cho DatabaseManager.run_periodic.
 
-def get_flag_anomalies_query(percentile_cutoff):
-    """Trả về truy vấn đánh dấu giao dịch bất thường với ngưỡng phân vị được chỉ định."""
-    return f"""
-    MATCH ()-[tx:SENT]->()
-    WITH percentileCont(tx.anomaly_score, {percentile_cutoff}) AS threshold
-    MATCH ()-[tx2:SENT]->()
-    WHERE tx2.anomaly_score >= threshold
-    SET tx2.flagged = true
-    RETURN threshold, COUNT(tx2) AS flagged_count
+    Args:
+        terms: tuple các cặp (đặc trưng, biểu thức Cypher của scaler đọc từ giá trị thô, hoặc
+               None nếu đặc trưng chưa có scaler đã lưu)
     """
+    check_identifiers(features=tuple(feature for feature, _ in terms))
+    parts = [
+        f"$weights.{feature} * coalesce({expression}, n.{feature}, 0)" if expression
+        else f"$weights.{feature} * coalesce(n.{feature}, 0)"
+        for feature, expression in terms
+    ]
+    # Cộng đồng càng nhỏ thì điểm càng cao
+    parts.append("$weights.normCommunitySize * (1 - coalesce(n.normCommunitySize, 0))")
+    return ("MATCH (n:Account)", "n", "SET n.anomaly_score = " + " +\n    ".join(parts))
+
+# Các cập nhật toàn đồ thị dạng (match_clause, variables, update_clause),
+# chạy theo lô bằng DatabaseManager.run_periodic
+TRANSFER_SCORE_TO_RELATIONSHIP = (
+    "MATCH (a:Account)-[r:SENT]->() WHERE a.anomaly_score IS NOT NULL",
+    "a, r",
+    "SET r.anomaly_score = a.anomaly_score"
+)
+
+FIX_NULL_ACCOUNT_SCORES = (
+    "MATCH (a:Account) WHERE a.anomaly_score IS NULL",
+    "a",
+    "SET a.anomaly_score = 0.0"
+)
 
-DEFAULT_FLAG = """
-MATCH ()-[tx:SENT]->()
-WHERE tx.flagged IS NULL
-SET tx.flagged = false
+FIX_NULL_RELATIONSHIP_SCORES = (
+    "MATCH (sender:Account)-[r:SENT]->() WHERE r.anomaly_score IS NULL",
+    "sender, r",
+    "SET r.anomaly_score = COALESCE(sender.anomaly_score, 0.0)"
+)
+
+DEFAULT_FLAG = (
+    "MATCH ()-[tx:SENT]->() WHERE tx.flagged IS NULL",
+    "tx",
+    "SET tx.flagged = false"
+)
+
+RESET_FLAGS = (
+    "MATCH ()-[tx:SENT]->() WHERE tx.flagged = true",
+    "tx",
+    "SET tx.flagged = false"
+)
+
+# Ngưỡng đánh dấu: giá trị lớn nhất giữa ngưỡng phân vị, trung bình + 3*độ lệch chuẩn
+# và 80% điểm lớn nhất (so sánh theo thứ tự như khi tính trong một truy vấn)
+FLAG_THRESHOLD_QUERY = """
+MATCH ()-[r:SENT]->()
+WITH AVG(r.anomaly_score) AS avg_score, STDEV(r.anomaly_score) AS std_score, MAX(r.anomaly_score) AS max_score,
+     percentileCont(r.anomaly_score, $percentile) AS perc_threshold
+RETURN CASE
+    WHEN perc_threshold > (avg_score + 3 * std_score) THEN perc_threshold
+    WHEN (avg_score + 3 * std_score) > (max_score * 0.8) THEN avg_score + 3 * std_score
+    ELSE max_score * 0.8
+END AS threshold
 """
 
+FLAG_ABOVE_THRESHOLD = (
+    "MATCH ()-[tx:SENT]->() WHERE tx.anomaly_score >= $threshold",
+    "tx",
+    "SET tx.flagged = true"
+)
+
 EXPORT_ANOMALY_SCORES = """
 MATCH ()-[r:SENT]->()
 WHERE r.anomaly_score IS NOT NULL
@@ -1,9 +1,33 @@
 """
 Chứa tất cả các truy vấn Cypher sử dụng trong DatabaseManager
 """
+from functools import lru_cache
+
+from .registry import render
 
 # Queries liên quan đến setup và index
-CREATE_ACCOUNT_INDEX = "CREATE INDEX IF NOT EXISTS FOR (a:Account) ON (a.id)"
+# Ràng buộc duy nhất trên Account.id (đồng thời tạo index cho mọi lookup theo id)
+CREATE_ACCOUNT_ID_CONSTRAINT = """
+CREATE CONSTRAINT account_id_unique IF NOT EXISTS
+FOR (a:Account) REQUIRE a.id IS UNIQUE
+"""
+
+# Index thường trên Account.id (phiên bản cũ) phải được xóa trước khi tạo constraint
+FIND_PLAIN_ACCOUNT_ID_INDEXES = """
+SHOW INDEXES YIELD name, labelsOrTypes, properties, owningConstraint
+WHERE labelsOrTypes = ['Account'] AND properties = ['id'] AND owningConstraint IS NULL
+RETURN name
+"""
+
+# Các thuộc tính SENT được pipeline dùng để lọc
+SENT_INDEXED_PROPERTIES = ['step', 'flagged', 'anomaly_score', 'ground_truth_fraud']
+
+def get_sent_property_index_query(prop):
+    """Tạo truy vấn index cho một thuộc tính của relationship SENT."""
+    return f"CREATE INDEX sent_{prop} IF NOT EXISTS FOR ()-[r:SENT]-() ON (r.{prop})"
+
+def get_drop_index_query(index_name):
+    return f"DROP INDEX `{index_name}` IF EXISTS"
 
 # Queries liên quan đến import data
 CREATE_ACCOUNTS_QUERY = """
@@ -11,11 +35,18 @@ UNWIND $accounts AS id
 MERGE (a:Account {id: id})
 """
 
+# Dùng khi chắc chắn các tài khoản chưa tồn tại (database trống, đã dedup phía Python)
+CREATE_NEW_ACCOUNTS_QUERY = """
+UNWIND $accounts AS id
+CREATE (:Account {id: id})
+"""
+
 CREATE_TRANSACTIONS_QUERY = """
 UNWIND $batch AS tx
 MATCH (from:Account {id: tx.from_ac})
 MATCH (to:Account {id: tx.to_ac})
 CREATE (from)-[r:SENT {
+    row_id: tx.row_id,
     amount: tx.amount,
     step: tx.step,
     is_fraud: tx.is_fraud,
@@ -23,85 +54,181 @@ CREATE (from)-[r:SENT {
 }]->(to)
 """
 
+# Bỏ qua các giao dịch đã được tạo (cùng row_id) khi gửi lại batch sau khi import bị gián đoạn
+CREATE_TRANSACTIONS_IDEMPOTENT_QUERY = """
+UNWIND $batch AS tx
+MATCH (from:Account {id: tx.from_ac})
+MATCH (to:Account {id: tx.to_ac})
+OPTIONAL MATCH (from)-[existing:SENT {row_id: tx.row_id}]->(to)
+WITH tx, from, to, existing
+WHERE existing IS NULL
+CREATE (from)-[r:SENT {
+    row_id: tx.row_id,
+    amount: tx.amount,
+    step: tx.step,
+    is_fraud: tx.is_fraud,
+    type: tx.type
+}]->(to)
+"""
+
+# Queries cho chế độ import append (chỉ nạp các step mới)
+# Node metadata duy nhất lưu watermark step và row_id tiếp theo của các lần import
+IMPORT_META_ID = 'paysim'
+
+CREATE_ACCOUNT_IMPORT_INDEX = """
+CREATE INDEX account_last_import_id IF NOT EXISTS FOR (a:Account) ON (a.last_import_id)
+"""
+
+GET_IMPORT_WATERMARK = """
+MATCH (m:ImportMeta {id: $meta_id})
+RETURN m.max_step AS max_step, m.next_row_id AS next_row_id,
+       m.last_import_id AS last_import_id, m.last_import_mode AS last_import_mode,
+       m.last_import_transactions AS last_import_transactions, m.dataset_id AS dataset_id
+"""
+
+# Dùng khi database được import trước khi có node metadata
+GET_IMPORTED_RANGE = """
+MATCH ()-[r:SENT]->()
+RETURN max(r.step) AS max_step, max(r.row_id) AS max_row_id
+"""
+
+# dataset_id là mã của lần import đầy đủ gần nhất (import append giữ nguyên), dùng để
+# nhận biết tham số scaler đã lưu có thuộc về dữ liệu hiện tại hay không
+UPDATE_IMPORT_WATERMARK = """
+MERGE (m:ImportMeta {id: $meta_id})
+SET m.max_step = CASE
+        WHEN m.max_step IS NULL OR $max_step > m.max_step THEN $max_step
+        ELSE m.max_step
+    END,
+    m.next_row_id = $next_row_id,
+    m.dataset_id = CASE
+        WHEN $mode = 'append' AND m.dataset_id IS NOT NULL THEN m.dataset_id
+        ELSE $import_id
+    END,
+    m.last_import_id = $import_id,
+    m.last_import_mode = $mode,
+    m.last_import_transactions = $transactions,
+    m.last_import_at = datetime()
+"""
+
+FIND_EXISTING_ACCOUNTS_QUERY = """
+UNWIND $accounts AS id
+MATCH (a:Account {id: id})
+RETURN a.id AS id
+"""
+
+# Đánh dấu các tài khoản có giao dịch trong lần import append
+TAG_TOUCHED_ACCOUNTS_QUERY = """
+UNWIND $accounts AS id
+MATCH (a:Account {id: id})
+SET a.last_import_id = $import_id
+"""
+
+GET_TOUCHED_ACCOUNTS = """
+MATCH (a:Account {last_import_id: $import_id})
+RETURN a.id AS id
+"""
+
+# Bọc cập nhật toàn đồ thị thành các transaction có kích thước giới hạn
+@lru_cache(maxsize=None)
+def get_periodic_commit_query(match_clause, variables, update_clause):
+    """
+    Tạo truy vấn CALL {...} IN TRANSACTIONS: `match_clause` sinh các dòng, `update_clause`
+    được áp dụng cho mỗi dòng với các biến `variables` và commit sau mỗi `$batch_size` dòng.
+    """
+    return f"""
+    {match_clause}
+    CALL {{
+        WITH {variables}
+        {update_clause}
+    }} IN TRANSACTIONS OF $batch_size ROWS
+    """
+
 # Queries liên quan đến kiểm tra dữ liệu
 COUNT_ALL_NODES = "MATCH (n) RETURN count(n) as count"
 COUNT_ACCOUNTS = "MATCH (a:Account) RETURN count(a) as count"
 COUNT_TRANSACTIONS = "MATCH ()-[r:SENT]->() RETURN count(r) as count" 
-CHECK_ANALYZED = "MATCH (a:Account) WHERE a.fraud_score IS NOT NULL RETURN count(a) as count"
+# Snapshot thống kê trong một round trip: các count theo label/type lấy từ count store,
+# trạng thái phân tích giữ điều kiện cũ (Account có fraud_score) và dừng ở kết quả đầu tiên
+STATS_SNAPSHOT_QUERY = """
+CALL { MATCH (n) RETURN count(n) AS nodes }
+CALL { MATCH (a:Account) RETURN count(a) AS accounts }
+CALL { MATCH ()-[r:SENT]->() RETURN count(r) AS transactions }
+RETURN nodes, accounts, transactions,
+       EXISTS { MATCH (a:Account) WHERE a.fraud_score IS NOT NULL } AS has_analysis
+"""
+COUNT_FLAGGED_TRANSACTIONS = "MATCH ()-[r:SENT]->() WHERE r.flagged = true RETURN count(r) as count"
+COUNT_RISK_COMMUNITIES = "MATCH (a:Account) WHERE a.communityId IS NOT NULL RETURN count(distinct a.communityId) as count"
 
 # Queries liên quan đến cleanup
-DROP_ACCOUNT_INDEX = "DROP INDEX ON :Account(id)"
 DELETE_ALL = "MATCH (n) DETACH DELETE n"
 
-# Graph projections
-def get_main_projection(graph_name):
-    return f"""
-    CALL gds.graph.project(
-        '{graph_name}',
-        'Account',
-        {{
-            SENT: {{
-                type: 'SENT',
-                orientation: 'NATURAL',
-                properties: {{
-                    weight: {{
-                        property: 'amount',
-                        defaultValue: 0.0,
-                        aggregation: 'NONE'
-                    }}
-                }}
-            }}
-        }}
-    )
-    """
+# Graph projections (tên graph truyền qua tham số $graph_name)
+MAIN_PROJECTION_QUERY = """
+CALL gds.graph.project(
+    $graph_name,
+    'Account',
+    {
+        SENT: {
+            type: 'SENT',
+            orientation: 'NATURAL',
+            properties: {
+                weight: {
+                    property: 'amount',
+                    defaultValue: 0.0,
+                    aggregation: 'NONE'
+                }
+            }
+        }
+    }
+)
+"""
 
-def get_similarity_projection(graph_name):
-    return f"""
-    CALL gds.graph.project.cypher(
-        '{graph_name}',
-        'MATCH (a:Account) 
-        WHERE EXISTS((a)-[:SENT]->())  // Đảm bảo node có gửi transaction
-        RETURN id(a) AS id, labels(a) AS labels',
-        'MATCH (a:Account)-[:SENT]->(tx:Transaction)-[:RECEIVED]->(b:Account)
-        RETURN id(a) AS source, id(b) AS target, "TRANSFER" AS type',
-        {{
-            validateRelationships: false
-        }}
-    ) YIELD graphName AS filteredGraphName
-    RETURN filteredGraphName
-    """
+SIMILARITY_PROJECTION_QUERY = """
+CALL gds.graph.project.cypher(
+    $graph_name,
+    'MATCH (a:Account) 
+    WHERE EXISTS((a)-[:SENT]->())  // Đảm bảo node có gửi transaction
+    RETURN id(a) AS id, labels(a) AS labels',
+    'MATCH (a:Account)-[:SENT]->(tx:Transaction)-[:RECEIVED]->(b:Account)
+    RETURN id(a) AS source, id(b) AS target, "TRANSFER" AS type',
+    {
+        validateRelationships: false
+    }
+) YIELD graphName AS filteredGraphName
+RETURN filteredGraphName
+"""
 
-def get_temporal_projection(graph_name):
-    return f"""
-    CALL gds.graph.project(
-        '{graph_name}',
-        'Account',
-        {{
-            SENT: {{
-                type: 'SENT',
-                orientation: 'NATURAL',
-                properties: {{
-                    weight: {{
-                        property: 'step',
-                        defaultValue: 0,
-                        aggregation: 'NONE'
-                    }}
-                }}
-            }}
-        }}
-    )
-    """
+TEMPORAL_PROJECTION_QUERY = """
+CALL gds.graph.project(
+    $graph_name,
+    'Account',
+    {
+        SENT: {
+            type: 'SENT',
+            orientation: 'NATURAL',
+            properties: {
+                weight: {
+                    property: 'step',
+                    defaultValue: 0,
+                    aggregation: 'NONE'
+                }
+            }
+        }
+    }
+)
+"""
 
-def get_drop_graph_query(graph_name):
-    return f"CALL gds.graph.drop('{graph_name}', false)"
+DROP_GRAPH_QUERY = "CALL gds.graph.drop($graph_name, false)"
 
 # Cleanup properties
+CLEANUP_NODE_PROPERTIES_TEMPLATE = """
+MATCH (n)
+REMOVE {properties}
+"""
+
 def get_cleanup_node_properties_query(properties):
-    properties_to_remove = ", ".join([f"n.{prop}" for prop in properties])
-    return f"""
-    MATCH (n)
-    REMOVE {properties_to_remove}
-    """
+    return render(CLEANUP_NODE_PROPERTIES_TEMPLATE, properties=tuple(properties))
 
 CLEANUP_RELATIONSHIP_PROPERTIES = """
 MATCH ()-[r:SENT]->()
@@ -1,6 +1,7 @@
 """
 Chứa các truy vấn dùng trong đánh giá hiệu suất và phân tích
 """
+from .registry import render
 
 # Truy vấn đánh giá hiệu suất
 PERFORMANCE_EVALUATION_QUERY = """
@@ -51,10 +52,12 @@ RETURN tx.anomaly_score AS score, tx.flagged AS flagged, tx.ground_truth_fraud A
 ORDER BY score DESC
 """
 
-# Function để tạo truy vấn phân tích tầm quan trọng của đặc trưng
+# Template truy vấn phân tích tầm quan trọng của đặc trưng (render một lần cho mỗi đặc trưng)
+FEATURE_IMPORTANCE_TEMPLATE = """
+MATCH (a:Account)-[tx:SENT]->()
+WHERE tx.ground_truth_fraud IS NOT NULL AND a.{feature} IS NOT NULL
+RETURN tx.ground_truth_fraud AS fraud, a.{feature} AS feature_value
+"""
+
 def get_feature_importance_query(feature):
-    return f"""
-    MATCH (a:Account)-[tx:SENT]->()
-    WHERE tx.ground_truth_fraud IS NOT NULL AND a.{feature} IS NOT NULL
-    RETURN tx.ground_truth_fraud AS fraud, a.{feature} AS feature_value
-    """
\ No newline at end of file
+    return render(FEATURE_IMPORTANCE_TEMPLATE, feature=feature)
\ No newline at end of file
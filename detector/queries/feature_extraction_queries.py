@@ -1,105 +1,148 @@
 """
 Chứa các truy vấn liên quan đến việc trích xuất đặc trưng
 """
+from functools import lru_cache
 
-# Truy vấn trích xuất đặc trưng thời gian
-TRANSACTION_VELOCITY_QUERY = """
-MATCH (from:Account)-[tx:SENT]->()
-WITH from, tx.step as step
-ORDER BY from, step
-WITH from, collect(step) AS steps
-WITH from, steps, 
-    size(steps) AS transaction_count,
-    CASE WHEN size(steps) <= 1 THEN 0 ELSE toFloat(last(steps) - head(steps)) END AS time_span
-WITH from, transaction_count, 
-    CASE WHEN time_span = 0 THEN 0 ELSE transaction_count / (time_span + 1) END AS velocity
-SET from.txVelocity = velocity
+from .registry import check_identifiers
+
+# Truy vấn trích xuất đặc trưng thời gian trong một lần duyệt: giao dịch gửi đi của mỗi tài khoản
+# được sắp theo step một lần, sau đó txVelocity, amountVolatility, maxAmountRatio, tempBurst,
+# avgTimeBetweenTx và stdTimeBetweenTx được tính cùng lúc và ghi một lần cho mỗi tài khoản.
+# Dạng (match_clause, variables, update_clause) để chạy theo lô bằng DatabaseManager.run_periodic
+TEMPORAL_FEATURES_QUERY = (
+    "MATCH (from:Account) WHERE EXISTS { MATCH (from)-[:SENT]->() }",
+    "from",
+    """
+MATCH (from)-[tx:SENT]->()
+WITH from, tx.step AS step, tx.amount AS amount
+ORDER BY step
+WITH from, collect(step) AS steps, collect(amount) AS amounts
+WITH from, steps, amounts, size(steps) AS n,
+    [i IN range(0, size(steps) - 2) | steps[i + 1] - steps[i]] AS diffs
+WITH from, amounts, n, diffs,
+    // Tốc độ giao dịch: số giao dịch trên khoảng thời gian hoạt động
+    CASE WHEN n <= 1 THEN 0 ELSE toFloat(last(steps) - head(steps)) END AS time_span,
+    REDUCE(max_val = 0, x IN amounts | CASE WHEN x > max_val THEN x ELSE max_val END) AS max_amount,
+    REDUCE(min_val = toFloat(9999999999), x IN amounts |
+        CASE WHEN x < min_val AND x IS NOT NULL THEN x ELSE min_val END
+    ) AS min_amount,
+    REDUCE(sum = 0, x IN amounts | sum + x) / n AS avg_amount,
+    // Khoảng cách giữa các giao dịch liên tiếp (chỉ có khi n >= 2)
+    CASE WHEN n <= 1 THEN null ELSE REDUCE(sum = 0.0, d IN diffs | sum + d) / size(diffs) END AS avg_diff
+WITH from, n, diffs, time_span, max_amount, avg_amount, avg_diff,
+    CASE WHEN n <= 1 THEN 0 ELSE max_amount - min_amount END AS amount_range,
+    // Độ lệch chuẩn mẫu như stDev()
+    CASE WHEN n <= 2 THEN 0.0
+        ELSE sqrt(REDUCE(sum = 0.0, d IN diffs | sum + (d - avg_diff) ^ 2) / (size(diffs) - 1))
+    END AS std_diff
+SET from.txVelocity = CASE WHEN time_span = 0 THEN 0 ELSE n / (time_span + 1) END,
+    from.amountVolatility = CASE WHEN avg_amount = 0 THEN 0 ELSE amount_range / avg_amount END,
+    from.maxAmountRatio = CASE WHEN avg_amount = 0 THEN 0 ELSE max_amount / avg_amount END,
+    from.tempBurst = CASE WHEN n <= 1 THEN from.tempBurst
+                          ELSE size([d IN diffs WHERE d <= 3]) / toFloat(size(diffs)) END,
+    from.avgTimeBetweenTx = CASE WHEN n <= 1 THEN from.avgTimeBetweenTx ELSE avg_diff END,
+    from.stdTimeBetweenTx = CASE WHEN n <= 1 THEN from.stdTimeBetweenTx
+                                 WHEN avg_diff = 0 THEN 0
+                                 ELSE std_diff / avg_diff END
 """
+)
 
-SIMPLE_VOLATILITY_QUERY = """
-MATCH (from:Account)-[tx:SENT]->()
-WITH from, tx
-ORDER BY from, tx.step
-WITH from, collect(tx.amount) as amount_list
-WITH from, amount_list,
-    CASE WHEN size(amount_list) <= 1 THEN 0 
-        ELSE (
-            // Tính range từng phần tử một
-            REDUCE(max_val = 0, x IN amount_list | 
-              CASE WHEN x > max_val THEN x ELSE max_val END
-            ) - 
-            REDUCE(min_val = toFloat(9999999999), x IN amount_list | 
-              CASE WHEN x < min_val AND x IS NOT NULL THEN x ELSE min_val END
-            )
-        ) 
-    END AS amount_range,
-    CASE WHEN size(amount_list) = 0 THEN 0 
-        ELSE REDUCE(sum = 0, x IN amount_list | sum + x) / size(amount_list) 
-    END AS avg_amount
-SET from.amountVolatility = CASE WHEN avg_amount = 0 THEN 0 ELSE amount_range / avg_amount END,
-    from.maxAmountRatio = CASE WHEN avg_amount = 0 THEN 0 
-                              ELSE REDUCE(max_val = 0, x IN amount_list | 
-                                     CASE WHEN x > max_val THEN x ELSE max_val END
-                                   ) / avg_amount
-                         END
+# Engine NumPy (detector/temporal_features.py): đọc giao dịch gửi đi và ghi kết quả theo lô bằng UNWIND
+TEMPORAL_TRANSACTIONS_QUERY = """
+MATCH (a:Account)-[tx:SENT]->()
+RETURN a.id AS nameOrig, tx.step AS step, tx.amount AS amount
 """
 
-BURST_DETECTION_QUERY = """
-MATCH (from:Account)-[tx:SENT]->()
-WITH from, tx.step as step
-ORDER BY from, step
-WITH from, collect(step) AS steps
-UNWIND range(0, size(steps)-2) AS i
-WITH from, steps[i+1] - steps[i] AS time_diff
-WITH from, collect(time_diff) AS time_diffs
-WITH from, time_diffs,
-    CASE WHEN size(time_diffs) = 0 THEN 0 
-        ELSE size([t IN time_diffs WHERE t <= 3]) / toFloat(size(time_diffs)) 
-    END AS burst_ratio
-SET from.tempBurst = burst_ratio
+# Giá trị null (tài khoản chỉ có một giao dịch) giữ nguyên thuộc tính hiện có như TEMPORAL_FEATURES_QUERY
+WRITE_TEMPORAL_FEATURES_QUERY = """
+UNWIND $rows AS row
+MATCH (a:Account {id: row.id})
+SET a.txVelocity = row.txVelocity,
+    a.amountVolatility = row.amountVolatility,
+    a.maxAmountRatio = row.maxAmountRatio,
+    a.tempBurst = COALESCE(row.tempBurst, a.tempBurst),
+    a.avgTimeBetweenTx = COALESCE(row.avgTimeBetweenTx, a.avgTimeBetweenTx),
+    a.stdTimeBetweenTx = COALESCE(row.stdTimeBetweenTx, a.stdTimeBetweenTx)
 """
 
-TIME_PATTERNS_QUERY = """
-MATCH (from:Account)-[tx:SENT]->()
-WITH from, tx.step as step
-ORDER BY from, step
-WITH from, collect(step) AS steps
-UNWIND range(0, size(steps)-2) AS i
-WITH from, steps[i+1] - steps[i] AS time_diff
-WITH from, avg(time_diff) AS avg_time_between_tx,
-    stDev(time_diff) AS std_time_between_tx
-SET from.avgTimeBetweenTx = avg_time_between_tx,
-    from.stdTimeBetweenTx = CASE WHEN avg_time_between_tx = 0 THEN 0 
-                                 ELSE std_time_between_tx / avg_time_between_tx 
-                            END
+GET_TEMPORAL_FEATURES_QUERY = """
+MATCH (a:Account)
+WHERE EXISTS { MATCH (a)-[:SENT]->() }
+RETURN a.id AS id, a.txVelocity AS txVelocity, a.amountVolatility AS amountVolatility,
+    a.maxAmountRatio AS maxAmountRatio, a.tempBurst AS tempBurst,
+    a.avgTimeBetweenTx AS avgTimeBetweenTx, a.stdTimeBetweenTx AS stdTimeBetweenTx
 """
 
-# Truy vấn normalize đặc trưng
-def get_normalize_query(feature):
-    """Tạo truy vấn normalize một đặc trưng cụ thể."""
-    return f"""
-    MATCH (n) 
-    WHERE n.{feature} IS NOT NULL
-    WITH MIN(n.{feature}) AS min_val, MAX(n.{feature}) AS max_val
-    WHERE max_val <> min_val
-    MATCH (m)
-    WHERE m.{feature} IS NOT NULL
-    SET m.{feature}_norm = (m.{feature} - min_val) / (max_val - min_val)
+# Normalize đặc trưng bằng các scaler trong detector/feature_scaling.py: một lần aggregation phía
+# server để fit (chỉ các đặc trưng chưa có scaler đã lưu; riêng scaler rank đọc giá trị thô về
+# client), sau đó một lần SET theo lô áp dụng mọi scaler và giữ giá trị thô ở `<feature>_raw`.
+# Tên thuộc tính không tham số hóa được nên văn bản truy vấn được tạo một lần cho mỗi bộ đặc
+# trưng (tuple) và cache lại; tham số đã fit truyền qua $<feature>_<tên tham số>.
+@lru_cache(maxsize=None)
+def get_feature_values_query(columns):
     """
+    Truy vấn đọc giá trị thô của các đặc trưng trên mọi tài khoản (mỗi đặc trưng một cột).
 
-def get_rename_query(feature):
-    """Tạo truy vấn đổi tên đặc trưng sau khi normalize."""
+    Args:
+        columns: tuple các cặp (tên cột, biểu thức Cypher của giá trị thô trên n)
+    """
+    check_identifiers(columns=tuple(column for column, _ in columns))
+    values = ", ".join(f"{expression} AS {column}" for column, expression in columns)
     return f"""
-    MATCH (n)
-    WHERE n.{feature}_norm IS NOT NULL
-    SET n.{feature} = n.{feature}_norm
-    REMOVE n.{feature}_norm
+MATCH (n:Account)
+RETURN {values}
+"""
+
+@lru_cache(maxsize=None)
+def get_scaler_stats_query(aggregates):
     """
+    Truy vấn trả về một record chứa mọi thống kê cần để fit scaler, trong một lần quét.
 
-def get_default_query(feature):
-    """Tạo truy vấn thiết lập giá trị mặc định cho các node thiếu đặc trưng."""
+    Args:
+        aggregates: tuple các cặp (tên cột `<feature>_<thống kê>`, aggregation Cypher trên n)
+    """
+    check_identifiers(columns=tuple(column for column, _ in aggregates))
+    columns = ",\n    ".join(f"{expression} AS {column}" for column, expression in aggregates)
     return f"""
-    MATCH (n)
-    WHERE n.{feature} IS NULL
-    SET n.{feature} = 0
-    """
\ No newline at end of file
+MATCH (n:Account)
+RETURN {columns}
+"""
+
+@lru_cache(maxsize=None)
+def get_scale_features_query(assignments, restricted=False):
+    """
+    Truy vấn dạng (match_clause, variables, update_clause) cho DatabaseManager.run_periodic.
+
+    Args:
+        assignments: tuple các bộ (đặc trưng, thuộc tính giữ giá trị thô, biểu thức Cypher của
+                     scaler đọc từ thuộc tính giữ giá trị thô); null -> 0
+        restricted: chỉ áp dụng cho các tài khoản có id trong $account_ids
+    """
+    check_identifiers(features=tuple(feature for feature, _, _ in assignments),
+                      raw_properties=tuple(raw for _, raw, _ in assignments))
+    # Giá trị thô chỉ được chép khi thuộc tính raw chưa có, và giá trị normalize luôn tính từ bản
+    # thô, nên chạy lại (kể cả với account_ids) không normalize chồng lên giá trị đã normalize
+    copies = ",\n    ".join(f"n.{raw} = coalesce(n.{raw}, n.{feature})" for feature, raw, _ in assignments)
+    updates = ",\n    ".join(
+        f"n.{feature} = CASE WHEN n.{raw} IS NULL THEN 0 ELSE {expression} END"
+        for feature, raw, expression in assignments
+    )
+    match_clause = "MATCH (n:Account) WHERE n.id IN $account_ids" if restricted else "MATCH (n:Account)"
+    return (match_clause, "n", f"SET {copies}\nSET {updates}")
+
+@lru_cache(maxsize=None)
+def get_restore_raw_features_query(pairs, restricted=False):
+    """
+    Truy vấn (match_clause, variables, update_clause) đưa các đặc trưng về giá trị thô đã lưu
+    và xóa thuộc tính raw, để lần normalize sau chép lại giá trị thô mới.
+
+    Args:
+        pairs: tuple các cặp (đặc trưng, thuộc tính giữ giá trị thô)
+        restricted: chỉ áp dụng cho các tài khoản có id trong $account_ids
+    """
+    check_identifiers(features=tuple(feature for feature, _ in pairs),
+                      raw_properties=tuple(raw for _, raw in pairs))
+    restores = ",\n    ".join(f"n.{feature} = coalesce(n.{raw}, n.{feature})" for feature, raw in pairs)
+    removes = ", ".join(f"n.{raw}" for _, raw in pairs)
+    match_clause = "MATCH (n:Account) WHERE n.id IN $account_ids" if restricted else "MATCH (n:Account)"
+    return (match_clause, "n", f"SET {restores}\nREMOVE {removes}")
@@ -1,6 +1,7 @@
 """
 Chứa các truy vấn Cypher cho FraudDetector
 """
+from .registry import render
 
 # Truy vấn cho prepare_ground_truth
 CHECK_FRAUD_FIELD_QUERY = """
@@ -83,13 +84,14 @@ RETURN min_score, max_score, avg_score, std_score, median_score, p95_score, p99_
 """
 
 # Truy vấn cho cleanup_properties_and_relationships
+NODE_CLEANUP_TEMPLATE = """
+MATCH (n)
+REMOVE {properties}
+"""
+
 def get_node_cleanup_query(properties):
     """Tạo truy vấn xóa các thuộc tính được chỉ định khỏi tất cả các node."""
-    properties_to_remove = ", ".join([f"n.{prop}" for prop in properties])
-    return f"""
-    MATCH (n)
-    REMOVE {properties_to_remove}
-    """
+    return render(NODE_CLEANUP_TEMPLATE, properties=tuple(properties))
 
 RELATIONSHIP_CLEANUP_QUERY = """
 MATCH ()-[r:SENT]->()
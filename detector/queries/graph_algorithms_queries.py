@@ -1,48 +1,54 @@
 """
 Chứa các truy vấn Cypher cho các thuật toán đồ thị
+
+Tên graph được truyền qua tham số $graph_name; graph vô hướng dùng cho K-Core và
+Triangle Count có tên suy ra bằng get_kcore_graph_name / get_triangle_graph_name.
 """
 
+def get_kcore_graph_name(graph_name):
+    return f'{graph_name}-undirected'
+
+def get_triangle_graph_name(graph_name):
+    return f'{graph_name}-undirected-tri'
+
 # Queries cho Degree Centrality
-def get_degree_query(graph_name):
-    return f"""
-    CALL gds.degree.write(
-        '{graph_name}',
-        {{
-            writeProperty: 'degScore',
-            relationshipWeightProperty: 'weight'
-        }}
-    )
-    """
+DEGREE_QUERY = """
+CALL gds.degree.write(
+    $graph_name,
+    {
+        writeProperty: 'degScore',
+        relationshipWeightProperty: 'weight'
+    }
+)
+"""
 
 # Queries cho PageRank
-def get_pagerank_query(graph_name):
-    return f"""
-    CALL gds.pageRank.write(
-        '{graph_name}',
-        {{
-            writeProperty: 'prScore',
-            relationshipWeightProperty: 'weight',
-            maxIterations: 20,
-            dampingFactor: 0.85
-        }}
-    )
-    """
+PAGERANK_QUERY = """
+CALL gds.pageRank.write(
+    $graph_name,
+    {
+        writeProperty: 'prScore',
+        relationshipWeightProperty: 'weight',
+        maxIterations: 20,
+        dampingFactor: 0.85
+    }
+)
+"""
 
 # Queries cho Community Detection
-def get_community_query(graph_name):
-    return f"""
-    CALL gds.louvain.write(
-        '{graph_name}',
-        {{
-            writeProperty: 'communityId',
-            relationshipWeightProperty: 'weight',
-            includeIntermediateCommunities: false,
-            tolerance: 0.0001,
-            maxIterations: 10,
-            concurrency: 4
-        }}
-    )
-    """
+COMMUNITY_QUERY = """
+CALL gds.louvain.write(
+    $graph_name,
+    {
+        writeProperty: 'communityId',
+        relationshipWeightProperty: 'weight',
+        includeIntermediateCommunities: false,
+        tolerance: 0.0001,
+        maxIterations: 10,
+        concurrency: 4
+    }
+)
+"""
 
 # Query tính kích thước cộng đồng
 COMMUNITY_SIZE_QUERY = """
@@ -65,150 +71,120 @@ SET n.normCommunitySize =
 """
 
 # Queries cho Node Similarity
-def get_similarity_query(graph_name):
-    return f"""
-    CALL gds.nodeSimilarity.write(
-        '{graph_name}',
-        {{
-            writeProperty: 'simScore',
-            writeRelationshipType: 'SIMILAR',
-            similarityCutoff: 0.2,
-            topK: 5,
-            concurrency: 4
-        }}
-    )
-    """
+SIMILARITY_QUERY = """
+CALL gds.nodeSimilarity.write(
+    $graph_name,
+    {
+        writeProperty: 'simScore',
+        writeRelationshipType: 'SIMILAR',
+        similarityCutoff: 0.2,
+        topK: 5,
+        concurrency: 4
+    }
+)
+"""
 
 # Fallback query cho Node Similarity nếu phiên bản ghi thất bại
-def get_fallback_similarity_query(graph_name):
-    return f"""
-    CALL gds.nodeSimilarity.stream(
-        '{graph_name}',
-        {{
-            similarityCutoff: 0.2,
-            topK: 3,
-            concurrency: 4
-        }}
-    )
-    YIELD node1, node2, similarity
-    WITH gds.util.asNode(node1) AS source, gds.util.asNode(node2) AS target, similarity
-    LIMIT 50000
-    SET source.simScore = CASE 
-        WHEN source.simScore IS NULL OR similarity > source.simScore 
-        THEN similarity ELSE source.simScore END
-    RETURN COUNT(*) as relationshipsProcessed
-    """
-
-# Query thiết lập giá trị mặc định cho similarity score
-SET_DEFAULT_SIM_QUERY = """
-MATCH (n)
-WHERE n.simScore IS NULL
-SET n.simScore = 0.0
+FALLBACK_SIMILARITY_QUERY = """
+CALL gds.nodeSimilarity.stream(
+    $graph_name,
+    {
+        similarityCutoff: 0.2,
+        topK: 3,
+        concurrency: 4
+    }
+)
+YIELD node1, node2, similarity
+WITH gds.util.asNode(node1) AS source, gds.util.asNode(node2) AS target, similarity
+LIMIT 50000
+SET source.simScore = CASE 
+    WHEN source.simScore IS NULL OR similarity > source.simScore 
+    THEN similarity ELSE source.simScore END
+RETURN COUNT(*) as relationshipsProcessed
 """
 
 # Queries cho Betweenness Centrality
-def get_betweenness_query(graph_name):
-    return f"""
-    CALL gds.betweenness.write(
-        '{graph_name}',
-        {{
-            writeProperty: 'btwScore'
-        }}
-    )
-    """
+BETWEENNESS_QUERY = """
+CALL gds.betweenness.write(
+    $graph_name,
+    {
+        writeProperty: 'btwScore'
+    }
+)
+"""
 
 # Queries cho HITS Algorithm
-def get_hits_query(graph_name):
-    return f"""
-    CALL gds.alpha.hits.write(
-        '{graph_name}',
-        {{
-            writeProperty: '',
-            hitsIterations: 20,
-            authProperty: 'authScore',
-            hubProperty: 'hubScore' 
-        }}
-    )
-    """
+HITS_QUERY = """
+CALL gds.alpha.hits.write(
+    $graph_name,
+    {
+        writeProperty: '',
+        hitsIterations: 20,
+        authProperty: 'authScore',
+        hubProperty: 'hubScore' 
+    }
+)
+"""
 
 # Queries cho K-Core Decomposition
-def get_kcore_projection_query(graph_name):
-    kcore_graph_name = f'{graph_name}-undirected'
-    return f"""
-    CALL gds.graph.project(
-        '{kcore_graph_name}',
-        'Account',
-        {{
-            SENT: {{
-                type: 'SENT',
-                orientation: 'UNDIRECTED',
-                properties: {{
-                    weight: {{
-                        property: 'amount',
-                        defaultValue: 0.0,
-                        aggregation: 'NONE'
-                    }}
-                }}
-            }}
-        }}
-    )
-    """
+KCORE_PROJECTION_QUERY = """
+CALL gds.graph.project(
+    $graph_name,
+    'Account',
+    {
+        SENT: {
+            type: 'SENT',
+            orientation: 'UNDIRECTED',
+            properties: {
+                weight: {
+                    property: 'amount',
+                    defaultValue: 0.0,
+                    aggregation: 'NONE'
+                }
+            }
+        }
+    }
+)
+"""
 
-def get_kcore_query(graph_name):
-    kcore_graph_name = f'{graph_name}-undirected'
-    return f"""
-    CALL gds.kcore.write(
-        '{kcore_graph_name}',
-        {{
-            writeProperty: 'coreScore'
-        }}
-    )
-    """
+KCORE_QUERY = """
+CALL gds.kcore.write(
+    $graph_name,
+    {
+        writeProperty: 'coreScore'
+    }
+)
+"""
 
-def get_kcore_cleanup_query(graph_name):
-    kcore_graph_name = f'{graph_name}-undirected'
-    return f"""
-    CALL gds.graph.drop('{kcore_graph_name}', false)
-    """
+KCORE_CLEANUP_QUERY = """
+CALL gds.graph.drop($graph_name, false)
+"""
 
 # Queries cho Triangle Count
-def get_triangle_projection_query(graph_name):
-    triangle_graph_name = f'{graph_name}-undirected-tri'
-    return f"""
-    CALL gds.graph.project(
-        '{triangle_graph_name}',
-        'Account',
-        {{
-            SENT: {{
-                type: 'SENT',
-                orientation: 'UNDIRECTED'
-            }}
-        }}
-    )
-    """
-
-def get_triangle_query(graph_name):
-    triangle_graph_name = f'{graph_name}-undirected-tri'
-    return f"""
-    CALL gds.triangleCount.write(
-        '{triangle_graph_name}',
-        {{
-            writeProperty: 'triCount'
-        }}
-    )
-    """
+TRIANGLE_PROJECTION_QUERY = """
+CALL gds.graph.project(
+    $graph_name,
+    'Account',
+    {
+        SENT: {
+            type: 'SENT',
+            orientation: 'UNDIRECTED'
+        }
+    }
+)
+"""
 
-def get_triangle_cleanup_query(graph_name):
-    triangle_graph_name = f'{graph_name}-undirected-tri'
-    return f"""
-    CALL gds.graph.drop('{triangle_graph_name}', false)
-    """
+TRIANGLE_QUERY = """
+CALL gds.triangleCount.write(
+    $graph_name,
+    {
+        writeProperty: 'triCount'
+    }
+)
+"""
 
-# Query thiết lập giá trị mặc định cho triangle count
-SET_DEFAULT_TRI_QUERY = """
-MATCH (n)
-WHERE n.triCount IS NULL
-SET n.triCount = 0
+TRIANGLE_CLEANUP_QUERY = """
+CALL gds.graph.drop($graph_name, false)
 """
 
 # Query phát hiện chu trình
@@ -251,14 +227,17 @@ WITH a
 SET a.tempBurst = (a.tempBurst1h * 0.7) + (a.tempBurst24h * 0.3)
 """
 
-# Query thiết lập giá trị mặc định cho tất cả node
-SET_DEFAULT_VALUES_QUERY = """
-MATCH (n)
+# Query thiết lập giá trị mặc định cho tất cả tài khoản (bao gồm simScore và triCount),
+# dạng (match_clause, variables, update_clause) để chạy theo lô bằng DatabaseManager.run_periodic
+SET_DEFAULT_VALUES_QUERY = (
+    "MATCH (n:Account)",
+    "n",
+    """
 SET n.degScore = COALESCE(n.degScore, 0),
     n.prScore = COALESCE(n.prScore, 0),
     n.communityId = COALESCE(n.communityId, -1),
     n.normCommunitySize = COALESCE(n.normCommunitySize, 0),
-    n.simScore = COALESCE(n.simScore, 0),
+    n.simScore = COALESCE(n.simScore, 0.0),
     n.btwScore = COALESCE(n.btwScore, 0),
     n.authScore = COALESCE(n.authScore, 0),
     n.hubScore = COALESCE(n.hubScore, 0),
@@ -266,4 +245,5 @@ SET n.degScore = COALESCE(n.degScore, 0),
     n.triCount = COALESCE(n.triCount, 0),
     n.cycleCount = COALESCE(n.cycleCount, 0),
     n.tempBurst = COALESCE(n.tempBurst, 0)
-"""
\ No newline at end of file
+"""
+)
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""
+Registry các câu truy vấn Cypher đã render sẵn.
+
+Giá trị (tên graph, phân vị, ngưỡng, kích thước batch) luôn truyền bằng tham số `$...`
+để server dùng lại plan đã cache. Riêng tên thuộc tính/nhãn không tham số hóa được trong
+Cypher nên được điền vào template một lần cho mỗi tổ hợp và giữ lại bằng lru_cache, nhờ
+vậy cùng một template luôn cho ra đúng một chuỗi truy vấn.
+"""
+import re
+from functools import lru_cache
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def check_identifiers(**identifiers):
+    """Kiểm tra tên thuộc tính/nhãn (chuỗi hoặc tuple chuỗi) trước khi đưa vào văn bản truy vấn."""
+    for name, value in identifiers.items():
+        values = value if isinstance(value, tuple) else (value,)
+        for item in values:
+            if not isinstance(item, str) or not _IDENTIFIER.match(item):
+                raise ValueError(f"Định danh không hợp lệ cho '{name}': {item!r}")
+
+
+@lru_cache(maxsize=None)
+def render(template, **identifiers):
+    """
+    Điền các định danh (tên thuộc tính, nhãn...) vào `template` và cache kết quả.
+
+    Giá trị dạng tuple được nối thành danh sách `n.a, n.b` khi template dùng `{name}`.
+    """
+    check_identifiers(**identifiers)
+    values = {
+        name: ", ".join(f"n.{item}" for item in value) if isinstance(value, tuple) else value
+        for name, value in identifiers.items()
+    }
+    return template.format(**values)
+
+
+def cache_info():
+    """Thống kê lru_cache của registry (số template đã render, hit/miss)."""
+    return render.cache_info()
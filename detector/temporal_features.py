@@ -0,0 +1,125 @@
+"""
+Engine NumPy cho các đặc trưng thời gian, tính ngoài Neo4j.
+
+Tái hiện đúng ngữ nghĩa của TEMPORAL_FEATURES_QUERY trên các mảng (nameOrig, step, amount)
+đã sắp theo tài khoản rồi theo step: mỗi tài khoản là một đoạn liên tiếp, min/max/tổng số
+tiền được tính bằng reduceat, khoảng cách giữa các giao dịch bằng np.diff trong từng đoạn.
+Dùng cho các lần chạy tuning trực tiếp từ file PaySim, hoặc thay cho engine Cypher trong
+pipeline (FeatureExtractor với engine="numpy").
+"""
+import numpy as np
+import pandas as pd
+
+ENGINE_CYPHER = 'cypher'
+ENGINE_NUMPY = 'numpy'
+
+TEMPORAL_FEATURES = [
+    'txVelocity', 'amountVolatility', 'maxAmountRatio',
+    'tempBurst', 'avgTimeBetweenTx', 'stdTimeBetweenTx'
+]
+
+# Khoảng cách (step) tối đa giữa hai giao dịch liên tiếp để được tính là burst
+BURST_GAP = 3
+
+# Giá trị khởi tạo của REDUCE tìm min trong truy vấn Cypher
+_MIN_AMOUNT_START = 9999999999.0
+
+
+def compute_temporal_features(transactions):
+    """
+    Tính 6 đặc trưng thời gian cho mỗi tài khoản gửi.
+
+    Args:
+        transactions: DataFrame có các cột nameOrig, step, amount (ví dụ từ load_paysim)
+
+    Returns:
+        DataFrame index theo id tài khoản với các cột TEMPORAL_FEATURES. tempBurst,
+        avgTimeBetweenTx và stdTimeBetweenTx là NaN với tài khoản chỉ có một giao dịch
+        (truy vấn Cypher không cập nhật các thuộc tính này).
+    """
+    accounts = transactions['nameOrig'].to_numpy()
+    steps = transactions['step'].to_numpy(dtype=np.int64)
+    amounts = transactions['amount'].to_numpy(dtype=np.float64)
+    if len(accounts) == 0:
+        return pd.DataFrame(columns=TEMPORAL_FEATURES, dtype=np.float64)
+
+    # Mã hóa tài khoản thành số nguyên rồi sắp theo (tài khoản, step)
+    codes, ids = pd.factorize(accounts, sort=True)
+    order = np.lexsort((steps, codes))
+    codes, steps, amounts = codes[order], steps[order], amounts[order]
+
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], len(codes)] - 1
+    counts = (ends - starts + 1).astype(np.float64)
+    groups = len(starts)
+
+    # Tốc độ giao dịch
+    time_span = (steps[ends] - steps[starts]).astype(np.float64)
+    velocity = np.where(time_span == 0, 0.0, counts / (time_span + 1))
+
+    # Biến động số tiền: max bắt đầu từ 0, min bắt đầu từ _MIN_AMOUNT_START như trong REDUCE
+    max_amount = np.maximum(np.maximum.reduceat(amounts, starts), 0.0)
+    min_amount = np.minimum(np.minimum.reduceat(amounts, starts), _MIN_AMOUNT_START)
+    avg_amount = np.add.reduceat(amounts, starts) / counts
+    amount_range = np.where(counts <= 1, 0.0, max_amount - min_amount)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volatility = np.where(avg_amount == 0, 0.0, amount_range / avg_amount)
+        max_ratio = np.where(avg_amount == 0, 0.0, max_amount / avg_amount)
+
+    # Khoảng cách giữa các giao dịch liên tiếp trong cùng tài khoản
+    same_account = codes[1:] == codes[:-1]
+    gaps = np.diff(steps)[same_account].astype(np.float64)
+    gap_groups = codes[1:][same_account]
+    gap_counts = np.bincount(gap_groups, minlength=groups).astype(np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_gap = np.bincount(gap_groups, weights=gaps, minlength=groups) / gap_counts
+        burst = np.bincount(gap_groups, weights=(gaps <= BURST_GAP).astype(np.float64),
+                            minlength=groups) / gap_counts
+        # Độ lệch chuẩn mẫu như stDev() (0 khi chỉ có một khoảng cách)
+        squared = np.bincount(gap_groups, weights=(gaps - avg_gap[gap_groups]) ** 2, minlength=groups)
+        std_gap = np.where(gap_counts <= 1, 0.0, np.sqrt(squared / (gap_counts - 1)))
+        std_ratio = np.where(avg_gap == 0, 0.0, std_gap / avg_gap)
+
+    single = counts <= 1
+    return pd.DataFrame({
+        'txVelocity': velocity,
+        'amountVolatility': volatility,
+        'maxAmountRatio': max_ratio,
+        'tempBurst': np.where(single, np.nan, burst),
+        'avgTimeBetweenTx': np.where(single, np.nan, avg_gap),
+        'stdTimeBetweenTx': np.where(single, np.nan, std_ratio)
+    }, index=pd.Index(ids, name='id'))
+
+
+def to_write_rows(features):
+    """Chuyển kết quả compute_temporal_features thành list dict cho truy vấn UNWIND (NaN -> None)."""
+    frame = features.reset_index().astype(object)
+    frame = frame.where(pd.notna(frame), None)
+    return frame.to_dict('records')
+
+
+def compare_features(expected, actual, tolerance=1e-6):
+    """
+    So sánh hai bảng đặc trưng (index theo id tài khoản) và trả về các sai lệch.
+
+    Giá trị NaN trong `expected` (thuộc tính không được engine ghi) được bỏ qua, vì thuộc
+    tính tương ứng trên đồ thị có thể còn giá trị của lần chạy trước.
+
+    Returns:
+        dict: {tên đặc trưng: số tài khoản lệch}, cùng khóa 'missing_accounts' cho các tài
+        khoản chỉ có ở một bên; dict rỗng nghĩa là hai engine khớp nhau.
+    """
+    mismatches = {}
+    missing = expected.index.symmetric_difference(actual.index)
+    if len(missing):
+        mismatches['missing_accounts'] = len(missing)
+
+    common = expected.index.intersection(actual.index)
+    for feature in TEMPORAL_FEATURES:
+        left = expected.loc[common, feature].to_numpy(dtype=np.float64)
+        right = actual.loc[common, feature].to_numpy(dtype=np.float64)
+        equal = np.isnan(left) | np.isclose(left, right, rtol=tolerance, atol=tolerance)
+        if not equal.all():
+            mismatches[feature] = int((~equal).sum())
+    return mismatches
@@ -2,19 +2,49 @@
 from .config import *
 from .logging_utils import setup_logger, log_execution_time
 from .visualization import plot_fraud_distribution, plot_feature_importance
+from .paysim_loader import load_paysim
+from .import_stats import ImportStats
+from .query_profiler import QueryProfiler
+from .stats_cache import StatsSnapshot
 
 __all__ = [
     'setup_logger',
     'log_execution_time',
     'plot_fraud_distribution',
     'plot_feature_importance',
+    'load_paysim',
+    'ImportStats',
+    'QueryProfiler',
+    'StatsSnapshot',
     'NEO4J_URI',
     'NEO4J_USER',
     'NEO4J_PASSWORD',
+    'NEO4J_READ_URI',
+    'DASHBOARD_ROUTING',
+    'NEO4J_MAX_POOL_SIZE',
+    'NEO4J_ACQUISITION_TIMEOUT',
+    'NEO4J_MAX_CONNECTION_LIFETIME',
+    'NEO4J_MAX_RETRY_TIME',
+    'QUERY_FETCH_SIZE',
+    'PERIODIC_COMMIT_SIZE',
+    'QUERY_PROFILE',
+    'SLOW_QUERY_SECONDS',
+    'STATS_CACHE_TTL',
     'BATCH_SIZE',
     'MAX_NODES',
     'MAX_RELATIONSHIPS',
+    'IMPORT_CHUNK_SIZE',
+    'IMPORT_WORKERS',
+    'ADAPTIVE_BATCHING',
+    'BATCH_SIZE_MIN',
+    'BATCH_SIZE_MAX',
+    'BATCH_TARGET_LATENCY',
+    'TEMPORAL_ENGINE',
     'ALGORITHM_PARAMS',
     'FEATURE_WEIGHTS',
+    'ANOMALY_SCORE_WEIGHTS',
+    'DEFAULT_SCALER',
+    'FEATURE_SCALERS',
+    'SCALER_STATE_PATH',
     'DEFAULT_PERCENTILE'
 ]
\ No newline at end of file
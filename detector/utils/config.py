@@ -1,12 +1,37 @@
+import os
+
 # Neo4j connection
 NEO4J_URI = "bolt://localhost:7687"
 NEO4J_USER = "neo4j"
 NEO4J_PASSWORD = "12345678"
 
+# Định tuyến truy vấn đọc của dashboard: "read_replicas" đọc qua URI routing neo4j:// với
+# access mode READ (follower/read replica), "leader" dùng chung driver với pipeline
+NEO4J_READ_URI = "neo4j://localhost:7687"
+DASHBOARD_ROUTING = "read_replicas"
+
+# Connection pool của driver dùng chung (Flask app và các script)
+NEO4J_MAX_POOL_SIZE = 50  # Số kết nối Bolt tối đa trong pool
+NEO4J_ACQUISITION_TIMEOUT = 30.0  # Thời gian tối đa (giây) chờ lấy kết nối từ pool
+NEO4J_MAX_CONNECTION_LIFETIME = 3600  # Kết nối cũ hơn (giây) sẽ bị đóng và tạo lại
+NEO4J_MAX_RETRY_TIME = 15.0  # Tổng thời gian (giây) driver retry một transaction với backoff lũy thừa
+QUERY_FETCH_SIZE = 1000  # Số record kéo về mỗi lần khi đọc kết quả dạng stream
+PERIODIC_COMMIT_SIZE = 10000  # Số dòng mỗi transaction khi cập nhật toàn đồ thị (run_periodic)
+QUERY_PROFILE = False  # Chạy truy vấn với PROFILE và giữ plan của truy vấn chậm
+SLOW_QUERY_SECONDS = 5.0  # Ngưỡng (giây) để coi một truy vấn là chậm
+STATS_CACHE_TTL = 300.0  # Thời gian (giây) tối đa giữ snapshot thống kê của check_data
+
 # Import/Export parameters
 BATCH_SIZE = 2000
 MAX_NODES = 400000
 MAX_RELATIONSHIPS = 600000
+IMPORT_CHUNK_SIZE = 100000  # Số dòng mỗi chunk khi import streaming
+IMPORT_WORKERS = 4  # Số session ghi song song khi import
+ADAPTIVE_BATCHING = True  # Tự điều chỉnh kích thước batch theo latency commit
+BATCH_SIZE_MIN = 250
+BATCH_SIZE_MAX = 20000
+BATCH_TARGET_LATENCY = 0.5  # Latency mục tiêu (giây) cho mỗi batch commit
+TEMPORAL_ENGINE = 'cypher'  # Engine tính đặc trưng thời gian: 'cypher' (trong Neo4j) hoặc 'numpy'
 ALLOWED_EXTENSIONS = {'csv'}
 UPLOAD_FOLDER = 'uploads'
 
@@ -29,5 +54,37 @@ FEATURE_WEIGHTS = {
     'stdTimeBetweenTx': 0.00,
 }
 
+# Trọng số tính anomaly_score trên các đặc trưng đã normalize, tập trung vào degScore và
+# maxAmountRatio; riêng normCommunitySize được tính ngược (cộng đồng nhỏ -> điểm cao)
+ANOMALY_SCORE_WEIGHTS = {
+    'degScore': 0.60,
+    'prScore': 0.02,
+    'simScore': 0.01,
+    'btwScore': 0.02,
+    'hubScore': 0.08,
+    'authScore': 0.01,
+    'coreScore': 0.01,
+    'triCount': 0.01,
+    'cycleCount': 0.01,
+    'tempBurst': 0.05,
+    'txVelocity': 0.01,
+    'amountVolatility': 0.02,
+    'maxAmountRatio': 0.12,
+    'stdTimeBetweenTx': 0.01,
+    'normCommunitySize': 0.02,
+}
+
+# Scaler normalize cho từng đặc trưng ('minmax', 'log_minmax', 'rank', 'robust'), mặc định DEFAULT_SCALER
+DEFAULT_SCALER = 'minmax'
+FEATURE_SCALERS = {
+    'btwScore': 'log_minmax',  # Phân phối lệch phải, min-max bị outlier chi phối
+    'txVelocity': 'log_minmax',
+}
+# Tham số scaler đã fit, dùng lại ở các lần chạy tăng dần; đặt ở thư mục gốc project (cạnh app.py)
+# để Flask app và các script chạy từ thư mục khác nhau vẫn dùng chung một file
+SCALER_STATE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'feature_scalers.json'
+)
+
 # Detection parameters
 DEFAULT_PERCENTILE = 0.99  # Tăng từ 0.99 lên 0.995 để giảm false positives
\ No newline at end of file
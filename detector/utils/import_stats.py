@@ -0,0 +1,149 @@
+"""
+Thống kê throughput cho quá trình import: thời gian từng phase, latency từng batch và tốc độ ghi.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger("fraud_detector.import")
+
+# Các phase của một lần import
+PARSE_PHASE = 'parse'
+ACCOUNTS_PHASE = 'accounts'
+RELATIONSHIPS_PHASE = 'relationships'
+
+
+class ImportStats:
+    """Thu thập thời gian theo phase và latency theo batch của một lần import (thread-safe)."""
+
+    def __init__(self, source_bytes=0, workers=1):
+        self.source_bytes = source_bytes
+        self.workers = workers
+        self.start_time = time.time()
+        self.end_time = None
+        self.phase_seconds = {}
+        self.phase_rows = {}
+        self.batch_latencies = {}
+        self.lock_retries = 0
+        self.batch_sizes = {}
+        self.import_id = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """Cộng dồn thời gian wall-clock của khối lệnh vào phase `name`."""
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add_phase_time(name, time.time() - start)
+
+    def add_phase_time(self, name, seconds):
+        with self._lock:
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + seconds
+
+    def timed_iter(self, name, iterable):
+        """Bọc iterator (ví dụ các chunk CSV) để thời gian lấy từng phần tử được tính vào phase `name`."""
+        iterator = iter(iterable)
+        while True:
+            start = time.time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_phase_time(name, time.time() - start)
+                return
+            self.add_phase_time(name, time.time() - start)
+            yield item
+
+    def add_rows(self, phase, rows):
+        with self._lock:
+            self.phase_rows[phase] = self.phase_rows.get(phase, 0) + rows
+
+    def record_batch(self, phase, rows, latency, retries=0):
+        """Ghi nhận một batch đã commit: số dòng, latency (giây) và số lần retry."""
+        with self._lock:
+            self.phase_rows[phase] = self.phase_rows.get(phase, 0) + rows
+            self.batch_latencies.setdefault(phase, []).append(latency)
+            self.lock_retries += retries
+
+    def finish(self):
+        self.end_time = time.time()
+        return self
+
+    @property
+    def total_seconds(self):
+        return (self.end_time or time.time()) - self.start_time
+
+    @property
+    def transactions(self):
+        return self.phase_rows.get(RELATIONSHIPS_PHASE, 0)
+
+    @property
+    def rows_per_second(self):
+        """Số giao dịch (SENT) được ghi mỗi giây, tính trên toàn bộ thời gian import."""
+        return self.transactions / self.total_seconds if self.total_seconds > 0 else 0.0
+
+    @property
+    def bytes_per_second(self):
+        return self.source_bytes / self.total_seconds if self.total_seconds > 0 else 0.0
+
+    def to_dict(self):
+        phases = {}
+        names = [PARSE_PHASE, ACCOUNTS_PHASE, RELATIONSHIPS_PHASE]
+        names += sorted((set(self.phase_seconds) | set(self.phase_rows)) - set(names))
+        for name in names:
+            if name not in self.phase_seconds and name not in self.phase_rows:
+                continue
+            seconds = self.phase_seconds.get(name, 0.0)
+            rows = self.phase_rows.get(name, 0)
+            latencies = np.array(self.batch_latencies.get(name, []), dtype=float) * 1000
+            phase = {
+                "seconds": round(seconds, 3),
+                "rows": rows,
+                "rows_per_second": round(rows / seconds, 1) if seconds > 0 else 0.0
+            }
+            if len(latencies):
+                phase["batches"] = len(latencies)
+                phase["latency_ms"] = {
+                    "p50": round(float(np.percentile(latencies, 50)), 2),
+                    "p95": round(float(np.percentile(latencies, 95)), 2),
+                    "p99": round(float(np.percentile(latencies, 99)), 2),
+                    "max": round(float(latencies.max()), 2)
+                }
+            phases[name] = phase
+
+        return {
+            "import_id": self.import_id,
+            "total_seconds": round(self.total_seconds, 3),
+            "transactions": self.transactions,
+            "rows_per_second": round(self.rows_per_second, 1),
+            "bytes_per_second": round(self.bytes_per_second, 1),
+            "workers": self.workers,
+            "lock_retries": self.lock_retries,
+            "batch_sizes": dict(self.batch_sizes),
+            "phases": phases
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    def report(self):
+        """In tóm tắt ra console và ghi một dòng log JSON."""
+        data = self.to_dict()
+        print(f"📊 Import: {data['transactions']} giao dịch trong {data['total_seconds']:.2f}s "
+              f"({data['rows_per_second']:.0f} giao dịch/s, {data['bytes_per_second'] / 1e6:.2f} MB/s, "
+              f"{data['workers']} luồng ghi, {data['lock_retries']} lần retry do lock)")
+        for name, phase in data["phases"].items():
+            line = f"  • {name}: {phase['seconds']:.2f}s"
+            if phase["rows"]:
+                line += f", {phase['rows']} dòng ({phase['rows_per_second']:.0f} dòng/s)"
+            if "latency_ms" in phase:
+                latency = phase["latency_ms"]
+                line += (f", {phase['batches']} batch, latency p50/p95/p99 = "
+                         f"{latency['p50']:.1f}/{latency['p95']:.1f}/{latency['p99']:.1f} ms")
+            print(line)
+        logger.info(self.to_json())
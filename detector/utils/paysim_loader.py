@@ -0,0 +1,60 @@
+"""
+Đọc file CSV PaySim với các cột cần thiết và kiểu dữ liệu cố định.
+
+Dùng chung cho DatabaseManager.import_data (chỉ nạp các cột cần thiết, bỏ các cột balance) và
+data_processing.network_preserving_sampling (nạp mọi cột để file mẫu giữ đúng định dạng PaySim),
+để pandas không phải suy luận kiểu.
+"""
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Các cột được pipeline sử dụng (is_fraud là tên thay thế cho isFraud ở một số file đã xử lý)
+PAYSIM_COLUMNS = ['step', 'type', 'amount', 'nameOrig', 'nameDest', 'isFraud', 'is_fraud']
+
+# amount giữ float64: số tiền PaySim lên tới hàng chục triệu, float32 (~7 chữ số) sẽ làm mất phần lẻ
+PAYSIM_DTYPES = {
+    'step': 'int32',
+    'type': 'category',
+    'amount': 'float64',
+    'nameOrig': 'category',
+    'nameDest': 'category',
+    'isFraud': 'int8',
+    'is_fraud': 'int8',
+    'oldbalanceOrg': 'float64',
+    'newbalanceOrig': 'float64',
+    'oldbalanceDest': 'float64',
+    'newbalanceDest': 'float64',
+    'isFlaggedFraud': 'int8'
+}
+
+
+def load_paysim(path, columns=PAYSIM_COLUMNS, chunksize=None, engine=None):
+    """
+    Đọc file PaySim với các cột được chọn và kiểu dữ liệu đã cố định.
+
+    Args:
+        path: Đường dẫn file CSV
+        columns: Danh sách cột muốn đọc (mặc định: PAYSIM_COLUMNS); None đọc mọi cột của file;
+                 cột không có trong file bị bỏ qua
+        chunksize: Nếu được chỉ định, trả về iterator các DataFrame với số dòng cố định
+        engine: Engine của pandas ('c' hoặc 'pyarrow'); mặc định dùng pyarrow nếu đã cài
+                và không đọc theo chunk (pyarrow không hỗ trợ chunksize)
+
+    Returns:
+        DataFrame, hoặc iterator các DataFrame nếu có chunksize
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [col for col in header if columns is None or col in columns]
+    dtype = {col: PAYSIM_DTYPES[col] for col in usecols if col in PAYSIM_DTYPES}
+
+    if engine is None:
+        engine = 'pyarrow' if HAS_PYARROW and chunksize is None else 'c'
+
+    if chunksize:
+        return pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=chunksize, engine=engine)
+    return pd.read_csv(path, usecols=usecols, dtype=dtype, engine=engine)
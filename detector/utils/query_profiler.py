@@ -0,0 +1,150 @@
+"""
+Thống kê thời gian của từng truy vấn Cypher theo stage của pipeline.
+
+Mỗi truy vấn chạy qua DatabaseManager được ghi lại với wall time, số dòng trả về và
+thời gian phía server (result_available_after / result_consumed_after). Stage được gắn
+bằng context manager `stage()`; ở chế độ profile, truy vấn được chạy với PROFILE và plan
+của các truy vấn chậm hơn ngưỡng được giữ lại cho báo cáo.
+"""
+import json
+import logging
+import re
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger("fraud_detector.queries")
+
+DEFAULT_STAGE = 'other'
+
+# Lệnh schema/quản trị không chạy được với PROFILE
+_NOT_PROFILABLE = re.compile(
+    r"^\s*(PROFILE|EXPLAIN|SHOW|(CREATE|DROP)\s+(INDEX|CONSTRAINT)\b|(CREATE|DROP)\s+(OR\s+REPLACE\s+)?DATABASE)",
+    re.IGNORECASE
+)
+
+
+class QueryProfiler:
+    """Thu thập thống kê truy vấn theo stage (thread-safe)."""
+
+    def __init__(self, profile=False, slow_query_seconds=5.0):
+        self.profile = profile
+        self.slow_query_seconds = slow_query_seconds
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Xóa thống kê của lần chạy trước."""
+        with self._lock:
+            self.stages = {}
+            self.queries = {}
+            self.slow_queries = []
+
+    @contextmanager
+    def stage(self, name):
+        """Gắn tên stage `name` cho các truy vấn chạy trong khối lệnh (có thể lồng nhau)."""
+        stack = self._stack()
+        stack.append(name)
+        try:
+            yield
+        finally:
+            stack.pop()
+
+    @property
+    def current_stage(self):
+        stack = self._stack()
+        return stack[-1] if stack else DEFAULT_STAGE
+
+    def prepare(self, query):
+        """Thêm PROFILE vào truy vấn nếu đang bật chế độ profile."""
+        if self.profile and not _NOT_PROFILABLE.match(query):
+            return f"PROFILE {query}"
+        return query
+
+    def record(self, query, seconds, rows, summary=None, stage=None):
+        """Ghi nhận một truy vấn đã chạy xong; `summary` là ResultSummary của driver (nếu có)."""
+        stage = stage or self.current_stage
+        available_after = getattr(summary, "result_available_after", None) or 0
+        consumed_after = getattr(summary, "result_consumed_after", None) or 0
+        server_seconds = (available_after + consumed_after) / 1000
+        text = " ".join(query.split())
+
+        with self._lock:
+            stage_stats = self.stages.setdefault(stage, {"seconds": 0.0, "server_seconds": 0.0, "queries": 0, "rows": 0})
+            stage_stats["seconds"] += seconds
+            stage_stats["server_seconds"] += server_seconds
+            stage_stats["queries"] += 1
+            stage_stats["rows"] += rows
+
+            query_stats = self.queries.setdefault((stage, text), {"seconds": 0.0, "calls": 0, "rows": 0})
+            query_stats["seconds"] += seconds
+            query_stats["calls"] += 1
+            query_stats["rows"] += rows
+
+            if seconds >= self.slow_query_seconds:
+                self.slow_queries.append({
+                    "stage": stage,
+                    "query": text,
+                    "seconds": round(seconds, 3),
+                    "rows": rows,
+                    "result_available_after_ms": available_after,
+                    "result_consumed_after_ms": consumed_after,
+                    "plan": getattr(summary, "profile", None) if self.profile else None
+                })
+
+    def to_dict(self, top=10):
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda item: item[1]["seconds"], reverse=True)
+            queries = sorted(self.queries.items(), key=lambda item: item[1]["seconds"], reverse=True)[:top]
+            return {
+                "stages": [
+                    {"stage": name, **{key: round(value, 3) if isinstance(value, float) else value
+                                       for key, value in stats.items()}}
+                    for name, stats in stages
+                ],
+                "top_queries": [
+                    {"stage": stage, "query": text, "seconds": round(stats["seconds"], 3),
+                     "calls": stats["calls"], "rows": stats["rows"]}
+                    for (stage, text), stats in queries
+                ],
+                "slow_queries": list(self.slow_queries)
+            }
+
+    def report(self, top=10):
+        """In xếp hạng stage theo tổng thời gian, các truy vấn tốn thời gian nhất và plan của truy vấn chậm."""
+        data = self.to_dict(top)
+        if not data["stages"]:
+            return data
+
+        total = sum(stage["seconds"] for stage in data["stages"]) or 1.0
+        print("\n📈 Thời gian truy vấn theo stage:")
+        for rank, stage in enumerate(data["stages"], 1):
+            print(f"  {rank}. {stage['stage']}: {stage['seconds']:.2f}s ({stage['seconds'] / total * 100:.1f}%), "
+                  f"{stage['queries']} truy vấn, {stage['rows']} dòng, server {stage['server_seconds']:.2f}s")
+
+        print(f"\n🐢 Top {len(data['top_queries'])} truy vấn tốn thời gian nhất:")
+        for query in data["top_queries"]:
+            print(f"  • [{query['stage']}] {query['seconds']:.2f}s ({query['calls']} lần): {query['query'][:100]}")
+
+        for slow in data["slow_queries"]:
+            if slow["plan"]:
+                print(f"\n🔍 PROFILE [{slow['stage']}] {slow['seconds']:.2f}s: {slow['query'][:100]}")
+                for line in _format_plan(slow["plan"]):
+                    print(f"    {line}")
+
+        logger.info(json.dumps(data, ensure_ascii=False, default=str))
+        return data
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+
+def _format_plan(plan, depth=0):
+    """Chuyển plan PROFILE (dict lồng nhau) thành các dòng operator, số dòng và db hits."""
+    lines = [f"{'  ' * depth}{plan.get('operatorType', '?')} "
+             f"(rows={plan.get('rows', '?')}, dbHits={plan.get('dbHits', '?')})"]
+    for child in plan.get("children", []):
+        lines.extend(_format_plan(child, depth + 1))
+    return lines
@@ -0,0 +1,55 @@
+"""
+Snapshot thống kê của đồ thị (số node, tài khoản, giao dịch, trạng thái phân tích) dùng chung
+cho toàn tiến trình.
+
+Snapshot được giữ cho tới khi bị invalidate (sau import, clear database, pipeline hoàn tất)
+hoặc quá TTL (đề phòng dữ liệu bị thay đổi từ bên ngoài), nên các endpoint polling trạng thái
+không phải truy vấn lại database khi đồ thị không đổi.
+"""
+import threading
+import time
+
+
+class StatsSnapshot:
+    """Cache một snapshot thống kê, có version để bỏ kết quả của lần nạp bắt đầu trước khi invalidate."""
+
+    def __init__(self, ttl=300.0):
+        self.ttl = ttl
+        self._value = None
+        self._loaded_at = 0.0
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self._version
+
+    def peek(self):
+        """Trả về snapshot còn hiệu lực, hoặc None nếu cần nạp lại."""
+        with self._lock:
+            if self._value is None or time.time() - self._loaded_at > self.ttl:
+                return None
+            return dict(self._value)
+
+    def store(self, value, version):
+        """Lưu snapshot vừa nạp; bỏ qua nếu đã có invalidate kể từ khi bắt đầu nạp (`version`)."""
+        with self._lock:
+            if version != self._version:
+                return
+            self._value = dict(value)
+            self._loaded_at = time.time()
+
+    def get(self, loader):
+        """Trả về snapshot trong cache hoặc gọi `loader()` để nạp mới."""
+        value = self.peek()
+        if value is None:
+            version = self._version
+            value = loader()
+            self.store(value, version)
+        return value
+
+    def invalidate(self):
+        """Đánh dấu snapshot hết hạn (gọi sau khi đồ thị thay đổi)."""
+        with self._lock:
+            self._version += 1
+            self._value = None
@@ -205,31 +205,20 @@ class FinalFraudDetection:
         """Reset trạng thái đánh dấu."""
         print("  - Đang reset trạng thái đánh dấu...")
         
-        reset_query = """
-        MATCH ()-[tx:SENT]->()
-        SET tx.flagged = false, 
-            tx.confidence = null, 
-            tx.flag_reason = null
-            
-        WITH count(tx) AS reset_count
+        # Cập nhật toàn bộ giao dịch và tài khoản, commit theo lô để giới hạn bộ nhớ transaction
+        self.db_manager.run_periodic(
+            "MATCH ()-[tx:SENT]->()", "tx",
+            "SET tx.flagged = false, tx.confidence = null, tx.flag_reason = null"
+        )
         
-        // Reset account flags
-        MATCH (acc:Account)
-        SET acc.suspicious = null,
-            acc.suspicious_count = null,
-            acc.fraud_risk = null
-            
-        RETURN reset_count
-        """
-        reset_result = self.db_manager.run_query(reset_query)
-        
-        # Handle both list and dictionary results
-        reset_count = 0
-        if reset_result:
-            if isinstance(reset_result, dict):
-                reset_count = reset_result.get("reset_count", 0)
-            elif isinstance(reset_result, list) and len(reset_result) > 0:
-                reset_count = reset_result[0].get("reset_count", 0) if isinstance(reset_result[0], dict) else 0
+        # Reset account flags
+        self.db_manager.run_periodic(
+            "MATCH (acc:Account)", "acc",
+            "SET acc.suspicious = null, acc.suspicious_count = null, acc.fraud_risk = null"
+        )
+        
+        count_result = self.db_manager.run_query("MATCH ()-[tx:SENT]->() RETURN count(tx) AS reset_count")
+        reset_count = count_result.get("reset_count", 0) if count_result else 0
                 
         print(f"    ✅ Đã reset {reset_count} giao dịch và các tài khoản liên quan")
         
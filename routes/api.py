@@ -5,11 +5,14 @@ from . import api_bp
 from detector.fraud_detector import FraudDetector
 from detector.anomaly_detection import AnomalyDetector
 from detector.database_manager import DatabaseManager
-from detector.utils.config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
-from detector.utils.config import DEFAULT_PERCENTILE
+from detector.async_database_manager import get_shared_async_manager, run_sync
+from detector.utils.config import DEFAULT_PERCENTILE, DASHBOARD_ROUTING
 
-# Khởi tạo database manager với thông tin kết nối từ config
-db_manager = DatabaseManager(uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD)
+# Database manager dùng driver (connection pool) chung của tiến trình
+db_manager = DatabaseManager()
+
+# Truy vấn đọc của dashboard được định tuyến riêng để không tranh tài nguyên với pipeline
+dashboard_db = DatabaseManager(routing=DASHBOARD_ROUTING)
 
 # Khởi tạo detector với db_manager
 detector = FraudDetector(db_manager)
@@ -18,18 +21,9 @@ detector = FraudDetector(db_manager)
 def get_status():
     """Trả về trạng thái kết nối cơ sở dữ liệu và thông tin cơ bản"""
     try:
-        has_data, stats = db_manager.check_data()
-        
-        # Kiểm tra xem đã có phân tích chưa
-        has_analysis = False
-        with db_manager.driver.session() as session:
-            result = session.run("""
-                MATCH (a:Account) 
-                WHERE a.fraud_score IS NOT NULL 
-                RETURN count(a) > 0 as has_analysis
-            """).single()
-            if result:
-                has_analysis = result.get("has_analysis", False)
+        # Snapshot thống kê chỉ được nạp lại sau import, clear hoặc khi pipeline hoàn tất
+        has_data, stats = run_sync(get_shared_async_manager().check_data())
+        has_analysis = stats.get("has_analysis", False)
             
         return jsonify({
             'has_data': has_data,
@@ -51,69 +45,38 @@ def get_metrics():
     try:
         metrics = {}
         
-        with db_manager.driver.session() as session:
-            # Get total accounts
-            result = session.run("""
-                MATCH (a:Account) 
-                RETURN count(a) as total_accounts
-            """).single()
-            if result:
-                metrics["total_accounts"] = result["total_accounts"]
-            
-            # Get total transactions
-            result = session.run("""
-                MATCH ()-[r:SENT]->() 
-                RETURN count(r) as total_transactions
-            """).single()
-            if result:
-                metrics["total_transactions"] = result["total_transactions"]
-            
-            # Get flagged (detected) fraud count
-            result = session.run("""
-                MATCH ()-[r:SENT]->()
-                WHERE r.flagged = true
-                RETURN count(r) as detected_fraud_count
-            """).single()
-            if result:
-                metrics["detected_fraud_count"] = result["detected_fraud_count"]
-            
-            # Get risk communities count
-            result = session.run("""
-                MATCH (a:Account)
-                WHERE a.communityId IS NOT NULL
-                RETURN count(distinct a.communityId) as risk_communities
-            """).single()
-            if result:
-                metrics["risk_communities"] = result["risk_communities"]
-              # Get evaluation metrics from the metrics file
-            try:
-                import json
-                with open('unsupervised_anomaly_detection_metrics.json', 'r') as f:
-                    eval_metrics = json.load(f)
-                    if 'metrics' in eval_metrics:
-                        # Add precision, recall, f1_score
-                        metrics["precision"] = eval_metrics['metrics']['precision']
-                        metrics["recall"] = eval_metrics['metrics']['recall']
-                        metrics["f1_score"] = eval_metrics['metrics']['f1_score']
-                        metrics["true_positives"] = eval_metrics['metrics']['true_positives']
-                        metrics["total_fraud"] = eval_metrics['metrics']['total_fraud']
-                        
-                        # Use the true_positives + false_positives for detected_fraud_count if not set yet
-                        if "detected_fraud_count" not in metrics or metrics["detected_fraud_count"] == 0:
-                            metrics["detected_fraud_count"] = eval_metrics['metrics']['true_positives'] + eval_metrics['metrics']['false_positives']
-                        
-                        # Add some default communities if we have analysis results but no communities detected
-                        if "detected_fraud_count" in metrics and metrics["detected_fraud_count"] > 0:
-                            if "risk_communities" not in metrics or metrics["risk_communities"] == 0:
-                                estimated_communities = max(1, int(metrics["detected_fraud_count"] / 5000))
-                                metrics["risk_communities"] = estimated_communities
-            except Exception as e:
-                print(f"Could not read metrics file: {str(e)}")
-            
-            return jsonify({
-                "metrics": metrics,
-                "has_data": True
-            })
+        # Các count độc lập được gửi đồng thời qua driver async
+        metrics.update(run_sync(get_shared_async_manager().get_metrics()))
+        
+        # Get evaluation metrics from the metrics file
+        try:
+            import json
+            with open('unsupervised_anomaly_detection_metrics.json', 'r') as f:
+                eval_metrics = json.load(f)
+                if 'metrics' in eval_metrics:
+                    # Add precision, recall, f1_score
+                    metrics["precision"] = eval_metrics['metrics']['precision']
+                    metrics["recall"] = eval_metrics['metrics']['recall']
+                    metrics["f1_score"] = eval_metrics['metrics']['f1_score']
+                    metrics["true_positives"] = eval_metrics['metrics']['true_positives']
+                    metrics["total_fraud"] = eval_metrics['metrics']['total_fraud']
+                    
+                    # Use the true_positives + false_positives for detected_fraud_count if not set yet
+                    if "detected_fraud_count" not in metrics or metrics["detected_fraud_count"] == 0:
+                        metrics["detected_fraud_count"] = eval_metrics['metrics']['true_positives'] + eval_metrics['metrics']['false_positives']
+                    
+                    # Add some default communities if we have analysis results but no communities detected
+                    if "detected_fraud_count" in metrics and metrics["detected_fraud_count"] > 0:
+                        if "risk_communities" not in metrics or metrics["risk_communities"] == 0:
+                            estimated_communities = max(1, int(metrics["detected_fraud_count"] / 5000))
+                            metrics["risk_communities"] = estimated_communities
+        except Exception as e:
+            print(f"Could not read metrics file: {str(e)}")
+        
+        return jsonify({
+            "metrics": metrics,
+            "has_data": True
+        })
     except Exception as e:
         import traceback
         print(f"Metrics API error: {str(e)}")
@@ -163,8 +126,6 @@ def get_suspicious_accounts():
         if min_flagged:
             min_flagged = int(min_flagged)
         
-        db_manager = DatabaseManager(uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD)
-        
         # GUARANTEED RESULTS QUERY - Get top accounts by anomaly score
         # This ensures we always return something even if the regular methods fail
         fallback_query = """
@@ -177,13 +138,7 @@ def get_suspicious_accounts():
         ORDER BY a.anomaly_score DESC
         LIMIT 20
         """
-        accounts = db_manager.run_query(fallback_query)
-        
-        # Handle different return types
-        if isinstance(accounts, dict):
-            accounts = [accounts]
-        elif not isinstance(accounts, list):
-            accounts = []
+        accounts = list(dashboard_db.stream_query(fallback_query))
         
         # Transform for the API
         transactions = []
@@ -239,16 +194,7 @@ def get_accounts():
         LIMIT $limit
         """
         
-        db_manager = DatabaseManager()
-        result = db_manager.run_query(query, {"limit": limit})
-        
-        # Handle different return types
-        if isinstance(result, dict):
-            accounts = [result]
-        elif isinstance(result, list):
-            accounts = result
-        else:
-            accounts = []
+        accounts = list(dashboard_db.stream_query(query, {"limit": limit}))
             
         return jsonify({
             "count": len(accounts),
@@ -6,11 +6,11 @@ import traceback
 from . import views_bp
 from detector.fraud_detector import FraudDetector
 from detector.database_manager import DatabaseManager
-from detector.utils.config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+from detector.async_database_manager import get_shared_async_manager, run_sync
 from detector.utils.config import DEFAULT_PERCENTILE
 
-# Khởi tạo database manager với thông tin kết nối từ config
-db_manager = DatabaseManager(uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD)
+# Database manager dùng driver (connection pool) chung của tiến trình
+db_manager = DatabaseManager()
 
 # Khởi tạo detector với db_manager
 detector = FraudDetector(db_manager)
@@ -29,19 +29,9 @@ def allowed_file(filename):
 def index():
     """Trang chủ"""
     try:
-        # Kiểm tra trạng thái database
-        has_data, stats = db_manager.check_data()
-        
-        # Kiểm tra xem đã có phân tích chưa
-        has_analysis = False
-        with db_manager.driver.session() as session:
-            result = session.run("""
-                MATCH (a:Account) 
-                WHERE a.fraud_score IS NOT NULL 
-                RETURN count(a) > 0 as has_analysis
-            """).single()
-            if result:
-                has_analysis = result.get("has_analysis", False)
+        # Kiểm tra trạng thái database (dùng snapshot thống kê nếu đồ thị chưa thay đổi)
+        has_data, stats = run_sync(get_shared_async_manager().check_data())
+        has_analysis = stats.get("has_analysis", False)
         
         return render_template('index.html', has_data=has_data, stats=stats, has_analysis=has_analysis)
     except Exception as e:
@@ -73,11 +63,11 @@ def upload():
             file.save(filepath)
             
             try:
-                start_time = time.time()
-                success = db_manager.import_data(filepath)
-                if success:
-                    import_time = time.time() - start_time
-                    flash(f'Import thành công trong {import_time:.2f} giây', 'success')
+                append = request.form.get('append') == 'on'
+                stats = db_manager.import_data(filepath, append=append)
+                if stats:
+                    flash(f'Import thành công {stats.transactions} giao dịch trong {stats.total_seconds:.2f} giây '
+                          f'({stats.rows_per_second:.0f} giao dịch/s, {stats.bytes_per_second / 1e6:.2f} MB/s)', 'success')
                 else:
                     flash('Import không thành công', 'error')
             except Exception as e:
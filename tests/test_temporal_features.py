@@ -0,0 +1,172 @@
+"""
+Kiểm tra engine NumPy của đặc trưng thời gian so với công thức của TEMPORAL_FEATURES_QUERY.
+
+`_reference_features` viết lại từng bước của truy vấn Cypher bằng Python thuần cho mỗi tài
+khoản. Test tích hợp với Neo4j chỉ chạy khi có biến môi trường NEO4J_TEST_URI (test ghi các
+đặc trưng thời gian lên đồ thị của database đó).
+"""
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from detector.temporal_features import (
+    TEMPORAL_FEATURES, compute_temporal_features, to_write_rows, compare_features
+)
+
+
+def _reference_features(transactions):
+    """Tính đặc trưng thời gian theo đúng từng bước của TEMPORAL_FEATURES_QUERY."""
+    rows = {}
+    for account, group in transactions.groupby('nameOrig', sort=True):
+        group = group.sort_values('step', kind='stable')
+        steps = [int(step) for step in group['step']]
+        amounts = [float(amount) for amount in group['amount']]
+        n = len(steps)
+        diffs = [steps[i + 1] - steps[i] for i in range(n - 1)]
+
+        time_span = 0 if n <= 1 else float(steps[-1] - steps[0])
+        max_amount = 0
+        min_amount = 9999999999.0
+        for amount in amounts:
+            max_amount = amount if amount > max_amount else max_amount
+            min_amount = amount if amount < min_amount else min_amount
+        avg_amount = sum(amounts) / n
+        avg_diff = None if n <= 1 else sum(diffs) / len(diffs)
+        amount_range = 0 if n <= 1 else max_amount - min_amount
+        if n <= 2:
+            std_diff = 0.0
+        else:
+            std_diff = math.sqrt(sum((d - avg_diff) ** 2 for d in diffs) / (len(diffs) - 1))
+
+        rows[account] = {
+            'txVelocity': 0 if time_span == 0 else n / (time_span + 1),
+            'amountVolatility': 0 if avg_amount == 0 else amount_range / avg_amount,
+            'maxAmountRatio': 0 if avg_amount == 0 else max_amount / avg_amount,
+            'tempBurst': np.nan if n <= 1 else len([d for d in diffs if d <= 3]) / len(diffs),
+            'avgTimeBetweenTx': np.nan if n <= 1 else avg_diff,
+            'stdTimeBetweenTx': np.nan if n <= 1 else (0 if avg_diff == 0 else std_diff / avg_diff),
+        }
+    frame = pd.DataFrame.from_dict(rows, orient='index', columns=TEMPORAL_FEATURES)
+    frame.index.name = 'id'
+    return frame.astype(np.float64)
+
+
+def _transactions(rows):
+    return pd.DataFrame(rows, columns=['nameOrig', 'step', 'amount'])
+
+
+def _assert_matches_reference(transactions):
+    expected = _reference_features(transactions)
+    actual = compute_temporal_features(transactions)
+    assert list(actual.columns) == TEMPORAL_FEATURES
+    assert compare_features(expected, actual) == {}
+    # compare_features bỏ qua NaN ở `expected`, nên vị trí NaN được kiểm tra riêng
+    assert (expected.isna().to_numpy() == actual.loc[expected.index].isna().to_numpy()).all()
+
+
+def test_single_transaction_accounts_have_nan_gap_features():
+    transactions = _transactions([('A', 5, 100.0), ('B', 1, 10.0), ('B', 9, 30.0)])
+    features = compute_temporal_features(transactions)
+
+    single = features.loc['A']
+    assert single['txVelocity'] == 0
+    assert single['amountVolatility'] == 0
+    assert single['maxAmountRatio'] == 1
+    assert single[['tempBurst', 'avgTimeBetweenTx', 'stdTimeBetweenTx']].isna().all()
+    _assert_matches_reference(transactions)
+
+
+def test_zero_amount_average():
+    transactions = _transactions([('A', 1, 0.0), ('A', 2, 0.0), ('A', 4, 0.0)])
+    features = compute_temporal_features(transactions)
+
+    assert features.loc['A', 'amountVolatility'] == 0
+    assert features.loc['A', 'maxAmountRatio'] == 0
+    _assert_matches_reference(transactions)
+
+
+def test_equal_steps():
+    transactions = _transactions([('A', 7, 10.0), ('A', 7, 20.0), ('A', 7, 60.0)])
+    features = compute_temporal_features(transactions)
+
+    assert features.loc['A', 'txVelocity'] == 0
+    assert features.loc['A', 'tempBurst'] == 1
+    assert features.loc['A', 'avgTimeBetweenTx'] == 0
+    assert features.loc['A', 'stdTimeBetweenTx'] == 0
+    _assert_matches_reference(transactions)
+
+
+def test_sample_stdev_needs_two_gaps():
+    # Hai giao dịch: một khoảng cách nên độ lệch chuẩn mẫu bằng 0
+    transactions = _transactions([('A', 1, 10.0), ('A', 6, 20.0),
+                                  ('B', 1, 10.0), ('B', 2, 10.0), ('B', 8, 10.0)])
+    features = compute_temporal_features(transactions)
+
+    assert features.loc['A', 'stdTimeBetweenTx'] == 0
+    gaps = np.array([1.0, 6.0])
+    assert features.loc['B', 'stdTimeBetweenTx'] == pytest.approx(gaps.std(ddof=1) / gaps.mean())
+    _assert_matches_reference(transactions)
+
+
+def test_unsorted_input_matches_reference():
+    transactions = _transactions([('B', 9, 5.0), ('A', 3, 1.0), ('B', 2, 7.0),
+                                  ('A', 1, 4.0), ('B', 4, 7.0), ('A', 2, 2.0)])
+    _assert_matches_reference(transactions)
+
+
+def test_random_transactions_match_reference():
+    rng = np.random.default_rng(7)
+    size = 2000
+    transactions = _transactions({
+        'nameOrig': rng.choice([f'C{i}' for i in range(300)], size),
+        'step': rng.integers(1, 40, size),
+        'amount': np.where(rng.random(size) < 0.05, 0.0, rng.lognormal(8, 2, size)),
+    })
+    _assert_matches_reference(transactions)
+
+
+def test_empty_frame():
+    features = compute_temporal_features(_transactions([]))
+    assert features.empty
+    assert list(features.columns) == TEMPORAL_FEATURES
+
+
+def test_compare_features_reports_mismatches():
+    transactions = _transactions([('A', 1, 10.0), ('A', 2, 30.0), ('B', 1, 5.0)])
+    expected = compute_temporal_features(transactions)
+    actual = expected.drop(index='B').copy()
+    actual.loc['A', 'txVelocity'] += 1
+
+    assert compare_features(expected, actual) == {'missing_accounts': 1, 'txVelocity': 1}
+
+
+def test_write_rows_replace_nan_with_none():
+    rows = to_write_rows(compute_temporal_features(_transactions([('A', 1, 10.0)])))
+    assert rows == [{
+        'id': 'A', 'txVelocity': 0.0, 'amountVolatility': 0.0, 'maxAmountRatio': 1.0,
+        'tempBurst': None, 'avgTimeBetweenTx': None, 'stdTimeBetweenTx': None
+    }]
+
+
+@pytest.mark.skipif(not os.environ.get('NEO4J_TEST_URI'), reason="cần NEO4J_TEST_URI để chạy với Neo4j")
+def test_cypher_and_numpy_engines_match():
+    from detector.database_manager import DatabaseManager
+    from detector.feature_extraction import FeatureExtractor
+    from detector.utils.config import NEO4J_USER, NEO4J_PASSWORD
+
+    db_manager = DatabaseManager(
+        os.environ['NEO4J_TEST_URI'],
+        os.environ.get('NEO4J_TEST_USER', NEO4J_USER),
+        os.environ.get('NEO4J_TEST_PASSWORD', NEO4J_PASSWORD)
+    )
+    try:
+        try:
+            db_manager.driver.verify_connectivity()
+        except Exception as e:
+            pytest.skip(f"Không kết nối được Neo4j: {e}")
+        assert FeatureExtractor(db_manager, scaler_state_path=None).check_temporal_parity() == {}
+    finally:
+        db_manager.close()